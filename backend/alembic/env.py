@@ -1,9 +1,10 @@
 """
 Alembic environment configuration
 """
+import asyncio
 from logging.config import fileConfig
-from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy.ext.asyncio import async_engine_from_config
 from alembic import context
 import sys
 from pathlib import Path
@@ -14,17 +15,26 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 # Импортируем модели
 from src.shared.database.models import Base
 from src.shared.config.env_loader import get_database_url
+from src.shared.database.backends import get_backend
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
 # Устанавливаем URL базы данных из конфигурации
-config.set_main_option('sqlalchemy.url', get_database_url().replace('sqlite+aiosqlite://', 'sqlite:///'))
+# Миграции выполняются через тот же async-драйвер, что и приложение
+# (aiosqlite / asyncpg), поэтому синхронный драйвер не нужен
+database_url = get_database_url()
+backend = get_backend(database_url)
+config.set_main_option('sqlalchemy.url', database_url.replace('%', '%%'))
+
+# SQLite не умеет ALTER для большинства операций - используем batch-режим
+render_as_batch = backend.name == "sqlite"
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-if config.config_file_name is not None:
+# При запуске из приложения (migrations.py) логирование уже настроено
+if config.config_file_name is not None and "connection" not in config.attributes:
     fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
@@ -55,32 +65,53 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        render_as_batch=render_as_batch,
     )
 
     with context.begin_transaction():
         context.run_migrations()
 
 
-def run_migrations_online() -> None:
-    """Run migrations in 'online' mode.
+def do_run_migrations(connection) -> None:
+    """Выполняет миграции на синхронной обертке async-соединения"""
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=render_as_batch,
+    )
 
-    In this scenario we need to create an Engine
-    and associate a connection with the context.
+    with context.begin_transaction():
+        context.run_migrations()
 
-    """
-    connectable = engine_from_config(
+
+async def run_async_migrations() -> None:
+    """Создает async-движок и выполняет миграции"""
+    connectable = async_engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
     )
 
-    with connectable.connect() as connection:
-        context.configure(
-            connection=connection, target_metadata=target_metadata
-        )
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+
+    await connectable.dispose()
+
+
+def run_migrations_online() -> None:
+    """Run migrations in 'online' mode.
+
+    In this scenario we need to create an Engine
+    and associate a connection with the context.
+
+    """
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        # Приложение передало свое соединение (см. src/shared/database/migrations.py)
+        do_run_migrations(connection)
+        return
 
-        with context.begin_transaction():
-            context.run_migrations()
+    asyncio.run(run_async_migrations())
 
 
 if context.is_offline_mode():
@@ -0,0 +1,32 @@
+"""Unique (user_id, date) for working_days
+
+Revision ID: 003_working_days_unique_date
+Revises: 002_add_booking_fields
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '003_working_days_unique_date'
+down_revision: Union[str, None] = '002_add_booking_fields'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Удаляем дубликаты дат, оставляя последнюю запись (select-then-insert допускал гонки)
+    op.execute(
+        "DELETE FROM working_days WHERE id NOT IN ("
+        "SELECT MAX(id) FROM working_days GROUP BY user_id, date)"
+    )
+
+    # Уникальный индекс - цель для INSERT ... ON CONFLICT (user_id, date)
+    op.create_index('uq_working_days_user_date', 'working_days', ['user_id', 'date'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_working_days_user_date', table_name='working_days')
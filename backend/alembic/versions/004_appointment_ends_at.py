@@ -0,0 +1,93 @@
+"""Stored ends_at and overlap index for appointments
+
+Revision ID: 004_appointment_ends_at
+Revises: 003_working_days_unique_date
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+import logging
+from datetime import timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '004_appointment_ends_at'
+down_revision: Union[str, None] = '003_working_days_unique_date'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Сколько записей пересчитывается за один UPDATE
+BACKFILL_BATCH_SIZE = 5000
+
+# MAX_APPOINTMENT_DURATION_MINUTES из shared/utils/appointment_utils.py на
+# момент миграции: проверка пересечений ищет начало записи не раньше
+# чем за столько минут
+MAX_DURATION_MINUTES = 480
+
+# Логгер alembic: предупреждение видно рядом с "Running upgrade ..."
+logger = logging.getLogger("alembic.runtime.migration")
+
+appointments = sa.table(
+    'appointments',
+    sa.column('id', sa.Integer),
+    sa.column('appointment_date', sa.DateTime),
+    sa.column('duration_minutes', sa.Integer),
+    sa.column('ends_at', sa.DateTime),
+)
+
+
+def upgrade() -> None:
+    op.add_column('appointments', sa.Column('ends_at', sa.DateTime(), nullable=True))
+
+    # Заполняем ends_at пачками по первичному ключу. Дата вычисляется в Python,
+    # чтобы формат хранения совпадал с тем, что пишет приложение
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(appointments.c.id, appointments.c.appointment_date, appointments.c.duration_minutes)
+            .where(appointments.c.id > last_id)
+            .order_by(appointments.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            appointments.update()
+            .where(appointments.c.id == sa.bindparam('row_id'))
+            .values(ends_at=sa.bindparam('row_ends_at')),
+            [
+                {'row_id': row.id, 'row_ends_at': row.appointment_date + timedelta(minutes=row.duration_minutes)}
+                for row in rows
+            ]
+        )
+        last_id = rows[-1].id
+
+    with op.batch_alter_table('appointments') as batch_op:
+        batch_op.alter_column('ends_at', existing_type=sa.DateTime(), nullable=False)
+
+    # Записи длиннее лимита созданы до него: миграция их не меняет,
+    # но проверка пересечений может их пропустить - нужно поправить вручную
+    too_long = bind.execute(
+        sa.select(appointments.c.id)
+        .where(appointments.c.duration_minutes > MAX_DURATION_MINUTES)
+        .order_by(appointments.c.id)
+    ).scalars().all()
+    if too_long:
+        logger.warning(
+            "⚠️ %s записей длиннее %s минут, проверка пересечений может их пропустить: id %s",
+            len(too_long), MAX_DURATION_MINUTES, ", ".join(map(str, too_long[:50])) + (" ..." if len(too_long) > 50 else "")
+        )
+
+    op.create_index(
+        'ix_appointments_user_status_period', 'appointments',
+        ['user_id', 'status', 'appointment_date', 'ends_at']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_appointments_user_status_period', table_name='appointments')
+    with op.batch_alter_table('appointments') as batch_op:
+        batch_op.drop_column('ends_at')
@@ -0,0 +1,27 @@
+"""Composite (user_id, appointment_date) index for appointments
+
+Revision ID: 005_appointments_user_date_index
+Revises: 004_appointment_ends_at
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '005_appointments_user_date_index'
+down_revision: Union[str, None] = '004_appointment_ends_at'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Список записей мастера за период и сортировка по дате.
+    # Индекс (user_id, status, appointment_date) отдельно не создаем - это префикс
+    # ix_appointments_user_status_period из ревизии 004
+    op.create_index('ix_appointments_user_date', 'appointments', ['user_id', 'appointment_date'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_appointments_user_date', table_name='appointments')
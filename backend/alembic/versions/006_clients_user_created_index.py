@@ -0,0 +1,25 @@
+"""Composite (user_id, created_at) index for clients
+
+Revision ID: 006_clients_user_created_index
+Revises: 005_appointments_user_date_index
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '006_clients_user_created_index'
+down_revision: Union[str, None] = '005_appointments_user_date_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset-пагинация списка клиентов: WHERE user_id = ? AND (created_at, id) < (?, ?)
+    op.create_index('ix_clients_user_created', 'clients', ['user_id', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_clients_user_created', table_name='clients')
@@ -0,0 +1,27 @@
+"""Profile version counter for users
+
+Revision ID: 007_user_version
+Revises: 006_clients_user_created_index
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '007_user_version'
+down_revision: Union[str, None] = '006_clients_user_created_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # server_default заполняет существующие строки без UPDATE и пересоздания таблицы
+    op.add_column('users', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('version')
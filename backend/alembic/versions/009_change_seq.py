@@ -0,0 +1,62 @@
+"""Change sequence and tombstones for delta sync
+
+Revision ID: 009_change_seq
+Revises: 008_refresh_tokens
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '009_change_seq'
+down_revision: Union[str, None] = '008_refresh_tokens'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRACKED_TABLES = ('appointments', 'clients', 'services')
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('change_seq', sa.Integer(), server_default='0', nullable=False))
+    for table in TRACKED_TABLES:
+        op.add_column(table, sa.Column('change_seq', sa.Integer(), server_default='0', nullable=False))
+        op.create_index(f'ix_{table}_user_change_seq', table, ['user_id', 'change_seq'])
+
+    # Существующим строкам - различные номера, чтобы первая синхронизация
+    # могла листаться по курсору: id * 3 + смещение таблицы не пересекается
+    # между таблицами и растет вместе с id
+    for offset, table in enumerate(TRACKED_TABLES, start=1):
+        op.execute(f"UPDATE {table} SET change_seq = id * 3 + {offset}")
+    # Счетчик мастера продолжает с наибольшего выданного номера
+    op.execute(
+        "UPDATE users SET change_seq = COALESCE((SELECT MAX(seq) FROM ("
+        + " UNION ALL ".join(f"SELECT change_seq AS seq FROM {table} WHERE user_id = users.id" for table in TRACKED_TABLES)
+        + ") AS changes), 0)"
+    )
+
+    op.create_table(
+        'tombstones',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=32), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('change_seq', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tombstones_user_change_seq', 'tombstones', ['user_id', 'change_seq'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tombstones_user_change_seq', table_name='tombstones')
+    op.drop_table('tombstones')
+    for table in TRACKED_TABLES:
+        op.drop_index(f'ix_{table}_user_change_seq', table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('change_seq')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('change_seq')
@@ -8,8 +8,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from src.shared.database.connection import init_database
+from src.shared.database.connection import init_database, async_session_factory
+from src.shared.auth.refresh_tokens import load_revoked_families
+from src.shared.database.write_queue import write_coordinator
 from src.shared.logger.setup import setup_logging
+from src.shared.logger.pipeline import stop_queue_logging, dropped_records
+from src.shared.logger.context import RequestContextMiddleware
+from src.shared.http import FastJSONResponse
 from src.shared.errors.handlers import register_error_handlers
 from src.shared.config.env_loader import config
 from src.features.api.profiles import router as profile_router
@@ -19,12 +24,21 @@ from src.features.api.appointments import router as appointments_router
 from src.features.api.schedule import router as schedule_router
 from src.features.api.auth import router as auth_router
 from src.features.api.public_booking import router as public_booking_router
+from src.features.api.sync import router as sync_router
+from src.features.api.bootstrap import router as bootstrap_router
+from src.features.api.batch import router as batch_router
+from src.features.api.exports import router as exports_router
 
 # Настройка логирования с ротацией
 setup_logging(
     log_file=config.log_file or str(config.data_dir / 'api.log'),
     max_bytes=config.log_max_bytes,
-    backup_count=config.log_backup_count
+    backup_count=config.log_backup_count,
+    level=config.log_level,
+    sample_rates=config.log_sample_rates,
+    queue_size=config.log_queue_size,
+    log_format=config.log_format,
+    compress=config.log_compress
 )
 
 @asynccontextmanager
@@ -36,6 +50,9 @@ async def lifespan(app: FastAPI):
         logging.info("📊 Инициализация базы данных...")
         await init_database()
         logging.info("✅ База данных инициализирована")
+        # Отозванные сессии проверяются в памяти - загружаем их до первого запроса
+        async with async_session_factory() as session:
+            await load_revoked_families(session)
         logging.info("🎯 API сервер готов к работе")
     except Exception as e:
         logging.error(f"❌ Ошибка при инициализации БД: {e}")
@@ -45,6 +62,10 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logging.info("⏹️ Остановка API сервера...")
+    # Дописываем то, что уже стоит в очереди записи
+    await write_coordinator.stop()
+    # Последними дописываем логи из очереди потока вывода
+    stop_queue_logging()
 
 # Создание приложения
 app = FastAPI(
@@ -52,6 +73,7 @@ app = FastAPI(
     description=config.app_description,
     version=config.app_version,
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
     docs_url="/api/docs",
     redoc_url="/api/redoc",
     debug=config.debug
@@ -66,6 +88,10 @@ app.add_middleware(
     allow_headers=config.cors_allow_headers,
 )
 
+# Контекст логов (request_id, маршрут, пользователь) - внешний слой, чтобы
+# попадали и ответы CORS, и обработчики ошибок
+app.add_middleware(RequestContextMiddleware)
+
 # Регистрация обработчиков ошибок
 register_error_handlers(app)
 
@@ -78,6 +104,10 @@ app.include_router(clients_router, prefix="/api", tags=["clients"])
 app.include_router(appointments_router, prefix="/api", tags=["appointments"])
 app.include_router(schedule_router, prefix="/api", tags=["schedule"])
 app.include_router(public_booking_router, prefix="/api", tags=["public-booking"])  # Публичное бронирование
+app.include_router(sync_router, prefix="/api", tags=["sync"])  # Дельта-синхронизация
+app.include_router(bootstrap_router, prefix="/api", tags=["bootstrap"])  # Стартовые данные Mini App
+app.include_router(batch_router, prefix="/api", tags=["batch"])  # Пакетные запросы
+app.include_router(exports_router, prefix="/api", tags=["export"])  # Потоковая выгрузка
 
 @app.get("/")
 async def root():
@@ -107,7 +137,8 @@ async def health_check():
         "status": "ok",
         "service": "api",
         "version": config.app_version,
-        "environment": config.environment
+        "environment": config.environment,
+        "log_dropped": dropped_records()
     }
 
 @app.get("/api/debug")
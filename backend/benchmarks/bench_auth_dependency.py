@@ -0,0 +1,104 @@
+"""
+Бенчмарк зависимости аутентификации
+Сравнивает get_current_user + get_current_user_model с выключенным кэшем
+пользователей (каждый запрос читает пользователя из БД) и с включенным
+(пользователь берется из кэша по id и версии из токена)
+
+Запуск:
+    python benchmarks/bench_auth_dependency.py [--requests 5000]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Добавляем путь к проекту
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Минимальное окружение и отдельная база, чтобы не трогать данные приложения
+_tmp_dir = tempfile.mkdtemp(prefix="bench-auth-")
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("WEB_APP_URL", "http://localhost")
+os.environ["DATA_DIR"] = _tmp_dir
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{Path(_tmp_dir) / 'bench.db'}"
+
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+
+from src.shared.auth.jwt_auth import create_token_response, get_current_user, get_current_user_model
+from src.shared.database.connection import engine, read_engine, init_database, async_session_factory, read_session_factory
+from src.shared.database.models import User
+from src.shared.utils.cache import users as user_cache
+
+selects = 0
+
+
+def count_select(conn, cursor, statement, parameters, context, executemany):
+    global selects
+    if statement.lstrip().upper().startswith("SELECT"):
+        selects += 1
+
+
+async def measure(token: str, requests: int):
+    """Среднее время аутентификации одного запроса (мкс) и SELECT на запрос"""
+    global selects
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    selects = 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        # Как в FastAPI: сессия чтения на запрос, общая для обеих зависимостей
+        async with read_session_factory() as session:
+            current_user = await get_current_user(None, credentials, session)
+            await get_current_user_model(current_user, session)
+    elapsed = time.perf_counter() - started
+    return elapsed / requests * 1_000_000, selects / requests
+
+
+async def main(requests: int):
+    print("=" * 60)
+    print("Бенчмарк аутентификации (get_current_user)")
+    print("=" * 60)
+
+    # Отладочные логи get_current_user измеряли бы скорость вывода, а не проверки
+    logging.disable(logging.INFO)
+
+    await init_database()
+    async with async_session_factory() as session:
+        user = User(telegram_id=42, username="bench", first_name="Bench")
+        session.add(user)
+        await session.commit()
+        token = create_token_response(user.to_dict())["access_token"]
+
+    for target in {engine.sync_engine, read_engine.sync_engine}:
+        event.listen(target, "before_cursor_execute", count_select)
+
+    # Прогрев пула соединений
+    await measure(token, 50)
+
+    ttl = user_cache.ttl
+    user_cache.ttl = 0
+    user_cache.clear()
+    db_us, db_selects = await measure(token, requests)
+
+    user_cache.ttl = ttl
+    cached_us, cached_selects = await measure(token, requests)
+
+    print(f"Запросов: {requests}")
+    print(f"Без кэша (БД):  {db_us:8.1f} мкс/запрос, SELECT на запрос: {db_selects:.2f}")
+    print(f"Кэш:            {cached_us:8.1f} мкс/запрос, SELECT на запрос: {cached_selects:.2f}")
+    print(f"Ускорение: x{db_us / cached_us:.1f}")
+
+    await engine.dispose()
+    await read_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк зависимости аутентификации")
+    parser.add_argument("--requests", type=int, default=5000, help="Количество запросов")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
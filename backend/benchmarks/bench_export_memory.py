@@ -0,0 +1,132 @@
+"""
+Бенчмарк памяти выгрузки записей
+История мастера за несколько лет выгружается в CSV двумя способами:
+
+    список  - все записи одним запросом в память, затем CSV (как постраничный
+              список, но без лимита)
+    поток   - stream_rows() из /api/export: курсор stream() + yield_per,
+              CSV частями по YIELD_PER строк
+
+Пик памяти меряется tracemalloc, тело ответа не накапливается.
+
+Запуск:
+    python benchmarks/bench_export_memory.py [--appointments 50000]
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Добавляем путь к проекту
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Отдельная база, чтобы не трогать данные приложения
+_tmp_dir = tempfile.mkdtemp(prefix="bench-export-")
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("WEB_APP_URL", "http://localhost")
+os.environ["DATA_DIR"] = _tmp_dir
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{Path(_tmp_dir) / 'bench.db'}"
+
+import logging
+
+from sqlalchemy import insert, select
+
+from src.features.api.exports import _csv_cell, stream_rows
+from src.shared.database.connection import engine, read_engine, init_database, async_session_factory, read_session_factory
+from src.shared.database.models import Appointment, AppointmentStatus, Client, Service, User
+
+
+async def seed(count: int) -> int:
+    await init_database()
+    async with async_session_factory() as session:
+        user = User(telegram_id=42, username="bench", first_name="Bench")
+        session.add(user)
+        await session.flush()
+        service = Service(user_id=user.id, name="Стрижка", price=1500, duration_minutes=60)
+        client = Client(user_id=user.id, first_name="Анна", last_name="Постоянная", phone="+79990000000")
+        session.add_all([service, client])
+        await session.flush()
+        start, now = datetime(2020, 1, 1, 9, 0), datetime.utcnow()
+        # Напрямую в таблицу: ORM-вставка десятков тысяч строк мерила бы не то
+        await session.execute(insert(Appointment), [
+            {"user_id": user.id, "service_id": service.id, "client_id": client.id,
+             "appointment_date": start + timedelta(hours=i), "ends_at": start + timedelta(hours=i, minutes=60),
+             "duration_minutes": 60, "status": AppointmentStatus.COMPLETED, "price": 1500.0,
+             "notes": "Комментарий к записи", "change_seq": i + 1, "created_at": now, "updated_at": now}
+            for i in range(count)
+        ])
+        await session.commit()
+        return user.id
+
+
+def export_statement(user_id: int):
+    return (
+        select(
+            Appointment.id, Appointment.appointment_date, Appointment.ends_at, Appointment.duration_minutes,
+            Appointment.status, Service.name.label("service"), Client.first_name.label("client_first_name"),
+            Client.phone.label("client_phone"), Appointment.price, Appointment.notes,
+        )
+        .join(Service, Appointment.service_id == Service.id)
+        .join(Client, Appointment.client_id == Client.id)
+        .where(Appointment.user_id == user_id)
+        .order_by(Appointment.appointment_date, Appointment.id)
+    )
+
+
+async def export_list(user_id: int) -> int:
+    """Все строки в память, затем один CSV"""
+    async with read_session_factory() as session:
+        rows = (await session.execute(export_statement(user_id))).all()
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_cell(value) for value in row] for row in rows)
+    return len(buffer.getvalue().encode())
+
+
+async def export_stream(user_id: int) -> int:
+    """Части из stream_rows() отправляются и сразу освобождаются"""
+    size = 0
+    async for chunk in stream_rows(export_statement(user_id), "csv", "appointments"):
+        size += len(chunk)
+    return size
+
+
+async def measure(export, user_id: int):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = await export(user_id)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, peak, elapsed
+
+
+async def main(count: int):
+    print("=" * 60)
+    print(f"Выгрузка {count} записей в CSV: список vs поток")
+    print("=" * 60)
+
+    logging.disable(logging.INFO)
+    user_id = await seed(count)
+
+    for name, export in (("список", export_list), ("поток", export_stream)):
+        await export(user_id)  # прогрев
+        size, peak, elapsed = await measure(export, user_id)
+        print(f"{name:<7} пик памяти {peak / 1024 / 1024:7.1f} МБ, {elapsed * 1000:8.1f} мс, CSV {size / 1024 / 1024:.1f} МБ")
+
+    await engine.dispose()
+    await read_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк памяти выгрузки записей")
+    parser.add_argument("--appointments", type=int, default=50000, help="Записей в истории мастера")
+    args = parser.parse_args()
+    asyncio.run(main(args.appointments))
@@ -0,0 +1,105 @@
+"""
+Бенчмарк проверки initData Telegram WebApp
+Сравнивает пропускную способность прежней проверки (unquote + parse_qs,
+секретный ключ для каждого токена на каждый вход, сравнение через ==),
+текущей без кэша и повторного входа с уже проверенными initData
+
+Запуск:
+    python benchmarks/bench_init_data.py [--iterations 20000]
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlencode
+
+# Добавляем путь к проекту
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Минимальное окружение до импорта конфигурации
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("WEB_APP_URL", "http://localhost")
+os.environ.setdefault("DATA_DIR", "/tmp/bench-init-data")
+
+from src.shared.auth.telegram_auth import validate_telegram_init_data, webapp_secret_key, _validated_init_data
+
+# Основной и клиентский бот: initData подписаны вторым, как при записи клиента
+TOKENS = ["1234567890:main-bot-token-AAAAAAAAAAAAAAAAAAAAAAA", "9876543210:client-bot-token-BBBBBBBBBBBBBBBBBBBB"]
+
+
+def build_init_data() -> str:
+    """initData, подписанные клиентским ботом"""
+    fields = {
+        "query_id": "AAHdF6IQAAAAAN0XohDhrOrc",
+        "user": json.dumps({
+            "id": 279058397, "first_name": "Анна", "last_name": "Иванова", "username": "anna_beauty",
+            "language_code": "ru", "allows_write_to_pm": True,
+            "photo_url": "https://t.me/i/userpic/320/anna.svg",
+        }, ensure_ascii=False, separators=(",", ":")),
+        "auth_date": str(int(time.time())),
+    }
+    data_check_string = "\n".join(f"{key}={fields[key]}" for key in sorted(fields))
+    fields["hash"] = hmac.new(webapp_secret_key(TOKENS[1]), data_check_string.encode(), hashlib.sha256).hexdigest()
+    return urlencode(fields)
+
+
+def legacy_validate(init_data: str, tokens):
+    """Прежняя проверка без логирования"""
+    parsed_data = parse_qs(unquote(init_data))
+    received_hash = parsed_data.get('hash', [None])[0]
+    data_check_string = '\n'.join(f"{key}={parsed_data[key][0]}" for key in sorted(parsed_data) if key != 'hash')
+    for token in tokens:
+        secret_key = hmac.new("WebAppData".encode(), token.encode(), hashlib.sha256).digest()
+        calculated_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+        if calculated_hash == received_hash:
+            return json.loads(parsed_data['user'][0])
+    raise ValueError("hash mismatch")
+
+
+def measure(validate, init_data: str, iterations: int) -> float:
+    """Проверок в секунду"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        validate(init_data, TOKENS)
+    return iterations / (time.perf_counter() - started)
+
+
+def main(iterations: int):
+    print("=" * 60)
+    print("Бенчмарк проверки initData")
+    print("=" * 60)
+
+    # Логи проверки измеряли бы скорость вывода, а не HMAC
+    logging.disable(logging.CRITICAL)
+
+    init_data = build_init_data()
+    assert legacy_validate(init_data, TOKENS) == validate_telegram_init_data(init_data, TOKENS)
+
+    legacy = measure(legacy_validate, init_data, iterations)
+
+    ttl = _validated_init_data.ttl
+    _validated_init_data.ttl = 0
+    _validated_init_data.clear()
+    uncached = measure(validate_telegram_init_data, init_data, iterations)
+
+    _validated_init_data.ttl = ttl
+    validate_telegram_init_data(init_data, TOKENS)
+    cached = measure(validate_telegram_init_data, init_data, iterations)
+
+    print(f"Проверок: {iterations}, длина initData: {len(init_data)}")
+    print(f"Прежняя проверка:       {legacy:10.0f} проверок/с")
+    print(f"Текущая без кэша:       {uncached:10.0f} проверок/с (x{uncached / legacy:.1f})")
+    print(f"Повторный вход (кэш):   {cached:10.0f} проверок/с (x{cached / legacy:.1f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк проверки initData")
+    parser.add_argument("--iterations", type=int, default=20000, help="Количество проверок")
+    args = parser.parse_args()
+    main(args.iterations)
@@ -0,0 +1,125 @@
+"""
+Бенчмарк задержки при интенсивном логировании
+Конкурентные "запросы" на event loop пишут по несколько INFO записей в
+файл с ротацией. Сравниваются синхронные handlers (запись на диск прямо
+из event loop) и очередь с потоком QueueListener (LOG_QUEUE_SIZE).
+
+--slow-us добавляет handler с задержкой на запись - медленный диск или
+заполненный pipe консоли, на котором синхронный вывод блокирует loop.
+
+Запуск:
+    python benchmarks/bench_log_pipeline.py [--requests 5000] [--lines 20] [--slow-us 0]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Добавляем путь к проекту
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.shared.logger.pipeline import dropped_records, stop_queue_logging
+from src.shared.logger.setup import setup_logging
+
+logger = logging.getLogger("bench.requests")
+
+
+class SlowHandler(logging.Handler):
+    """Имитирует медленное устройство вывода"""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def emit(self, record):
+        time.sleep(self.delay)
+
+
+async def handle_request(request_id: int, lines: int) -> float:
+    started = time.perf_counter()
+    for line in range(lines):
+        logger.info("📡 Запрос %s: шаг %s, пользователь %s", request_id, line, request_id % 100)
+        await asyncio.sleep(0)
+    return time.perf_counter() - started
+
+
+async def run(requests: int, lines: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def worker(request_id: int):
+        async with semaphore:
+            latencies.append(await handle_request(request_id, lines))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(requests)))
+    return sorted(latencies), time.perf_counter() - started
+
+
+def percentile(values, share: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * share))] * 1000
+
+
+def measure(mode: str, args, log_dir: str):
+    setup_logging(
+        log_file=str(Path(log_dir) / f"{mode}.log"),
+        max_bytes=1024 * 1024,  # частая ротация - как на боевом логе за длинный период
+        backup_count=3,
+        level=logging.INFO,
+        queue_size=args.queue_size if mode == "queue" else 0,
+    )
+    if args.slow_us:
+        slow = SlowHandler(args.slow_us / 1_000_000)
+        root_logger = logging.getLogger()
+        if mode == "queue":
+            # Handler потока вывода - к ним же добавляем медленный
+            from src.shared.logger import pipeline
+            pipeline._listener.handlers += (slow,)
+        else:
+            root_logger.addHandler(slow)
+
+    latencies, elapsed = asyncio.run(run(args.requests, args.lines, args.concurrency))
+    dropped = dropped_records()
+
+    flush_started = time.perf_counter()
+    stop_queue_logging()
+    flush_ms = (time.perf_counter() - flush_started) * 1000
+    return latencies, elapsed, dropped, flush_ms
+
+
+def main(args):
+    print("=" * 60)
+    print("Задержка запросов при интенсивном логировании")
+    print("=" * 60)
+
+    log_dir = tempfile.mkdtemp(prefix="bench-log-")
+    # Консольный handler пишет в stderr - уводим его в /dev/null
+    stderr = sys.stderr
+    sys.stderr = open(os.devnull, "w")
+    try:
+        results = {mode: measure(mode, args, log_dir) for mode in ("sync", "queue")}
+    finally:
+        sys.stderr.close()
+        sys.stderr = stderr
+
+    print(f"Запросов: {args.requests}, записей на запрос: {args.lines}, "
+          f"параллельно: {args.concurrency}, задержка вывода: {args.slow_us} мкс")
+    print(f"{'Режим':<6} {'p50 мс':>8} {'p99 мс':>8} {'max мс':>8} {'запр/с':>8} {'отброшено':>10} {'дозапись мс':>12}")
+    for mode, (latencies, elapsed, dropped, flush_ms) in results.items():
+        print(f"{mode:<6} {percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.99):>8.2f} "
+              f"{latencies[-1] * 1000:>8.2f} {args.requests / elapsed:>8.0f} {dropped:>10} {flush_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк задержки при интенсивном логировании")
+    parser.add_argument("--requests", type=int, default=5000, help="Количество запросов")
+    parser.add_argument("--lines", type=int, default=20, help="Записей лога на запрос")
+    parser.add_argument("--concurrency", type=int, default=50, help="Одновременных запросов")
+    parser.add_argument("--queue-size", type=int, default=10000, help="Размер очереди (LOG_QUEUE_SIZE)")
+    parser.add_argument("--slow-us", type=int, default=0, help="Задержка вывода одной записи, мкс")
+    main(parser.parse_args())
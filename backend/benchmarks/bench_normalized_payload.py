@@ -0,0 +1,107 @@
+"""
+Бенчмарк normalized ответа списка записей
+Загруженный месяц мастера: записи за 30 дней с небольшим набором услуг и
+постоянных клиентов. GET /api/appointments/ за месяц одной страницей
+запрашивается в формате nested (услуга и клиент в каждой записи, JOIN) и
+normalized (словари services/clients, запрос по id) - сравниваются размер
+ответа и время сервера.
+
+Запуск:
+    python benchmarks/bench_normalized_payload.py [--per-day 25] [--requests 50]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Добавляем путь к проекту
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Отдельная база, чтобы не трогать данные приложения
+_tmp_dir = tempfile.mkdtemp(prefix="bench-normalized-")
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("WEB_APP_URL", "http://localhost")
+os.environ["DATA_DIR"] = _tmp_dir
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{Path(_tmp_dir) / 'bench.db'}"
+
+import logging
+
+import httpx
+
+from api_server import app
+from src.shared.auth.jwt_auth import create_token_response
+from src.shared.database.connection import engine, read_engine, init_database, async_session_factory
+from src.shared.database.models import Appointment, AppointmentStatus, Client, Service, User
+
+async def seed(per_day: int):
+    await init_database()
+    async with async_session_factory() as session:
+        user = User(telegram_id=42, username="bench", first_name="Bench")
+        session.add(user)
+        await session.flush()
+        services = [Service(user_id=user.id, name=f"Услуга {i}", description="Описание услуги " * 5,
+                            price=1000 + i * 100, duration_minutes=30, color="#3366ff") for i in range(8)]
+        clients = [Client(user_id=user.id, first_name=f"Клиент {i}", last_name="Постоянный",
+                          phone=f"+7999000{i:04d}", notes="Предпочитает утро") for i in range(60)]
+        session.add_all(services + clients)
+        await session.flush()
+        start = datetime(2030, 3, 1, 9, 0)
+        session.add_all(
+            Appointment(
+                user_id=user.id, service_id=services[(day + slot) % 8].id, client_id=clients[(day * per_day + slot) % 60].id,
+                appointment_date=start + timedelta(days=day, minutes=30 * slot), duration_minutes=30,
+                status=AppointmentStatus.CONFIRMED, price=1000.0,
+            )
+            for day in range(30) for slot in range(per_day)
+        )
+        await session.commit()
+        return create_token_response(user.to_dict())["access_token"]
+
+
+async def main(per_day: int, requests: int):
+    print("=" * 60)
+    print("Список записей за месяц: nested vs normalized")
+    print("=" * 60)
+
+    # Логи запросов мерили бы вывод, а не сериализацию
+    logging.disable(logging.INFO)
+    token = await seed(per_day)
+    month = per_day * 30
+    params = {"date_from": "2030-03-01", "date_to": "2030-03-31", "limit": month}
+
+    results = {}
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", headers=headers) as client:
+        for response_format in ("nested", "normalized"):
+            query = {**params, "format": response_format}
+            response = await client.get("/api/appointments/", params=query)  # прогрев
+            assert response.status_code == 200, response.text
+            assert len(response.json()["appointments"]) == month
+
+            started = time.perf_counter()
+            for _ in range(requests):
+                await client.get("/api/appointments/", params=query)
+            elapsed = (time.perf_counter() - started) / requests * 1000
+            results[response_format] = (len(response.content), elapsed)
+
+    print(f"Записей за месяц: {month} (услуг: 8, клиентов: 60)")
+    for response_format, (size, elapsed) in results.items():
+        print(f"{response_format:<11} {size / 1024:8.1f} КБ  {elapsed:8.2f} мс/запрос")
+    nested, normalized = results["nested"], results["normalized"]
+    print(f"Размер: -{1 - normalized[0] / nested[0]:.0%}, время: -{1 - normalized[1] / nested[1]:.0%}")
+
+    await engine.dispose()
+    await read_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк normalized ответа списка записей")
+    parser.add_argument("--per-day", type=int, default=25, help="Записей в день")
+    parser.add_argument("--requests", type=int, default=50, help="Запросов на формат")
+    args = parser.parse_args()
+    asyncio.run(main(args.per_day, args.requests))
@@ -0,0 +1,131 @@
+"""
+Бенчмарк проверки пересечений записей
+Сравнивает прежний запрос (конец записи вычисляется в WHERE) с запросом по
+хранимой колонке ends_at и индексу (user_id, status, appointment_date, ends_at)
+на истории одного мастера разного размера
+
+Запуск:
+    python benchmarks/bench_overlap_query.py [--sizes 10000 100000 1000000] [--queries 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Добавляем путь к проекту
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Минимальное окружение, чтобы конфигурация загрузилась без .env
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("WEB_APP_URL", "http://localhost")
+os.environ.setdefault("DATA_DIR", tempfile.gettempdir())
+
+from sqlalchemy import Integer, cast, create_engine, func, insert, select, text
+
+from src.shared.database.models import Base, User, Service, Client, Appointment, AppointmentStatus
+from src.shared.database.backends import apply_sqlite_profile
+from src.shared.utils.appointment_utils import MAX_APPOINTMENT_DURATION_MINUTES
+
+ACTIVE = [AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED]
+START = datetime(2020, 1, 1, 9, 0)
+INDEX_NAME = "ix_appointments_user_status_period"
+
+
+def legacy_query(start: datetime, end: datetime):
+    """Прежний запрос: конец существующей записи вычисляется для каждой строки"""
+    start_seconds = cast(func.strftime('%s', Appointment.appointment_date), Integer)
+    return select(Appointment.id).where(
+        Appointment.user_id == 1,
+        Appointment.status.in_(ACTIVE),
+        Appointment.appointment_date < end,
+        start_seconds + Appointment.duration_minutes * 60 > cast(func.strftime('%s', start), Integer),
+    ).limit(1)
+
+
+def stored_query(start: datetime, end: datetime):
+    """Текущий запрос (check_appointment_overlap): полуинтервалы по хранимым колонкам"""
+    return select(Appointment.id).where(
+        Appointment.user_id == 1,
+        Appointment.status.in_(ACTIVE),
+        Appointment.appointment_date < end,
+        Appointment.appointment_date >= start - timedelta(minutes=MAX_APPOINTMENT_DURATION_MINUTES),
+        Appointment.ends_at > start,
+    ).limit(1)
+
+
+def populate(engine, size: int):
+    """История мастера: записи по часу подряд, активны только последние 5%"""
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(id=1, username="bench", first_name="Bench"))
+        conn.execute(insert(Service).values(id=1, user_id=1, name="s", price=1, duration_minutes=60))
+        conn.execute(insert(Client).values(id=1, user_id=1, first_name="c"))
+        active_from = int(size * 0.95)
+        chunk = []
+        for i in range(size):
+            starts = START + timedelta(hours=i)
+            chunk.append({
+                "user_id": 1, "service_id": 1, "client_id": 1,
+                "appointment_date": starts, "duration_minutes": 60,
+                "ends_at": starts + timedelta(minutes=60),
+                "status": AppointmentStatus.CONFIRMED if i >= active_from else AppointmentStatus.COMPLETED,
+                "created_at": starts, "updated_at": starts,
+            })
+            if len(chunk) == 50_000:
+                conn.execute(insert(Appointment.__table__), chunk)
+                chunk = []
+        if chunk:
+            conn.execute(insert(Appointment.__table__), chunk)
+
+
+def measure(engine, build_query, size: int, queries: int) -> float:
+    """Среднее время проверки свободного слота в конце истории, мкс"""
+    start = START + timedelta(hours=size + 1)
+    end = start + timedelta(minutes=60)
+    with engine.connect() as conn:
+        conn.execute(build_query(start, end)).first()  # Прогрев кэша страниц
+        started = time.perf_counter()
+        for _ in range(queries):
+            assert conn.execute(build_query(start, end)).first() is None
+        return (time.perf_counter() - started) / queries * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🚀 Проверка пересечений на истории одного мастера")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            engine = create_engine(f"sqlite:///{Path(tmp) / f'bench_{size}.db'}")
+            apply_sqlite_profile(engine)
+            Base.metadata.create_all(engine)
+            with engine.begin() as conn:
+                # Схема до миграции 004: только одиночные индексы
+                conn.execute(text(f"DROP INDEX {INDEX_NAME}"))
+            populate(engine, size)
+
+            legacy = measure(engine, legacy_query, size, args.queries)
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"CREATE INDEX {INDEX_NAME} ON appointments (user_id, status, appointment_date, ends_at)"
+                ))
+            stored = measure(engine, stored_query, size, args.queries)
+            engine.dispose()
+
+            print(
+                f"{size:>9} записей: прежний {legacy:10.0f} мкс, "
+                f"ends_at + индекс {stored:6.0f} мкс (x{legacy / stored:.0f})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Бенчмарк глубоких страниц списка записей
+Сравнивает LIMIT/OFFSET и курсорную пагинацию (KeysetPaginator) на одной
+и той же глубине истории мастера
+
+Запуск:
+    python benchmarks/bench_pagination.py [--rows 200000] [--page 50] [--queries 20]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Добавляем путь к проекту
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Минимальное окружение, чтобы конфигурация загрузилась без .env
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("WEB_APP_URL", "http://localhost")
+os.environ.setdefault("DATA_DIR", tempfile.gettempdir())
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from src.shared.database.models import Base, User, Service, Client, Appointment, AppointmentStatus
+from src.shared.database.backends import apply_sqlite_profile
+from src.shared.utils.pagination import KeysetPaginator, encode_cursor
+
+START = datetime(2020, 1, 1, 9, 0)
+
+
+def populate(engine, rows: int):
+    """История мастера: по одной записи в час"""
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(id=1, username="bench", first_name="Bench"))
+        conn.execute(insert(Service).values(id=1, user_id=1, name="s", price=1, duration_minutes=60))
+        conn.execute(insert(Client).values(id=1, user_id=1, first_name="c"))
+        chunk = []
+        for i in range(rows):
+            starts = START + timedelta(hours=i)
+            chunk.append({
+                "user_id": 1, "service_id": 1, "client_id": 1,
+                "appointment_date": starts, "duration_minutes": 60,
+                "ends_at": starts + timedelta(minutes=60), "status": AppointmentStatus.COMPLETED,
+                "created_at": starts, "updated_at": starts,
+            })
+            if len(chunk) == 50_000:
+                conn.execute(insert(Appointment.__table__), chunk)
+                chunk = []
+        if chunk:
+            conn.execute(insert(Appointment.__table__), chunk)
+
+
+def measure(session: Session, build_query, queries: int) -> float:
+    """Среднее время загрузки страницы, мс"""
+    session.execute(build_query()).all()  # Прогрев кэша страниц
+    started = time.perf_counter()
+    for _ in range(queries):
+        session.execute(build_query()).scalars().all()
+        session.expunge_all()
+    return (time.perf_counter() - started) / queries * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"🚀 Список записей: {args.rows} строк, страница {args.page}")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        apply_sqlite_profile(engine)
+        Base.metadata.create_all(engine)
+        populate(engine, args.rows)
+
+        base_query = select(Appointment).where(Appointment.user_id == 1)
+        with Session(engine) as session:
+            for depth in (0, 1_000, 10_000, 100_000, args.rows - args.page):
+                if depth > args.rows - args.page:
+                    continue
+
+                def offset_query():
+                    return base_query.order_by(
+                        Appointment.appointment_date.desc(), Appointment.id.desc()
+                    ).limit(args.page).offset(depth)
+
+                # Курсор указывает на строку перед страницей (как next_cursor предыдущей)
+                cursor = None
+                if depth:
+                    position = args.rows - depth  # Строки идут по убыванию даты, id = позиция
+                    cursor = encode_cursor(START + timedelta(hours=position), position + 1)
+
+                def keyset_query():
+                    return KeysetPaginator(Appointment.appointment_date, Appointment.id, cursor, args.page).apply(base_query)
+
+                first_offset = session.execute(offset_query()).scalars().first().id
+                first_keyset = session.execute(keyset_query()).scalars().first().id
+                assert first_offset == first_keyset, f"Страницы не совпали: {first_offset} != {first_keyset}"
+                session.expunge_all()
+
+                offset_ms = measure(session, offset_query, args.queries)
+                keyset_ms = measure(session, keyset_query, args.queries)
+                print(f"глубина {depth:>7}: offset {offset_ms:8.2f} мс, курсор {keyset_ms:6.2f} мс")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Количество SQL-запросов на HTTP-запрос
+Прогоняет основные эндпоинты API через ASGI-транспорт на временной базе и
+считает выражения, отправленные в пишущий и читающий пулы
+
+Запуск:
+    python benchmarks/bench_queries_per_request.py [--show-sql]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+# Добавляем путь к проекту
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Отдельная база, чтобы не трогать данные приложения
+_tmp_dir = tempfile.mkdtemp(prefix="bench-queries-")
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("WEB_APP_URL", "http://localhost")
+os.environ["DATA_DIR"] = _tmp_dir
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{Path(_tmp_dir) / 'bench.db'}"
+
+import httpx
+from sqlalchemy import event
+
+from api_server import app
+from src.shared.database.connection import engine, read_engine, init_database, async_session_factory
+from src.shared.database.models import User
+from src.shared.auth.jwt_auth import create_token_response
+
+statements = Counter()
+show_sql = False
+
+
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    # BEGIN/SAVEPOINT - служебные, считаем только запросы к данным
+    if statement.split(None, 1)[0].upper() in ("SELECT", "INSERT", "UPDATE", "DELETE"):
+        statements["total"] += 1
+        if show_sql:
+            print("         ", " ".join(statement.split())[:100])
+
+
+async def main():
+    print("=" * 60)
+    print("SQL-запросы на один HTTP-запрос")
+    print("=" * 60)
+
+    await init_database()
+    for target in {engine.sync_engine, read_engine.sync_engine}:
+        event.listen(target, "before_cursor_execute", count_statement)
+
+    async with async_session_factory() as session:
+        user = User(telegram_id=42, username="bench", first_name="Bench")
+        session.add(user)
+        await session.commit()
+        tokens = create_token_response(user.to_dict())
+
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", headers=headers) as client:
+        async def call(method: str, url: str, **kwargs):
+            statements.clear()
+            response = await client.request(method, url, **kwargs)
+            print(f"{method:>6} {url:<40} {response.status_code}  запросов: {statements['total']}")
+            return response
+
+        service = (await call("POST", "/api/services/", json={"name": "Стрижка", "price": 1000, "duration_minutes": 60})).json()
+        customer = (await call("POST", "/api/clients/", json={"first_name": "Клиент"})).json()
+        await call("GET", "/api/services/")
+        await call("GET", f"/api/services/{service['id']}")
+        await call("PUT", f"/api/services/{service['id']}", json={"price": 1200})
+        await call("GET", "/api/clients/")
+        await call("GET", f"/api/clients/{customer['id']}")
+        appointment = (await call("POST", "/api/appointments/", json={
+            "service_id": service["id"], "client_id": customer["id"], "appointment_date": "2030-01-01T10:00:00"
+        })).json()
+        await call("GET", "/api/appointments/")
+        await call("PUT", f"/api/appointments/{appointment['id']}", json={"status": "confirmed"})
+        await call("GET", "/api/schedule")
+        await call("GET", "/api/profiles/")
+        await call("PUT", "/api/profiles/", json={"business_name": "Студия"})
+
+    await engine.dispose()
+    await read_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Количество SQL-запросов на HTTP-запрос")
+    parser.add_argument("--show-sql", action="store_true", help="Печатать каждое выражение")
+    show_sql = parser.parse_args().show_sql
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""
+Бенчмарк инициализации схемы при старте процессов
+Одновременно запускает N процессов (API и два бота) на уже актуальной базе
+и сравнивает прежний create_all при каждом старте с проверкой ревизии Alembic
+
+Запуск:
+    python benchmarks/bench_schema_bootstrap.py [--processes 3] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Добавляем путь к проекту
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def child(mode: str):
+    """Процесс-участник: инициализирует базу и печатает время в мс"""
+    from src.shared.database.connection import engine, init_database
+    from src.shared.database.models import Base
+
+    async def legacy_init():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    started = time.perf_counter()
+    asyncio.run(init_database() if mode == "versioned" else legacy_init())
+    print(f"{(time.perf_counter() - started) * 1000:.2f}")
+
+
+def run_round(mode: str, processes: int, env: dict) -> list:
+    """Одновременный старт процессов, возвращает время инициализации каждого"""
+    workers = [
+        subprocess.Popen(
+            [sys.executable, __file__, "--child", mode],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        for _ in range(processes)
+    ]
+    timings = []
+    for worker in workers:
+        out, _ = worker.communicate()
+        if worker.returncode != 0:
+            raise SystemExit(f"❌ Процесс завершился с кодом {worker.returncode}")
+        timings.append(float(out.strip().splitlines()[-1]))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--child", choices=["legacy", "versioned"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    print("=" * 60)
+    print(f"🚀 Старт {args.processes} процессов, {args.rounds} раундов")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            BOT_TOKEN="benchmark",
+            WEB_APP_URL="http://localhost",
+            DATA_DIR=tmp,
+            DATABASE_URL=f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}",
+        )
+        # Первый запуск создает схему и помечает ревизию
+        run_round("versioned", 1, env)
+
+        for label, mode in (("create_all", "legacy"), ("ревизия", "versioned")):
+            timings = [t for _ in range(args.rounds) for t in run_round(mode, args.processes, env)]
+            print(
+                f"{label:>12}: медиана {statistics.median(timings):6.1f} мс, "
+                f"максимум {max(timings):6.1f} мс"
+            )
+
+
+if __name__ == "__main__":
+    main()
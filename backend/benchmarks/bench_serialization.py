@@ -0,0 +1,128 @@
+"""
+Бенчмарк сериализации страницы записей
+Страница из 500 записей с услугой и клиентом кодируется тремя способами:
+
+    to_dict     - to_dict() + jsonable_encoder + JSONResponse (как раньше)
+    serializer  - appointment_serializer + FastJSONResponse (orjson)
+    calendar    - то же с ?fields= для календаря (время, услуга, имя клиента)
+
+Запуск:
+    python benchmarks/bench_serialization.py [--page 500] [--rounds 50]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Добавляем путь к проекту
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Отдельная база, чтобы не трогать данные приложения
+_tmp_dir = tempfile.mkdtemp(prefix="bench-serialization-")
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("WEB_APP_URL", "http://localhost")
+os.environ["DATA_DIR"] = _tmp_dir
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{Path(_tmp_dir) / 'bench.db'}"
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from src.shared.database.connection import engine, read_engine, init_database, async_session_factory
+from src.shared.database.models import Appointment, AppointmentStatus, Client, Service, User
+from src.shared.database.serializers import appointment_serializer
+from src.shared.http import FastJSONResponse
+
+
+def old_render(appointments, meta):
+    content = {"appointments": [appointment.to_dict() for appointment in appointments], **meta}
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def new_render(appointments, meta):
+    return FastJSONResponse({"appointments": appointment_serializer.many(appointments), **meta}).body
+
+
+CALENDAR_FIELDS = "id,appointment_date,ends_at,status,service.name,service.color,client.first_name"
+calendar_serializer, _ = appointment_serializer.sparse(CALENDAR_FIELDS)
+
+
+def calendar_render(appointments, meta):
+    return FastJSONResponse({"appointments": calendar_serializer.many(appointments), **meta}).body
+
+
+def measure(render, appointments, meta, rounds: int) -> float:
+    """Среднее время кодирования страницы (мс)"""
+    render(appointments, meta)  # прогрев
+    started = time.perf_counter()
+    for _ in range(rounds):
+        render(appointments, meta)
+    return (time.perf_counter() - started) / rounds * 1000
+
+
+async def load_page(page: int):
+    await init_database()
+    async with async_session_factory() as session:
+        user = User(telegram_id=42, username="bench", first_name="Bench")
+        session.add(user)
+        await session.flush()
+        services = [Service(user_id=user.id, name=f"Услуга {i}", price=1000 + i, duration_minutes=60) for i in range(10)]
+        clients = [Client(user_id=user.id, first_name=f"Клиент {i}", phone=f"+7999000{i:04d}") for i in range(100)]
+        session.add_all(services + clients)
+        await session.flush()
+        start = datetime(2030, 1, 1, 9, 0)
+        session.add_all(
+            Appointment(
+                user_id=user.id, service_id=services[i % 10].id, client_id=clients[i % 100].id,
+                appointment_date=start + timedelta(hours=i), duration_minutes=60,
+                status=AppointmentStatus.CONFIRMED, price=1000.0, notes="Комментарий к записи",
+            )
+            for i in range(page)
+        )
+        await session.commit()
+
+    async with async_session_factory() as session:
+        result = await session.execute(
+            select(Appointment).options(joinedload(Appointment.service), joinedload(Appointment.client))
+            .order_by(Appointment.appointment_date).limit(page)
+        )
+        return result.scalars().unique().all()
+
+
+def main(page: int, rounds: int):
+    print("=" * 60)
+    print(f"Сериализация страницы из {page} записей")
+    print("=" * 60)
+
+    appointments = asyncio.run(load_page(page))
+    meta = {"total": page, "limit": page, "offset": 0, "next_cursor": None, "prev_cursor": None}
+
+    old_body, new_body = old_render(appointments, meta), new_render(appointments, meta)
+    assert orjson.loads(old_body) == orjson.loads(new_body), "Ответы должны совпадать"
+
+    old_ms = measure(old_render, appointments, meta, rounds)
+    new_ms = measure(new_render, appointments, meta, rounds)
+    calendar_ms = measure(calendar_render, appointments, meta, rounds)
+    calendar_body = calendar_render(appointments, meta)
+    print(f"to_dict + jsonable_encoder: {old_ms:8.2f} мс/страница, {len(old_body) / 1024:7.1f} КБ")
+    print(f"serializer + orjson:        {new_ms:8.2f} мс/страница, {len(new_body) / 1024:7.1f} КБ")
+    print(f"?fields= календаря:         {calendar_ms:8.2f} мс/страница, {len(calendar_body) / 1024:7.1f} КБ")
+    print(f"Ускорение: x{old_ms / new_ms:.1f}")
+
+    asyncio.run(engine.dispose())
+    asyncio.run(read_engine.dispose())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк сериализации страницы записей")
+    parser.add_argument("--page", type=int, default=500, help="Записей на странице")
+    parser.add_argument("--rounds", type=int, default=50, help="Повторов")
+    args = parser.parse_args()
+    main(args.page, args.rounds)
@@ -0,0 +1,99 @@
+"""
+Бенчмарк жизненного цикла сессии get_session()
+Сравнивает накладные расходы на запрос для чтения списка: прежний цикл
+(flush + commit + expire_all всегда) и текущий, который пропускает коммит,
+если запрос ничего не записал
+
+Запуск:
+    python benchmarks/bench_session_lifecycle.py [--requests 2000] [--clients 50]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Добавляем путь к проекту
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Минимальное окружение и отдельная база, чтобы не трогать данные приложения
+_tmp_dir = tempfile.mkdtemp(prefix="bench-session-")
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("WEB_APP_URL", "http://localhost")
+os.environ["DATA_DIR"] = _tmp_dir
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{Path(_tmp_dir) / 'bench.db'}"
+
+from sqlalchemy import insert, select
+
+from src.shared.database.models import Base, User, Client
+from src.shared.database.connection import engine, async_session_factory, get_session
+
+
+async def legacy_get_session():
+    """Прежний get_session(): коммит и expire_all после каждого запроса"""
+    async with async_session_factory() as session:
+        try:
+            yield session
+            await session.flush()
+            await session.commit()
+            session.expire_all()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+
+async def list_clients(session):
+    """Тело эндпоинта списка клиентов"""
+    result = await session.execute(select(Client).where(Client.user_id == 1).limit(50))
+    return [client.to_dict() for client in result.scalars().all()]
+
+
+async def measure(dependency, requests: int) -> float:
+    """Среднее время запроса в микросекундах"""
+    started = time.perf_counter()
+    for _ in range(requests):
+        async for session in dependency():
+            await list_clients(session)
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+
+async def run(requests: int, clients: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User).values(id=1, username="bench", first_name="Bench"))
+        await conn.execute(insert(Client), [
+            {"user_id": 1, "first_name": f"Клиент {i}"} for i in range(clients)
+        ])
+
+    # Прогрев пула и кэша запросов
+    await measure(get_session, 50)
+
+    legacy = await measure(legacy_get_session, requests)
+    lean = await measure(get_session, requests)
+    await engine.dispose()
+    return legacy, lean
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=50)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"🚀 Список клиентов: {args.requests} запросов, {args.clients} строк")
+    print("=" * 60)
+
+    legacy, lean = asyncio.run(run(args.requests, args.clients))
+    print(f"{'commit всегда':>16}: {legacy:8.0f} мкс/запрос")
+    print(f"{'без коммита':>16}: {lean:8.0f} мкс/запрос")
+    print(f"{'экономия':>16}: {legacy - lean:8.0f} мкс/запрос ({(legacy - lean) / legacy:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Бенчмарк профиля соединения SQLite
+Сравнивает смешанную нагрузку чтение/запись с настройками по умолчанию
+(rollback journal) и с производственным профилем (WAL, busy_timeout, mmap...)
+
+Запуск:
+    python benchmarks/bench_sqlite_profile.py [--workers 8] [--seconds 5] [--write-ratio 0.2]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Добавляем путь к проекту
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Минимальное окружение, чтобы конфигурация загрузилась без .env
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("WEB_APP_URL", "http://localhost")
+os.environ.setdefault("DATA_DIR", tempfile.gettempdir())
+
+from sqlalchemy import select, func, insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.shared.database.models import Base, User, Client
+from src.shared.database.connection import apply_sqlite_profile
+
+
+async def run_workload(db_path: Path, use_profile: bool, workers: int, seconds: float, write_ratio: float) -> dict:
+    """Запускает смешанную нагрузку и возвращает счетчики операций"""
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_path}",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=workers,
+        max_overflow=0,
+    )
+    if use_profile:
+        apply_sqlite_profile(engine.sync_engine)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User).values(id=1, username="bench", first_name="Bench"))
+
+    stats = {"reads": 0, "writes": 0, "locked": 0}
+    deadline = time.perf_counter() + seconds
+
+    async def worker(worker_id: int):
+        rnd = random.Random(worker_id)
+        while time.perf_counter() < deadline:
+            try:
+                if rnd.random() < write_ratio:
+                    async with engine.begin() as conn:
+                        await conn.execute(insert(Client).values(user_id=1, first_name=f"c{worker_id}"))
+                    stats["writes"] += 1
+                else:
+                    async with engine.connect() as conn:
+                        await conn.execute(select(func.count(Client.id)).where(Client.user_id == 1))
+                    stats["reads"] += 1
+            except OperationalError:
+                # "database is locked" - именно то, от чего должен спасать профиль
+                stats["locked"] += 1
+
+    await asyncio.gather(*(worker(i) for i in range(workers)))
+    await engine.dispose()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"🚀 SQLite: {args.workers} воркеров, {args.seconds}s, доля записей {args.write_ratio:.0%}")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, use_profile in (("по умолчанию", False), ("профиль", True)):
+            db_path = Path(tmp) / f"bench_{int(use_profile)}.db"
+            stats = asyncio.run(run_workload(db_path, use_profile, args.workers, args.seconds, args.write_ratio))
+            total = stats["reads"] + stats["writes"]
+            print(
+                f"{label:>14}: {total / args.seconds:9.0f} оп/с "
+                f"(чтений {stats['reads']}, записей {stats['writes']}, locked {stats['locked']})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Профиль логирования на списочных эндпоинтах
+Прогоняет GET /api/clients/, /api/services/ и /api/appointments/ через
+ASGI-транспорт с файловым логом и сравнивает две политики:
+
+    debug   - все записи уровня DEBUG и выше без выборки (как раньше писались
+              диагностики токена и шаги запросов)
+    sampled - уровень INFO и выборка списочных роутов (LOG_SAMPLE_RATES)
+
+Для каждой политики печатается процессорное время на запрос, число
+записей в логе и доля времени внутри Logger._log по cProfile.
+
+Запуск:
+    python benchmarks/profile_list_logging.py [--requests 1000] [--rate 0.1]
+"""
+
+import argparse
+import asyncio
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Добавляем путь к проекту
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Отдельная база и лог, чтобы не трогать данные приложения
+_tmp_dir = tempfile.mkdtemp(prefix="profile-logging-")
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("WEB_APP_URL", "http://localhost")
+os.environ["DATA_DIR"] = _tmp_dir
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{Path(_tmp_dir) / 'bench.db'}"
+
+import httpx
+
+from api_server import app
+from src.shared.auth.jwt_auth import create_token_response
+from src.shared.database.connection import engine, read_engine, init_database, async_session_factory
+from src.shared.database.models import Client, Service, User
+from src.shared.logger.setup import setup_logging
+
+LIST_URLS = ["/api/clients/", "/api/services/", "/api/appointments/"]
+LOGGING_DIR = os.path.dirname(logging.__file__)
+
+
+class CountingHandler(logging.Handler):
+    """Считает записи, дошедшие до handler'ов (после уровня, до выборки)"""
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+def logging_share(profile: cProfile.Profile) -> float:
+    """Доля времени внутри Logger._log: запись, фильтры, форматирование и вывод"""
+    stats = pstats.Stats(profile).stats
+    total = sum(row[2] for row in stats.values())
+    spent = sum(
+        row[3] for (filename, _, name), row in stats.items()
+        if filename.startswith(LOGGING_DIR) and name == "_log"
+    )
+    return spent / total if total else 0.0
+
+
+async def run(client: httpx.AsyncClient, requests: int):
+    for i in range(requests):
+        response = await client.get(LIST_URLS[i % len(LIST_URLS)])
+        assert response.status_code == 200, response.text
+
+
+async def measure(client: httpx.AsyncClient, requests: int, policy: str, rate: float):
+    log_file = str(Path(_tmp_dir) / f"{policy}.log")
+    if policy == "debug":
+        setup_logging(log_file=log_file, level=logging.DEBUG)
+    else:
+        rates = ",".join(f"src.features.api.{name}={rate}" for name in ("clients", "services", "appointments"))
+        setup_logging(log_file=log_file, level=logging.INFO, sample_rates=rates)
+    counter = CountingHandler()
+    logging.getLogger().addHandler(counter)
+
+    await run(client, 50)  # прогрев
+    log_size = Path(log_file).stat().st_size
+    counter.count = 0
+
+    profile = cProfile.Profile()
+    started = time.process_time()
+    profile.enable()
+    await run(client, requests)
+    profile.disable()
+    cpu_us = (time.process_time() - started) / requests * 1_000_000
+
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+    written = Path(log_file).stat().st_size - log_size
+    return cpu_us, counter.count / requests, written / requests, logging_share(profile)
+
+
+async def main(requests: int, rate: float):
+    print("=" * 60)
+    print("Профиль логирования списочных эндпоинтов")
+    print("=" * 60)
+
+    await init_database()
+    async with async_session_factory() as session:
+        user = User(telegram_id=42, username="bench", first_name="Bench")
+        session.add(user)
+        await session.flush()
+        for i in range(20):
+            session.add(Client(user_id=user.id, first_name=f"Клиент {i}"))
+            session.add(Service(user_id=user.id, name=f"Услуга {i}", price=1000, duration_minutes=60))
+        await session.commit()
+        tokens = create_token_response(user.to_dict())
+
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    # Консольный handler пишет в stderr - уводим его в /dev/null, файл остается
+    stderr = sys.stderr
+    sys.stderr = open(os.devnull, "w")
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", headers=headers) as client:
+            results = {policy: await measure(client, requests, policy, rate) for policy in ("debug", "sampled")}
+    finally:
+        sys.stderr.close()
+        sys.stderr = stderr
+
+    print(f"Запросов: {requests}, доля выборки: {rate}")
+    print(f"{'Политика':<10} {'CPU мкс/запрос':>15} {'записей/запрос':>15} {'байт/запрос':>12} {'logging':>8}")
+    for policy, (cpu_us, records, written, share) in results.items():
+        print(f"{policy:<10} {cpu_us:>15.1f} {records:>15.2f} {written:>12.0f} {share:>7.1%}")
+    debug_us, sampled_us = results["debug"][0], results["sampled"][0]
+    print(f"Освобождено CPU: {debug_us - sampled_us:.1f} мкс/запрос ({(debug_us - sampled_us) / debug_us:.1%})")
+
+    await engine.dispose()
+    await read_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Профиль логирования списочных эндпоинтов")
+    parser.add_argument("--requests", type=int, default=1000, help="Количество запросов")
+    parser.add_argument("--rate", type=float, default=0.1, help="Доля записей списочных роутов")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.rate))
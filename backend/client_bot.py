@@ -9,7 +9,11 @@ from src.features.start_command.client_bot_handler import register_client_start_
 async def run_client_bot():
     """Запускает клиентского бота для записи"""
     # Настройка логирования
-    setup_logging(log_file=str(config.data_dir / 'client_bot.log'))
+    setup_logging(
+        log_file=str(config.data_dir / 'client_bot.log'),
+        log_format=config.log_format,
+        compress=config.log_compress
+    )
 
     logging.info("🤖 [CLIENT BOT] Инициализация клиентского Telegram бота...")
     logging.info("⚙️ [CLIENT BOT] Конфигурация загружена")
@@ -9,7 +9,11 @@ from src.features.start_command.handler import register_start_handler
 async def run_bot():
     """Запускает бота"""
     # Настройка логирования
-    setup_logging(log_file=str(config.data_dir / 'bot.log'))
+    setup_logging(
+        log_file=str(config.data_dir / 'bot.log'),
+        log_format=config.log_format,
+        compress=config.log_compress
+    )
 
     logging.info("🤖 Инициализация Telegram бота...")
     logging.info("⚙️ Конфигурация загружена")
@@ -3,7 +3,7 @@ API endpoints для управления записями/бронирован
 Слой Features - функциональность
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_, func
 from pydantic import BaseModel, Field
@@ -12,9 +12,17 @@ from datetime import datetime, date, time
 import logging
 
 from ...shared.database.models import Appointment, User, Service, Client, AppointmentStatus
-from ...shared.database.connection import get_session
-from ...shared.auth.jwt_auth import get_current_user
-from ...shared.utils.appointment_utils import validate_appointment_time, check_appointment_overlap
+from ...shared.database.connection import get_session, get_read_session
+from ...shared.database.write_queue import write_coordinator
+from ...shared.auth.jwt_auth import get_current_user_model
+from ...shared.database.serializers import appointment_serializer
+from ...shared.http import FastJSONResponse
+from ...shared.utils.pagination import KeysetPaginator
+from ...shared.utils.appointment_utils import (
+    validate_appointment_time, check_appointment_overlap, appointment_date_range, MAX_APPOINTMENT_DURATION_MINUTES
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/appointments", tags=["appointments"])
 
@@ -23,7 +31,7 @@ class AppointmentCreate(BaseModel):
     service_id: int = Field(..., description="ID услуги")
     client_id: int = Field(..., description="ID клиента")
     appointment_date: datetime = Field(..., description="Дата и время записи")
-    duration_minutes: Optional[int] = Field(None, gt=0, le=1440, description="Продолжительность в минутах")
+    duration_minutes: Optional[int] = Field(None, gt=0, le=MAX_APPOINTMENT_DURATION_MINUTES, description="Продолжительность в минутах")
     notes: Optional[str] = Field(None, description="Заметки к записи")
     client_notes: Optional[str] = Field(None, description="Заметки клиента")
     price: Optional[float] = Field(None, gt=0, description="Цена (если отличается от базовой)")
@@ -33,7 +41,7 @@ class AppointmentUpdate(BaseModel):
     service_id: Optional[int] = Field(None, description="ID услуги")
     client_id: Optional[int] = Field(None, description="ID клиента")
     appointment_date: Optional[datetime] = Field(None, description="Дата и время записи")
-    duration_minutes: Optional[int] = Field(None, gt=0, le=1440, description="Продолжительность в минутах")
+    duration_minutes: Optional[int] = Field(None, gt=0, le=MAX_APPOINTMENT_DURATION_MINUTES, description="Продолжительность в минутах")
     status: Optional[str] = Field(None, description="Статус записи")
     notes: Optional[str] = Field(None, description="Заметки к записи")
     client_notes: Optional[str] = Field(None, description="Заметки клиента")
@@ -41,13 +49,17 @@ class AppointmentUpdate(BaseModel):
 
 @router.get("/")
 async def get_appointments(
-    current_user: dict = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session),
+    user: User = Depends(get_current_user_model),
+    session: AsyncSession = Depends(get_read_session),
     status: Optional[str] = None,
     date_from: Optional[date] = None,
     date_to: Optional[date] = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    response_format: str = Query("nested", alias="format")
 ):
     """
     Получить список записей пользователя
@@ -60,86 +72,90 @@ async def get_appointments(
         date_from: Дата начала (YYYY-MM-DD)
         date_to: Дата окончания (YYYY-MM-DD)
         limit: Максимальное количество результатов
-        offset: Смещение для пагинации
+        offset: Смещение для пагинации (устаревший режим)
+        cursor: next_cursor / prev_cursor из предыдущего ответа (offset игнорируется)
+        fields: Поля записи через запятую, поля связей через точку
+            (id,appointment_date,ends_at,service.name,service.color)
+        include: Встроенные связи (service,client); по умолчанию обе (при fields -
+            упомянутые в нем), пусто - без связей
+        format: nested - связи внутри каждой записи; normalized - в записях
+            только service_id/client_id, объекты в словарях services и clients
 
     Returns:
-        Список записей пользователя
+        Список записей пользователя и курсоры соседних страниц
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"📡 GET /api/appointments/ - запрос записей для пользователя {telegram_id}")
-
-    # Находим пользователя
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
+    telegram_id = user.telegram_id
+    logger.info("📡 GET /api/appointments/ - запрос записей для пользователя %s", telegram_id)
+
+    if response_format not in ("nested", "normalized"):
+        raise HTTPException(status_code=400, detail="Неверный формат ответа (nested или normalized)")
+    normalized = response_format == "normalized"
+
+    # Читаем из БД только запрошенные колонки и связи
+    paginator = KeysetPaginator(Appointment.appointment_date, Appointment.id, cursor, limit)
+    try:
+        serializer, load_options = appointment_serializer.sparse(
+            fields, include, always=(paginator.sort_column.key, paginator.id_column.key), normalized=normalized
         )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # Строим запрос с eager loading для связанных объектов
-    from sqlalchemy.orm import joinedload
-    
-    query = select(Appointment).options(
-        joinedload(Appointment.service),
-        joinedload(Appointment.client)
-    ).where(Appointment.user_id == user.id)
+    filters = [Appointment.user_id == user.id]
 
     # Добавляем фильтры
     if status:
         try:
             status_enum = AppointmentStatus(status)
-            query = query.where(Appointment.status == status_enum)
+            filters.append(Appointment.status == status_enum)
         except ValueError:
             raise HTTPException(status_code=400, detail="Неверный статус записи")
 
-    if date_from:
-        query = query.where(func.date(Appointment.appointment_date) >= date_from)
-    if date_to:
-        query = query.where(func.date(Appointment.appointment_date) <= date_to)
+    # Диапазон дат - по индексу (user_id, appointment_date)
+    filters.extend(appointment_date_range(date_from, date_to))
+
+    query = select(Appointment).options(*load_options).where(*filters)
 
-    # Добавляем сортировку и пагинацию
-    query = query.order_by(Appointment.appointment_date.desc()).limit(limit).offset(offset)
+    # Добавляем сортировку и пагинацию: по курсору - keyset, иначе offset
+    query = paginator.apply(query)
+    if not cursor:
+        query = query.offset(offset)
 
     result = await session.execute(query)
-    appointments = result.scalars().unique().all()
+    appointments, next_cursor, prev_cursor = paginator.paginate(
+        result.scalars().unique().all(), has_previous=None if cursor else offset > 0
+    )
 
     # Получаем общее количество
-    count_query = select(func.count(Appointment.id)).where(Appointment.user_id == user.id)
-    if status:
-        count_query = count_query.where(Appointment.status == status_enum)
-    if date_from:
-        count_query = count_query.where(func.date(Appointment.appointment_date) >= date_from)
-    if date_to:
-        count_query = count_query.where(func.date(Appointment.appointment_date) <= date_to)
+    count_query = select(func.count()).select_from(Appointment).where(*filters)
 
     total_result = await session.execute(count_query)
     total = total_result.scalar()
 
-    return {
-        "appointments": [appointment.to_dict() for appointment in appointments],
+    if normalized:
+        # Услуга и клиент - один раз на ответ, записи ссылаются на них по id
+        rows, related = await serializer.side_load(session, appointments)
+        page = {
+            "appointments": rows,
+            "services": related.get("service", {}),
+            "clients": related.get("client", {})
+        }
+    else:
+        page = {"appointments": serializer.many(appointments)}
+    page.update({
         "total": total,
         "limit": limit,
-        "offset": offset
-    }
+        "offset": offset,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor
+    })
+
+    # Сразу в JSON, минуя jsonable_encoder
+    return FastJSONResponse(page)
 
 @router.post("/")
 async def create_appointment(
     appointment_data: AppointmentCreate,
-    current_user: dict = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    user: User = Depends(get_current_user_model)
 ):
     """
     Создать новую запись
@@ -153,95 +169,77 @@ async def create_appointment(
     Returns:
         Созданная запись
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"📝 POST /api/appointments/ - создание записи для пользователя {telegram_id}")
+    telegram_id = user.telegram_id
+    logger.info("📝 POST /api/appointments/ - создание записи для пользователя %s", telegram_id)
 
-    # Находим пользователя
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
+    async def create(write_session: AsyncSession) -> dict:
+        # Проверки выполняются в транзакции очереди записи, поэтому
+        # между проверкой пересечений и вставкой никто не займет это время
+        result = await write_session.execute(
+            select(Service).where(
+                Service.id == appointment_data.service_id,
+                Service.user_id == user.id
+            )
         )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
+        service = result.scalar_one_or_none()
 
-    # Проверяем существование услуги
-    result = await session.execute(
-        select(Service).where(
-            Service.id == appointment_data.service_id,
-            Service.user_id == user.id
+        if not service:
+            raise HTTPException(status_code=404, detail="Услуга не найдена")
+
+        # Проверяем существование клиента
+        result = await write_session.execute(
+            select(Client).where(
+                Client.id == appointment_data.client_id,
+                Client.user_id == user.id
+            )
         )
-    )
-    service = result.scalar_one_or_none()
+        client = result.scalar_one_or_none()
 
-    if not service:
-        raise HTTPException(status_code=404, detail="Услуга не найдена")
+        if not client:
+            raise HTTPException(status_code=404, detail="Клиент не найден")
 
-    # Проверяем существование клиента
-    result = await session.execute(
-        select(Client).where(
-            Client.id == appointment_data.client_id,
-            Client.user_id == user.id
+        # Определяем продолжительность и цену
+        duration = appointment_data.duration_minutes or service.duration_minutes
+        price = appointment_data.price or service.price
+
+        # Проверяем доступность времени и пересечения
+        is_valid, error_message = await validate_appointment_time(
+            session=write_session,
+            user_id=user.id,
+            appointment_date=appointment_data.appointment_date,
+            duration_minutes=duration
         )
-    )
-    client = result.scalar_one_or_none()
 
-    if not client:
-        raise HTTPException(status_code=404, detail="Клиент не найден")
+        if not is_valid:
+            logger.warning("⚠️ Ошибка валидации времени: %s", error_message)
+            raise HTTPException(status_code=400, detail=error_message)
 
-    # Определяем продолжительность и цену
-    duration = appointment_data.duration_minutes or service.duration_minutes
-    price = appointment_data.price or service.price
+        # Создаем запись
+        appointment = Appointment(
+            user_id=user.id,
+            service=service,
+            client=client,
+            appointment_date=appointment_data.appointment_date,
+            duration_minutes=duration,
+            notes=appointment_data.notes,
+            client_notes=appointment_data.client_notes,
+            price=price
+        )
 
-    # Проверяем доступность времени и пересечения
-    is_valid, error_message = await validate_appointment_time(
-        session=session,
-        user_id=user.id,
-        appointment_date=appointment_data.appointment_date,
-        duration_minutes=duration
-    )
-    
-    if not is_valid:
-        logging.warning(f"⚠️ Ошибка валидации времени: {error_message}")
-        raise HTTPException(status_code=400, detail=error_message)
-
-    # Создаем запись
-
-    appointment = Appointment(
-        user_id=user.id,
-        service_id=appointment_data.service_id,
-        client_id=appointment_data.client_id,
-        appointment_date=appointment_data.appointment_date,
-        duration_minutes=duration,
-        notes=appointment_data.notes,
-        client_notes=appointment_data.client_notes,
-        price=price
-    )
+        write_session.add(appointment)
+        await write_session.flush()
+        return appointment.to_dict()
 
-    session.add(appointment)
-    await session.commit()
-    await session.refresh(appointment)
+    appointment = await write_coordinator.submit(create)
 
-    logging.info(f"✅ Запись создана на {appointment.appointment_date}")
-    return appointment.to_dict()
+    logger.info("✅ Запись создана на %s", appointment['appointment_date'])
+    return appointment
 
 @router.get("/{appointment_id}")
 async def get_appointment(
     appointment_id: int,
-    current_user: dict = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    user: User = Depends(get_current_user_model),
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Получить конкретную запись
@@ -255,29 +253,7 @@ async def get_appointment(
     Returns:
         Данные записи
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"📡 GET /api/appointments/{appointment_id} - запрос записи {appointment_id}")
-
-    # Находим пользователя
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
+    logger.info("📡 GET /api/appointments/%s - запрос записи %s", appointment_id, appointment_id)
 
     # Находим запись с eager loading
     from sqlalchemy.orm import joinedload
@@ -302,7 +278,7 @@ async def get_appointment(
 async def update_appointment(
     appointment_id: int,
     appointment_data: AppointmentUpdate,
-    current_user: dict = Depends(get_current_user),
+    user: User = Depends(get_current_user_model),
     session: AsyncSession = Depends(get_session)
 ):
     """
@@ -320,29 +296,7 @@ async def update_appointment(
     Returns:
         Обновленная запись
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"📝 PUT /api/appointments/{appointment_id} - обновление записи {appointment_id}")
-
-    # Находим пользователя
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
+    logger.info("📝 PUT /api/appointments/%s - обновление записи %s", appointment_id, appointment_id)
 
     # Находим запись с eager loading
     from sqlalchemy.orm import joinedload
@@ -408,7 +362,7 @@ async def update_appointment(
         )
         
         if not is_valid:
-            logging.warning(f"⚠️ Ошибка валидации времени при обновлении: {error_message}")
+            logger.warning("⚠️ Ошибка валидации времени при обновлении: %s", error_message)
             raise HTTPException(status_code=400, detail=error_message)
 
     for field, value in update_data.items():
@@ -417,13 +371,13 @@ async def update_appointment(
     await session.commit()
     await session.refresh(appointment)
 
-    logging.info(f"✅ Запись {appointment_id} обновлена")
+    logger.info("✅ Запись %s обновлена", appointment_id)
     return appointment.to_dict()
 
 @router.delete("/{appointment_id}")
 async def delete_appointment(
     appointment_id: int,
-    current_user: dict = Depends(get_current_user),
+    user: User = Depends(get_current_user_model),
     session: AsyncSession = Depends(get_session)
 ):
     """
@@ -438,29 +392,7 @@ async def delete_appointment(
     Returns:
         Сообщение об успешном удалении
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"🗑️ DELETE /api/appointments/{appointment_id} - удаление записи {appointment_id}")
-
-    # Находим пользователя
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
+    logger.info("🗑️ DELETE /api/appointments/%s - удаление записи %s", appointment_id, appointment_id)
 
     # Находим запись
     result = await session.execute(
@@ -477,7 +409,7 @@ async def delete_appointment(
     await session.delete(appointment)
     await session.commit()
 
-    logging.info(f"✅ Запись {appointment_id} удалена")
+    logger.info("✅ Запись %s удалена", appointment_id)
     return {"message": "Запись успешно удалена"}
 
 # Экспорт роутеров
@@ -8,14 +8,20 @@ from fastapi import APIRouter, Depends, HTTPException, Header, Response, Cookie,
 from pydantic import BaseModel
 from typing import Optional
 from fastapi.responses import JSONResponse
-from sqlalchemy import select
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...shared.database.connection import get_session
 from ...shared.auth.telegram_auth import validate_telegram_init_data
-from ...shared.auth.jwt_auth import create_token_response, get_current_user
+from ...shared.auth.jwt_auth import issue_tokens, create_token_response, get_current_user, get_cached_user, cache_user, jwt_auth, security
+from ...shared.auth.refresh_tokens import (
+    consume_refresh_token, find_recent_successor, revoke_family, revoked_families, REFRESH_TOKEN_EXPIRE_DAYS
+)
+from ...shared.database.models import User
 from ...shared.config.env_loader import config
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/signin")
@@ -41,7 +47,7 @@ async def signin(
     ])
     platform = "📱 Mobile" if is_mobile else "💻 Desktop"
 
-    logging.info(f"{platform} 🔐 Запрос аутентификации")
+    logger.debug("%s 🔐 Запрос аутентификации", platform)
 
     try:
         # Валидируем initData с помощью токенов (основного или клиентского)
@@ -50,16 +56,17 @@ async def signin(
             tokens.append(config.client_bot_token)
             
         user_data = validate_telegram_init_data(x_init_data, tokens)
-        logging.info(f"{platform} ✅ initData валидирован: @{user_data.get('username', 'unknown')} (ID: {user_data.get('id', 'unknown')})")
+        logger.debug("%s ✅ initData валидирован: @%s (ID: %s)", platform, user_data.get('username', 'unknown'), user_data.get('id', 'unknown'))
 
         # Аутентифицируем/создаем пользователя в БД
         from ...shared.auth.telegram_auth import authenticate_user
         user = await authenticate_user(user_data, session)
-        logging.info(f"{platform} ✅ Пользователь аутентифицирован: {user.get('username', 'unknown')} (ID: {user.get('id', 'unknown')})")
+        logger.debug("%s ✅ Пользователь аутентифицирован: %s (ID: %s)", platform, user.get('username', 'unknown'), user.get('id', 'unknown'))
 
-        # Создаем токены
-        token_response = create_token_response(user)
-        logging.info(f"{platform} ✅ Созданы токены для пользователя {user.get('username', 'unknown')}")
+        # Создаем токены: новый вход открывает новое семейство refresh токенов
+        token_response = await issue_tokens(session, user)
+        await session.commit()
+        logger.debug("%s ✅ Созданы токены для пользователя %s", platform, user.get('username', 'unknown'))
 
         # Опции для установки cookies
         # Telegram WebApp загружается в iframe, поэтому нужен samesite=none
@@ -81,21 +88,16 @@ async def signin(
             **cookies_options
         )
         
-        logging.info(f"{platform} 🍪 Установка access_token cookie:")
-        logging.info(f"   - httponly: {cookies_options['httponly']}")
-        logging.info(f"   - secure: {cookies_options['secure']}")
-        logging.info(f"   - samesite: {cookies_options['samesite']}")
-        logging.info(f"   - path: {cookies_options['path']}")
-        logging.info(f"   - max_age: {config.jwt_access_token_expire_minutes * 60}s")
+        logger.debug("%s 🍪 Параметры cookie: %s, max_age: %ss", platform, cookies_options, config.jwt_access_token_expire_minutes * 60)
 
         response.set_cookie(
             key="refresh_token",
             value=token_response["refresh_token"],
-            max_age=30 * 24 * 60 * 60,  # 30 дней в секундах
+            max_age=REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,  # 30 дней в секундах
             **cookies_options
         )
 
-        logging.info(f"{platform} 🍪 Установлены http-only cookies для пользователя {user.get('username', 'unknown')}")
+        logger.info("%s ✅ Вход выполнен: @%s (ID: %s)", platform, user.get('username', 'unknown'), user.get('id', 'unknown'))
 
         # Возвращаем токены в ответе для поддержки localStorage (Safari блокирует cookies в iframe)
         return {
@@ -105,10 +107,10 @@ async def signin(
         }
 
     except HTTPException as e:
-        logging.error(f"{platform} ❌ Ошибка аутентификации: {e.detail}")
+        logger.error("%s ❌ Ошибка аутентификации: %s", platform, e.detail)
         raise e
     except Exception as e:
-        logging.error(f"{platform} ❌ Критическая ошибка аутентификации: {e}", exc_info=True)
+        logger.error("%s ❌ Критическая ошибка аутентификации: %s", platform, e, exc_info=True)
         raise HTTPException(status_code=500, detail="Ошибка сервера при аутентификации")
 
 class RefreshTokenRequest(BaseModel):
@@ -141,11 +143,9 @@ async def refresh_token(
     Returns:
         Новые токены в http-only cookies
     """
-    logging.info("🔄 Запрос обновления токена")
+    logger.info("🔄 Запрос обновления токена")
 
     try:
-        from ...shared.auth.jwt_auth import jwt_auth
-
         # Валидируем refresh токен
         payload = jwt_auth.decode_token(token_to_use)
 
@@ -153,24 +153,47 @@ async def refresh_token(
             raise HTTPException(status_code=401, detail="Неверный тип токена")
 
         user_id = payload.get("sub")
+        family_id = payload.get("fam")
+        jti = payload.get("jti")
         if not user_id:
             raise HTTPException(status_code=401, detail="Неверный refresh токен")
-
-        # Получаем пользователя из БД
-        from ...shared.database.models import User
-        result = await session.execute(
-            select(User).where(User.id == int(user_id))
-        )
-        user_obj = result.scalar_one_or_none()
-
-        if not user_obj:
-            raise HTTPException(status_code=401, detail="Пользователь не найден")
-
-        # Преобразуем в словарь
-        user = user_obj.to_dict()
-
-        # Создаем новые токены
-        token_response = create_token_response(user)
+        if not family_id or not jti:
+            # Токены до ротации не зарегистрированы - только новый вход через Telegram
+            raise HTTPException(status_code=401, detail="Refresh токен устарел, войдите заново")
+
+        if revoked_families.is_revoked(family_id):
+            raise HTTPException(status_code=401, detail="Сессия завершена, войдите заново")
+
+        # Ротация: токен обменивается один раз
+        successor = None
+        if not await consume_refresh_token(session, jti):
+            # Параллельный запрос только что обменял этот же токен - не кража
+            successor = await find_recent_successor(session, jti)
+            if successor is None:
+                logger.warning("🚨 Повторное использование refresh токена (пользователь %s), семейство %s отозвано", user_id, family_id)
+                await revoke_family(session, family_id)
+                # Коммит до исключения: get_session откатил бы отзыв
+                await session.commit()
+                raise HTTPException(status_code=401, detail="Refresh токен уже использован, войдите заново")
+            logger.info("🔁 Параллельное обновление токена (пользователь %s): выдан текущий токен семейства", user_id)
+
+        # Данные пользователя из кэша, при промахе - из БД
+        cached = get_cached_user(int(user_id), payload.get("ver", 0))
+        if cached:
+            user = dict(cached[1])
+        else:
+            user_obj = await session.get(User, int(user_id))
+            if not user_obj:
+                raise HTTPException(status_code=401, detail="Пользователь не найден")
+            user = cache_user(user_obj)
+
+        if successor:
+            # Тот же refresh токен, что получил параллельный запрос
+            token_response = create_token_response(user, family_id=family_id, jti=successor)
+        else:
+            # Следующий токен того же семейства
+            token_response = await issue_tokens(session, user, family_id)
+            await session.commit()
 
         # Устанавливаем новые cookies с теми же настройками что и при signin
         secure_flag = True
@@ -192,36 +215,75 @@ async def refresh_token(
             httponly=True,
             secure=secure_flag,
             samesite=same_site,
-            max_age=30 * 24 * 60 * 60,
+            max_age=REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
             path="/"
         )
 
-        logging.info(f"✅ Токены обновлены для пользователя {user.get('username', 'unknown')}")
+        logger.info("✅ Токены обновлены для пользователя %s", user.get('username', 'unknown'))
 
+        # Токены и в теле ответа: клиент без cookies (Safari в iframe) хранит их
+        # в localStorage и должен заменить использованный refresh токен
         return {
             "message": "Токены обновлены",
-            "user": user
+            "user": user,
+            "access_token": token_response["access_token"],
+            "refresh_token": token_response["refresh_token"],
+            "token_type": "bearer"
         }
 
     except HTTPException as e:
-        logging.error(f"❌ Ошибка обновления токена: {e.detail}")
+        logger.error("❌ Ошибка обновления токена: %s", e.detail)
         raise e
     except Exception as e:
-        logging.error(f"❌ Критическая ошибка обновления токена: {e}", exc_info=True)
+        logger.error("❌ Критическая ошибка обновления токена: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail="Ошибка сервера при обновлении токена")
 
 @router.post("/logout")
-async def logout(response: Response):
+async def logout(
+    response: Response,
+    request: RefreshTokenRequest = Body(None),
+    cookie_refresh_token: str = Cookie(None, alias="refresh_token"),
+    access_token: str = Cookie(None, alias="access_token"),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    session: AsyncSession = Depends(get_session)
+):
     """
-    Выход из системы - очистка cookies с токенами
+    Выход из системы - отзыв сессии и очистка cookies с токенами
+
+    Семейство refresh токенов берется из любого переданного токена
+    (body, cookies, Authorization header), в том числе истекшего.
+    После отзыва ни refresh, ни выданные по нему access токены не принимаются.
     """
-    logging.info("👋 Запрос выхода из системы")
+    logger.info("👋 Запрос выхода из системы")
+
+    tokens = [
+        request.refresh_token if request else None,
+        cookie_refresh_token,
+        access_token,
+        credentials.credentials if credentials else None,
+    ]
+    family_ids = set()
+    for token in tokens:
+        if not token:
+            continue
+        try:
+            family_id = jwt_auth.decode_token(token, verify_exp=False).get("fam")
+        except HTTPException:
+            continue
+        if family_id:
+            family_ids.add(family_id)
+
+    for family_id in family_ids:
+        await revoke_family(session, family_id)
+    if family_ids:
+        await session.commit()
+        logger.info("🔒 Отозвано сессий: %s", len(family_ids))
 
     # Очищаем cookies
     response.delete_cookie(key="access_token", path="/")
     response.delete_cookie(key="refresh_token", path="/")
 
-    logging.info("✅ Cookies очищены, пользователь вышел из системы")
+    logger.info("✅ Cookies очищены, пользователь вышел из системы")
 
     return {"message": "Выход выполнен успешно"}
 
@@ -235,7 +297,7 @@ async def protected(
     Returns:
         True если пользователь авторизован
     """
-    logging.info(f"🔒 Проверка авторизации для пользователя {current_user.get('username', 'unknown')}")
+    logger.info("🔒 Проверка авторизации для пользователя %s", current_user.get('username', 'unknown'))
 
     # Если мы дошли до этого места, значит пользователь авторизован
     # (зависимость get_current_user уже проверила токены)
@@ -251,7 +313,7 @@ async def get_current_user_info(
     Returns:
         Данные текущего пользователя
     """
-    logging.info(f"👤 Запрос информации о пользователе {current_user.get('username', 'unknown')}")
+    logger.info("👤 Запрос информации о пользователе %s", current_user.get('username', 'unknown'))
 
     return {
         "user": current_user,
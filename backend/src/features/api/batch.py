@@ -0,0 +1,241 @@
+"""
+API endpoint пакетных запросов
+Слой Features - функциональность
+
+На плохой мобильной сети каждый вызов Mini App стоит целого round-trip:
+например, создать клиента и сразу записать его. POST /api/batch принимает
+упорядоченный список подзапросов к существующим роутерам и выполняет их
+внутри процесса - с одной проверкой токена и одной сессией БД.
+
+Подзапрос может сослаться на ответ предыдущего по его id:
+
+    {"requests": [
+        {"id": "client", "method": "POST", "path": "/api/clients/", "body": {"first_name": "Анна"}},
+        {"method": "POST", "path": "/api/appointments/",
+         "body": {"client_id": "{{client.id}}", "service_id": 3, "appointment_date": "2030-01-01T10:00:00"}}
+    ], "transaction": true}
+
+Строка целиком из ссылки получает значение как есть (число остается
+числом), ссылка внутри строки (путь) подставляется текстом.
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+import orjson
+from fastapi import APIRouter, Depends, Request
+from pydantic import BaseModel, Field
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.exceptions import HTTPException
+
+from ...shared.auth.jwt_auth import batch_user, get_current_user
+from ...shared.database.connection import batch_transaction
+from ...shared.http import FastJSONResponse
+from ...shared.utils.cache import deferred_invalidations
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+# Подзапросы только к API мастера: вход выставляет cookies и выдает
+# токены, публичное бронирование работает от имени клиента, а не мастера
+EXCLUDED_PREFIXES = ("/api/batch", "/api/auth", "/api/booking")
+
+# Заголовки родительского запроса, которые получают подзапросы
+FORWARDED_HEADERS = {b"authorization", b"cookie", b"x-request-id", b"user-agent"}
+
+# Ключи ASGI scope, общие для родительского запроса и подзапросов
+# (starlette.exception_handlers - ответы об ошибках в формате API)
+INHERITED_SCOPE = ("http_version", "scheme", "server", "client", "root_path", "app", "state",
+                   "starlette.exception_handlers")
+
+_REFERENCE = re.compile(r"\{\{\s*([\w-]+)((?:\.[\w-]+)+)\s*\}\}")
+
+
+class BatchOperation(BaseModel):
+    """Подзапрос пакета"""
+    id: Optional[str] = Field(None, pattern=r"^[\w-]+$", max_length=64, description="Имя для ссылок {{id.поле}}")
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = Field(..., description="HTTP метод")
+    path: str = Field(..., pattern=r"^/api/", max_length=2048, description="Путь с query string")
+    body: Optional[Any] = Field(None, description="JSON тело")
+
+
+class BatchRequest(BaseModel):
+    """Схема пакета запросов"""
+    requests: List[BatchOperation] = Field(..., min_length=1, max_length=50, description="Подзапросы по порядку")
+    transaction: bool = Field(False, description="Все или ничего: ошибка откатывает весь пакет")
+
+
+def _error_body(status_code: int, message: str) -> Dict[str, Any]:
+    """Тело ошибки в формате обработчиков API (shared/errors/handlers.py)"""
+    return {"error": {"code": f"HTTP_{status_code}", "message": message}, "success": False}
+
+
+def _resolve(match: re.Match, results: Dict[str, Any]) -> Any:
+    name, path = match.group(1), match.group(2)[1:].split(".")
+    if name not in results:
+        raise ValueError(f"Ссылка {match.group(0)} на неизвестный или неуспешный запрос")
+    value = results[name]
+    for part in path:
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            raise ValueError(f"В ответе нет поля {match.group(0)}")
+    return value
+
+
+def substitute(value: Any, results: Dict[str, Any]) -> Any:
+    """Подставляет {{id.поле}} из ответов предыдущих подзапросов"""
+    if isinstance(value, str):
+        whole = _REFERENCE.fullmatch(value.strip())
+        if whole:
+            return _resolve(whole, results)
+        return _REFERENCE.sub(lambda match: str(_resolve(match, results)), value)
+    if isinstance(value, dict):
+        return {key: substitute(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute(item, results) for item in value]
+    return value
+
+
+async def dispatch(request: Request, method: str, path: str, body: Any) -> Tuple[int, Any]:
+    """
+    Выполняет подзапрос через роутер приложения внутри процесса
+
+    Returns:
+        tuple: (HTTP статус, JSON ответа)
+    """
+    path, _, query = path.partition("?")
+    if path.startswith(EXCLUDED_PREFIXES):
+        return 400, _error_body(400, f"{path} недоступен в пакетном запросе")
+
+    headers = [(name, value) for name, value in request.scope["headers"] if name in FORWARDED_HEADERS]
+    content = orjson.dumps(body) if body is not None else b""
+    if body is not None:
+        headers.append((b"content-type", b"application/json"))
+    scope = {key: request.scope[key] for key in INHERITED_SCOPE if key in request.scope}
+    scope.update(
+        type="http", method=method, path=path, raw_path=path.encode(), query_string=query.encode(),
+        headers=headers,
+    )
+
+    async def receive():
+        return {"type": "http.request", "body": content, "more_body": False}
+
+    status, chunks = 500, []
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await request.app.router(scope, receive, send)
+    except HTTPException as e:
+        # 404/405 роутера возникают вне обработчиков исключений маршрута
+        return e.status_code, _error_body(e.status_code, e.detail)
+
+    payload = b"".join(chunks)
+    if not payload:
+        return status, None
+    try:
+        return status, orjson.loads(payload)
+    except orjson.JSONDecodeError:
+        return status, payload.decode("utf-8", "replace")
+
+
+@router.post("")
+async def run_batch(
+    payload: BatchRequest,
+    request: Request,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Выполнить несколько запросов API за один round-trip
+
+    Подзапросы выполняются по порядку в одной транзакции БД; каждый - в
+    своем SAVEPOINT. Неуспешный подзапрос (статус >= 400, необработанная
+    ошибка - 500) откатывает только свои изменения, а с transaction=true -
+    весь пакет, оставшиеся подзапросы получают 424.
+
+    Подзапросы идут прямо в роутер и минуют middleware приложения
+    (RequestContextMiddleware, CORS, сжатие ответа, если оно включено
+    перед приложением): у подзапроса нет своей записи лога запроса и своего
+    контекста логов - он пишет в контексте POST /api/batch. Middleware
+    применяются только к ответу пакета целиком.
+
+    Returns:
+        responses: [{id, status, body}] в порядке запросов; committed -
+        сохранены ли изменения пакета
+    """
+    logger.info("📦 POST /api/batch - %s запросов (транзакция: %s) для пользователя %s",
+                len(payload.requests), payload.transaction, current_user["id"])
+
+    responses, results, failed = [], {}, False
+    async with batch_transaction() as (session, transaction):
+        token = batch_user.set(current_user)
+        try:
+            with deferred_invalidations() as invalidations:
+                for operation in payload.requests:
+                    if failed and payload.transaction:
+                        responses.append({"id": operation.id, "status": 424,
+                                          "body": _error_body(424, "Пропущен: предыдущий запрос пакета завершился ошибкой")})
+                        continue
+
+                    try:
+                        path = substitute(operation.path, results)
+                        body = substitute(operation.body, results)
+                    except ValueError as e:
+                        status, response_body = 400, _error_body(400, str(e))
+                    else:
+                        # Свой SAVEPOINT: ошибка подзапроса откатывает только его изменения
+                        savepoint = await session.begin_nested()
+                        try:
+                            status, response_body = await dispatch(request, operation.method, path, body)
+                            if status < 400:
+                                # Изменения подзапроса остаются в транзакции пакета
+                                await session.flush()
+                        except SQLAlchemyError as e:
+                            logger.error("❌ Ошибка БД в подзапросе %s %s: %s", operation.method, path, e)
+                            status, response_body = 500, _error_body(500, "Ошибка базы данных")
+                        except Exception as e:
+                            # Необработанная ошибка одного подзапроса не роняет весь пакет
+                            logger.error("❌ Ошибка в подзапросе %s %s: %s", operation.method, path, e, exc_info=True)
+                            status, response_body = 500, _error_body(500, "Внутренняя ошибка сервера")
+                        if savepoint.is_active:
+                            if status < 400:
+                                await savepoint.commit()
+                            else:
+                                await savepoint.rollback()
+
+                    if status >= 400:
+                        failed = True
+                    elif operation.id:
+                        results[operation.id] = response_body
+                    responses.append({"id": operation.id, "status": status, "body": response_body})
+
+                committed = not (failed and payload.transaction)
+                if committed:
+                    await transaction.commit()
+        finally:
+            batch_user.reset(token)
+
+    if committed:
+        # Обработчики сбросили кэши до коммита пакета (их commit() - только
+        # flush): параллельный запрос мог успеть закэшировать старые данные
+        for invalidate, user_id in invalidations:
+            invalidate(user_id)
+
+    if failed:
+        logger.warning("⚠️ Пакет: есть неуспешные подзапросы, изменения %s",
+                       "сохранены частично" if committed else "откачены")
+    return FastJSONResponse({"responses": responses, "committed": committed})
+
+
+# Экспорт роутеров
+__all__ = ["router"]
@@ -0,0 +1,107 @@
+"""
+API endpoint стартовых данных Mini App
+Слой Features - функциональность
+
+При открытии Mini App мастеру нужны профиль, услуги, график и ближайшие
+записи. Раньше это были четыре запроса, и каждый заново проходил
+авторизацию, открывал сессию и загружал пользователя. /api/bootstrap
+отдает все одним ответом из одной сессии чтения.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import logging
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from ...shared.database.models import Appointment, Service, User, WorkingDay, WorkingHours
+from ...shared.database.connection import get_read_session
+from ...shared.auth.jwt_auth import get_current_user_model
+from ...shared.database.serializers import (
+    appointment_serializer, service_serializer, user_serializer,
+    working_day_serializer, working_hours_serializer,
+)
+from ...shared.http import FastJSONResponse
+from ...shared.utils.appointment_utils import appointment_date_range
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/bootstrap", tags=["bootstrap"])
+
+# Записи повестки - как в списке записей, с услугой и клиентом
+_agenda_serializer, _agenda_options = appointment_serializer.sparse()
+
+
+def _local_today(timezone: str) -> date:
+    """Сегодняшняя дата в часовом поясе мастера (время записей - локальное)"""
+    try:
+        return datetime.now(ZoneInfo(timezone)).date()
+    except (ZoneInfoNotFoundError, ValueError):
+        return date.today()
+
+
+@router.get("")
+async def get_bootstrap(
+    today: Optional[date] = Query(None, description="Сегодняшняя дата на устройстве (YYYY-MM-DD)"),
+    user: User = Depends(get_current_user_model),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Стартовые данные Mini App одним запросом
+
+    Query Parameters:
+        today: Сегодняшняя дата клиента; по умолчанию - по часовому поясу мастера
+
+    Returns:
+        Профиль, активные услуги, недельный график, переопределения
+        графика начиная с сегодня и записи на сегодня и завтра
+    """
+    logger.info("📡 GET /api/bootstrap - стартовые данные для пользователя %s", user.id)
+
+    today = today or _local_today(user.timezone)
+    tomorrow = today + timedelta(days=1)
+
+    result = await session.execute(
+        select(Service).where(Service.user_id == user.id, Service.is_active == True)
+        .order_by(Service.created_at.desc())
+    )
+    services = result.scalars().all()
+
+    result = await session.execute(
+        select(WorkingHours).where(WorkingHours.user_id == user.id).order_by(WorkingHours.day_of_week)
+    )
+    working_hours = result.scalars().all()
+
+    result = await session.execute(
+        select(WorkingDay).where(WorkingDay.user_id == user.id, WorkingDay.date >= today)
+        .order_by(WorkingDay.date)
+    )
+    working_days = result.scalars().all()
+
+    result = await session.execute(
+        select(Appointment).options(*_agenda_options)
+        .where(Appointment.user_id == user.id, *appointment_date_range(today, tomorrow))
+        .order_by(Appointment.appointment_date)
+    )
+    appointments = result.scalars().unique().all()
+
+    agenda = {"today": [], "tomorrow": []}
+    for appointment in appointments:
+        day = "today" if appointment.appointment_date.date() == today else "tomorrow"
+        agenda[day].append(_agenda_serializer.native(appointment))
+
+    return FastJSONResponse({
+        "profile": user_serializer.native(user),
+        "services": service_serializer.many(services),
+        "working_hours": working_hours_serializer.many(working_hours),
+        "working_days": working_day_serializer.many(working_days),
+        "today": today,
+        "agenda": agenda,
+    })
+
+
+# Экспорт роутеров
+__all__ = ["router"]
@@ -5,14 +5,20 @@ API endpoints для управления клиентами
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
 from pydantic import BaseModel, Field
 from typing import List, Optional
 import logging
 
 from ...shared.database.models import Client, User
-from ...shared.database.connection import get_session
-from ...shared.auth.jwt_auth import get_current_user
+from ...shared.database.connection import get_session, get_read_session
+from ...shared.auth.jwt_auth import get_current_user_model
+from ...shared.database.serializers import client_serializer
+from ...shared.http import FastJSONResponse
+from ...shared.utils.pagination import KeysetPaginator
+from ...shared.utils.cache import list_totals, invalidate_client_totals
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/clients", tags=["clients"])
 
@@ -34,11 +40,13 @@ class ClientUpdate(BaseModel):
 
 @router.get("/")
 async def get_clients(
-    current_user: dict = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session),
+    user: User = Depends(get_current_user_model),
+    session: AsyncSession = Depends(get_read_session),
     search: Optional[str] = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
 ):
     """
     Получить список клиентов пользователя
@@ -49,75 +57,69 @@ async def get_clients(
     Query Parameters:
         search: Поиск по имени, фамилии или телефону
         limit: Максимальное количество результатов
-        offset: Смещение для пагинации
+        offset: Смещение для пагинации (устаревший режим)
+        cursor: next_cursor / prev_cursor из предыдущего ответа (offset игнорируется)
+        fields: Поля клиента через запятую (id,first_name,last_name,phone)
 
     Returns:
-        Список клиентов пользователя
+        Список клиентов пользователя и курсоры соседних страниц
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"📡 GET /api/clients/ - запрос клиентов для пользователя {telegram_id}")
-
-    # Находим пользователя
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
+    telegram_id = user.telegram_id
+    logger.info("📡 GET /api/clients/ - запрос клиентов для пользователя %s", telegram_id)
 
     # Строим запрос
-    query = select(Client).where(Client.user_id == user.id)
+    filters = [Client.user_id == user.id]
 
     # Добавляем поиск, если указан
     if search:
         search_filter = f"%{search}%"
-        query = query.where(
+        filters.append(
             (Client.first_name.ilike(search_filter)) |
             (Client.last_name.ilike(search_filter)) |
             (Client.phone.ilike(search_filter))
         )
 
-    # Добавляем сортировку и пагинацию
-    query = query.order_by(Client.created_at.desc()).limit(limit).offset(offset)
+    # Добавляем сортировку и пагинацию: по курсору - keyset, иначе offset
+    paginator = KeysetPaginator(Client.created_at, Client.id, cursor, limit)
+    try:
+        serializer, load_options = client_serializer.sparse(
+            fields, always=(paginator.sort_column.key, paginator.id_column.key)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    result = await session.execute(query)
-    clients = result.scalars().all()
+    query = select(Client).options(*load_options).where(*filters)
+    page_query = paginator.apply(query)
+    if not cursor:
+        page_query = page_query.offset(offset)
 
-    # Получаем общее количество для пагинации
-    count_query = select(Client).where(Client.user_id == user.id)
-    if search:
-        count_query = count_query.where(
-            (Client.first_name.ilike(search_filter)) |
-            (Client.last_name.ilike(search_filter)) |
-            (Client.phone.ilike(search_filter))
-        )
-    total_result = await session.execute(count_query)
-    total = len(total_result.scalars().all())
+    result = await session.execute(page_query)
+    clients, next_cursor, prev_cursor = paginator.paginate(
+        result.scalars().all(), has_previous=None if cursor else offset > 0
+    )
 
-    return {
-        "clients": [client.to_dict() for client in clients],
+    # Общее количество для пагинации - COUNT в базе (кэшируется, если включен LIST_TOTAL_CACHE_TTL)
+    total_key = ("clients", user.id, search or "")
+    total = list_totals.get(total_key)
+    if total is None:
+        total_result = await session.execute(select(func.count()).select_from(Client).where(*filters))
+        total = total_result.scalar()
+        list_totals.set(total_key, total)
+
+    # Сразу в JSON, минуя jsonable_encoder
+    return FastJSONResponse({
+        "clients": serializer.many(clients),
         "total": total,
         "limit": limit,
-        "offset": offset
-    }
+        "offset": offset,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor
+    })
 
 @router.post("/")
 async def create_client(
     client_data: ClientCreate,
-    current_user: dict = Depends(get_current_user),
+    user: User = Depends(get_current_user_model),
     session: AsyncSession = Depends(get_session)
 ):
     """
@@ -132,29 +134,8 @@ async def create_client(
     Returns:
         Созданный клиент
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"📝 POST /api/clients/ - создание клиента для пользователя {telegram_id}")
-
-    # Находим пользователя
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
+    telegram_id = user.telegram_id
+    logger.info("📝 POST /api/clients/ - создание клиента для пользователя %s", telegram_id)
 
     # Создаем клиента
     client = Client(
@@ -168,16 +149,17 @@ async def create_client(
 
     session.add(client)
     await session.commit()
+    invalidate_client_totals(user.id)
     await session.refresh(client)
 
-    logging.info(f"✅ Клиент '{client.first_name} {client.last_name}' создан для пользователя {telegram_id}")
+    logger.info("✅ Клиент '%s %s' создан для пользователя %s", client.first_name, client.last_name, telegram_id)
     return client.to_dict()
 
 @router.get("/{client_id}")
 async def get_client(
     client_id: int,
-    current_user: dict = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    user: User = Depends(get_current_user_model),
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Получить конкретного клиента
@@ -191,29 +173,7 @@ async def get_client(
     Returns:
         Данные клиента
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"📡 GET /api/clients/{client_id} - запрос клиента {client_id}")
-
-    # Находим пользователя
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
+    logger.info("📡 GET /api/clients/%s - запрос клиента %s", client_id, client_id)
 
     # Находим клиента
     result = await session.execute(
@@ -233,7 +193,7 @@ async def get_client(
 async def update_client(
     client_id: int,
     client_data: ClientUpdate,
-    current_user: dict = Depends(get_current_user),
+    user: User = Depends(get_current_user_model),
     session: AsyncSession = Depends(get_session)
 ):
     """
@@ -251,29 +211,7 @@ async def update_client(
     Returns:
         Обновленный клиент
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"📝 PUT /api/clients/{client_id} - обновление клиента {client_id}")
-
-    # Находим пользователя
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
+    logger.info("📝 PUT /api/clients/%s - обновление клиента %s", client_id, client_id)
 
     # Находим клиента
     result = await session.execute(
@@ -293,15 +231,17 @@ async def update_client(
         setattr(client, field, value)
 
     await session.commit()
+    # Изменение имени или телефона меняет результаты поиска
+    invalidate_client_totals(user.id)
     await session.refresh(client)
 
-    logging.info(f"✅ Клиент '{client.first_name} {client.last_name}' обновлен")
+    logger.info("✅ Клиент '%s %s' обновлен", client.first_name, client.last_name)
     return client.to_dict()
 
 @router.delete("/{client_id}")
 async def delete_client(
     client_id: int,
-    current_user: dict = Depends(get_current_user),
+    user: User = Depends(get_current_user_model),
     session: AsyncSession = Depends(get_session)
 ):
     """
@@ -316,29 +256,7 @@ async def delete_client(
     Returns:
         Сообщение об успешном удалении
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"🗑️ DELETE /api/clients/{client_id} - удаление клиента {client_id}")
-
-    # Находим пользователя
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
+    logger.info("🗑️ DELETE /api/clients/%s - удаление клиента %s", client_id, client_id)
 
     # Находим клиента
     result = await session.execute(
@@ -357,8 +275,9 @@ async def delete_client(
 
     await session.delete(client)
     await session.commit()
+    invalidate_client_totals(user.id)
 
-    logging.info(f"✅ Клиент '{client.first_name} {client.last_name}' удален")
+    logger.info("✅ Клиент '%s %s' удален", client.first_name, client.last_name)
     return {"message": "Клиент успешно удален"}
 
 # Экспорт роутеров
@@ -0,0 +1,176 @@
+"""
+API endpoints потоковой выгрузки записей и клиентов
+Слой Features - функциональность
+
+Выгрузка за годы работы не помещается в одну страницу списка. Строки
+читаются из БД курсором (stream() + yield_per) и отдаются клиенту
+частями по мере чтения - память не зависит от размера истории.
+
+Сессия открывается внутри генератора ответа: зависимости с yield
+закрываются до того, как StreamingResponse начнет отправку.
+"""
+
+import csv
+import enum
+import io
+import logging
+import re
+from datetime import date, datetime, time, timedelta
+from typing import AsyncIterator, Optional
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select
+
+from ...shared.database.models import Appointment, Client, Service, User
+from ...shared.database.connection import read_session_factory
+from ...shared.auth.jwt_auth import get_current_user_model
+from ...shared.utils.appointment_utils import appointment_date_range
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+# Формат -> Content-Type
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+# Строк на одну выборку курсора и одну часть ответа
+YIELD_PER = 500
+
+# BOM: Excel иначе открывает CSV с кириллицей в однобайтовой кодировке
+CSV_BOM = "\ufeff"
+
+
+# Телефон или число со знаком - не формула
+_SIGNED_NUMBER = re.compile(r"^[+-][\d\s()-]*$")
+
+
+def _csv_cell(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@", "\t", "\r") and not _SIGNED_NUMBER.match(value):
+        # Заметки пишут и клиенты: табличный редактор не должен выполнить их как формулу
+        return "'" + value
+    return value
+
+
+async def stream_rows(statement: Select, export_format: str, name: str) -> AsyncIterator[bytes]:
+    """
+    Строки запроса частями по YIELD_PER в CSV или NDJSON
+
+    Args:
+        statement: select() колонок; их имена - заголовки CSV и ключи NDJSON
+        export_format: csv или ndjson
+        name: Что выгружается (для логов)
+    """
+    columns = list(statement.selected_columns.keys())
+    if export_format == "csv":
+        yield (CSV_BOM + ",".join(columns) + "\r\n").encode()
+
+    rows = 0
+    async with read_session_factory() as session:
+        result = await session.stream(statement.execution_options(yield_per=YIELD_PER))
+        async for partition in result.partitions():
+            if export_format == "csv":
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows([_csv_cell(value) for value in row] for row in partition)
+                yield buffer.getvalue().encode()
+            else:
+                # orjson сам кодирует даты и Enum
+                yield b"".join(orjson.dumps(dict(zip(columns, row))) + b"\n" for row in partition)
+            rows += len(partition)
+
+    logger.info("✅ Выгрузка %s завершена: %s строк", name, rows)
+
+
+def _export_response(statement: Select, export_format: str, name: str) -> StreamingResponse:
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Неверный формат выгрузки (csv или ndjson)")
+    return StreamingResponse(
+        stream_rows(statement, export_format, name),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{export_format}"'},
+    )
+
+
+@router.get("/appointments")
+async def export_appointments(
+    user: User = Depends(get_current_user_model),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    export_format: str = Query("csv", alias="format")
+):
+    """
+    Выгрузить записи пользователя
+
+    Query Parameters:
+        date_from: Дата начала (YYYY-MM-DD)
+        date_to: Дата окончания (YYYY-MM-DD)
+        format: csv (по умолчанию) или ndjson
+
+    Returns:
+        Файл с записями по дате, с названием услуги и контактами клиента
+    """
+    logger.info("📤 GET /api/export/appointments - выгрузка записей (%s) для пользователя %s", export_format, user.id)
+
+    statement = (
+        select(
+            Appointment.id, Appointment.appointment_date, Appointment.ends_at, Appointment.duration_minutes,
+            Appointment.status, Service.name.label("service"), Client.first_name.label("client_first_name"),
+            Client.last_name.label("client_last_name"), Client.phone.label("client_phone"), Appointment.price,
+            Appointment.notes, Appointment.client_notes, Appointment.created_at,
+        )
+        .join(Service, Appointment.service_id == Service.id)
+        .join(Client, Appointment.client_id == Client.id)
+        .where(Appointment.user_id == user.id, *appointment_date_range(date_from, date_to))
+        .order_by(Appointment.appointment_date, Appointment.id)
+    )
+    return _export_response(statement, export_format, "appointments")
+
+
+@router.get("/clients")
+async def export_clients(
+    user: User = Depends(get_current_user_model),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    export_format: str = Query("csv", alias="format")
+):
+    """
+    Выгрузить клиентов пользователя
+
+    Query Parameters:
+        date_from: Добавлены не раньше даты (YYYY-MM-DD)
+        date_to: Добавлены не позже даты (YYYY-MM-DD)
+        format: csv (по умолчанию) или ndjson
+
+    Returns:
+        Файл с клиентами в порядке добавления
+    """
+    logger.info("📤 GET /api/export/clients - выгрузка клиентов (%s) для пользователя %s", export_format, user.id)
+
+    # Границы дат - полуинтервал, как у записей: индекс (user_id, created_at)
+    conditions = [Client.user_id == user.id]
+    if date_from:
+        conditions.append(Client.created_at >= datetime.combine(date_from, time.min))
+    if date_to:
+        conditions.append(Client.created_at < datetime.combine(date_to, time.min) + timedelta(days=1))
+
+    statement = (
+        select(
+            Client.id, Client.first_name, Client.last_name, Client.phone, Client.email, Client.telegram_id,
+            Client.notes, Client.created_at, Client.updated_at,
+        )
+        .where(*conditions)
+        .order_by(Client.created_at, Client.id)
+    )
+    return _export_response(statement, export_format, "clients")
+
+
+# Экспорт роутеров
+__all__ = ["router"]
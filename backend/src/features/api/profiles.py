@@ -4,15 +4,20 @@ API endpoints для управления профилями пользоват
 """
 
 import logging
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from pydantic import BaseModel, Field
 from typing import Optional
 
 from ...shared.database.models import User
-from ...shared.database.connection import get_session
-from ...shared.auth.jwt_auth import get_current_user
+from ...shared.database.connection import get_session, get_read_session
+from ...shared.auth.jwt_auth import get_current_user, get_current_user_model
+from ...shared.config.env_loader import config
+from ...shared.utils.cache import invalidate_user
+from ...shared.http import make_etag, not_modified, validator_headers
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["profiles"])
 
@@ -26,38 +31,33 @@ class ProfileUpdate(BaseModel):
 
 @router.get("/")
 async def get_profile(
-    current_user: dict = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    request: Request,
+    response: Response,
+    user: User = Depends(get_current_user_model)
 ):
     """
     Получить профиль пользователя
 
     Returns:
-        Данные профиля пользователя
+        Данные профиля пользователя (304, если совпал If-None-Match)
     """
-    user_id = current_user['id']
-    username = current_user.get('username', 'unknown')
+    logger.info("📡 GET /profiles/ - запрос профиля для @%s (ID: %s)", user.username, user.id)
 
-    logging.info(f"📡 GET /profiles/ - запрос профиля для @{username} (ID: {user_id})")
+    # Любое изменение профиля меняет version или updated_at
+    etag = make_etag("profile", user.id, user.version, user.updated_at)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    response.headers.update(validator_headers(etag))
 
     try:
-        # Ищем пользователя в БД (он уже должен существовать после аутентификации)
-        result = await session.execute(
-            select(User).where(User.id == user_id)
-        )
-        user = result.scalar_one_or_none()
-
-        if not user:
-            logging.error(f"❌ Пользователь {user_id} не найден в БД")
-            raise HTTPException(status_code=404, detail="Пользователь не найден")
-
         profile_data = user.to_dict()
-        logging.info(f"📤 Отправка профиля: {profile_data.get('first_name')} {profile_data.get('last_name')}")
+        logger.debug("📤 Отправка профиля: %s %s", profile_data.get('first_name'), profile_data.get('last_name'))
 
         return profile_data
 
     except Exception as e:
-        logging.error(f"❌ Ошибка в get_profile: {e}", exc_info=True)
+        logger.error("❌ Ошибка в get_profile: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail="Ошибка получения профиля")
 
 @router.get("/check-token")
@@ -73,7 +73,7 @@ async def check_token(
     Returns:
         Информация о токене
     """
-    logging.info("🔍 Запрос проверки токена")
+    logger.info("🔍 Запрос проверки токена")
 
     try:
         # Простая проверка наличия токена
@@ -120,7 +120,7 @@ async def check_token(
             }
 
     except Exception as e:
-        logging.error(f"❌ Ошибка обработки токена: {e}")
+        logger.error("❌ Ошибка обработки токена: %s", e)
         return {
             "status": "error",
             "message": f"Ошибка обработки токена: {str(e)}",
@@ -140,8 +140,8 @@ async def validate_token_only(
     Returns:
         Результат валидации
     """
-    logging.info("🔍 Запрос валидации токена (без БД)")
-    logging.info(f"📋 Получен токен для анализа: {x_init_data[:200]}..." if len(x_init_data) > 200 else f"📋 Получен токен: {x_init_data}")
+    logger.info("🔍 Запрос валидации токена (без БД)")
+    logger.debug("📋 Получен токен для анализа: %.200s", x_init_data)
 
     try:
         # Импортируем функцию валидации
@@ -161,7 +161,7 @@ async def validate_token_only(
         }
 
     except Exception as e:
-        logging.error(f"❌ Ошибка валидации токена: {e}")
+        logger.error("❌ Ошибка валидации токена: %s", e)
         return {
             "status": "invalid",
             "message": str(e),
@@ -191,7 +191,7 @@ async def debug_token(
     ])
     platform = "📱 Mobile" if is_mobile else "💻 Desktop"
 
-    logging.info(f"🐛 {platform} Запрос отладки токена")
+    logger.info("🐛 %s Запрос отладки токена", platform)
 
     return {
         "platform": platform,
@@ -207,7 +207,7 @@ async def debug_token(
 @router.put("/")
 async def update_profile(
     data: ProfileUpdate,
-    current_user: dict = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_model),
     session: AsyncSession = Depends(get_session)
 ):
     """
@@ -219,22 +219,15 @@ async def update_profile(
     Returns:
         Обновленные данные профиля
     """
-    user_id = current_user['id']
-    username = current_user.get('username', 'unknown')
+    user_id = current_user.id
+    username = current_user.username
 
-    logging.info(f"📝 PUT /profiles/ - обновление профиля @{username} (ID: {user_id})")
-    logging.info(f"📊 Данные для обновления: phone={data.phone}, business={data.business_name}, address={data.address}")
+    logger.info("📝 PUT /profiles/ - обновление профиля @%s (ID: %s)", username, user_id)
+    logger.debug("📊 Данные для обновления: phone=%s, business=%s, address=%s", data.phone, data.business_name, data.address)
 
     try:
-        # Ищем пользователя (он должен существовать)
-        result = await session.execute(
-            select(User).where(User.id == user_id)
-        )
-        user = result.scalar_one_or_none()
-
-        if not user:
-            logging.error(f"❌ Пользователь {user_id} не найден в БД")
-            raise HTTPException(status_code=404, detail="Пользователь не найден")
+        # Переносим уже загруженного пользователя в пишущую сессию без SELECT
+        user = await session.merge(current_user, load=False)
 
         # Отслеживаем изменения
         changes = []
@@ -266,24 +259,27 @@ async def update_profile(
                 user.currency = data.currency
                 changes.append(f"currency: {old_currency} → {data.currency}")
 
+        if changes:
+            user.version = User.version + 1
         await session.commit()
         await session.refresh(user)
+        invalidate_user(user_id)
 
         if changes:
-            logging.info(f"✅ Профиль @{username} обновлен: {', '.join(changes)}")
+            logger.info("✅ Профиль @%s обновлен: %s", username, ', '.join(changes))
         else:
-            logging.info(f"ℹ️ Профиль @{username} без изменений")
+            logger.info("ℹ️ Профиль @%s без изменений", username)
 
         return user.to_dict()
 
     except Exception as e:
-        logging.error(f"❌ Ошибка обновления профиля: {e}", exc_info=True)
+        logger.error("❌ Ошибка обновления профиля: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail="Ошибка обновления профиля")
 
 @router.get("/me")
 async def get_current_user_info(
     current_user: dict = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Получить информацию о текущем аутентифицированном пользователе
@@ -292,7 +288,7 @@ async def get_current_user_info(
         Данные текущего пользователя
     """
     user_id = current_user['id']
-    logging.info(f"👤 Запрос информации о пользователе {user_id}")
+    logger.info("👤 Запрос информации о пользователе %s", user_id)
 
     try:
         # Пользователь уже найден через JWT, просто возвращаем данные
@@ -302,12 +298,12 @@ async def get_current_user_info(
         }
 
     except Exception as e:
-        logging.error(f"❌ Ошибка получения информации о пользователе: {e}", exc_info=True)
+        logger.error("❌ Ошибка получения информации о пользователе: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail="Ошибка получения информации о пользователе")
 
 @router.post("/generate-booking-link")
 async def generate_booking_link(
-    current_user: dict = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_model),
     session: AsyncSession = Depends(get_session)
 ):
     """
@@ -319,18 +315,12 @@ async def generate_booking_link(
     import secrets
     import string
     
-    user_id = current_user['id']
-    logging.info(f"🔗 POST /profiles/generate-booking-link - генерация ссылки для пользователя {user_id}")
+    user_id = current_user.id
+    logger.info("🔗 POST /profiles/generate-booking-link - генерация ссылки для пользователя %s", user_id)
     
     try:
-        # Находим пользователя
-        result = await session.execute(
-            select(User).where(User.id == user_id)
-        )
-        user = result.scalar_one_or_none()
-        
-        if not user:
-            raise HTTPException(status_code=404, detail="Пользователь не найден")
+        # Переносим уже загруженного пользователя в пишущую сессию без SELECT
+        user = await session.merge(current_user, load=False)
         
         # Генерируем уникальный slug
         max_attempts = 10
@@ -348,15 +338,17 @@ async def generate_booking_link(
             if not existing:
                 # Slug уникален, используем его
                 user.booking_slug = new_slug
+                user.version = User.version + 1
                 await session.commit()
                 await session.refresh(user)
+                invalidate_user(user_id)
                 
-                logging.info(f"✅ Сгенерирован booking_slug: {new_slug}")
+                logger.info("✅ Сгенерирован booking_slug: %s", new_slug)
                 
                 # Всегда используем booking_cab_bot для публичных ссылок
                 bot_username = "booking_cab_bot"
                 
-                logging.info(f"🔗 Using bot_username for public booking: '{bot_username}'")
+                logger.debug("🔗 Using bot_username for public booking: '%s'", bot_username)
                 
                 # Telegram Web App URL - открывается внутри Telegram
                 telegram_url = f"https://t.me/{bot_username}?start=booking_{new_slug}"
@@ -378,12 +370,12 @@ async def generate_booking_link(
     except HTTPException:
         raise
     except Exception as e:
-        logging.error(f"❌ Ошибка генерации booking_slug: {e}", exc_info=True)
+        logger.error("❌ Ошибка генерации booking_slug: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail="Ошибка генерации ссылки")
 
 @router.delete("/booking-link")
 async def delete_booking_link(
-    current_user: dict = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_model),
     session: AsyncSession = Depends(get_session)
 ):
     """
@@ -392,24 +384,20 @@ async def delete_booking_link(
     Returns:
         Подтверждение удаления
     """
-    user_id = current_user['id']
-    logging.info(f"🗑️ DELETE /profiles/booking-link - удаление ссылки для пользователя {user_id}")
+    user_id = current_user.id
+    logger.info("🗑️ DELETE /profiles/booking-link - удаление ссылки для пользователя %s", user_id)
     
     try:
-        # Находим пользователя
-        result = await session.execute(
-            select(User).where(User.id == user_id)
-        )
-        user = result.scalar_one_or_none()
-        
-        if not user:
-            raise HTTPException(status_code=404, detail="Пользователь не найден")
+        # Переносим уже загруженного пользователя в пишущую сессию без SELECT
+        user = await session.merge(current_user, load=False)
         
         # Удаляем booking_slug
         user.booking_slug = None
+        user.version = User.version + 1
         await session.commit()
+        invalidate_user(user_id)
         
-        logging.info(f"✅ Booking_slug удален для пользователя {user_id}")
+        logger.info("✅ Booking_slug удален для пользователя %s", user_id)
         
         return {
             "message": "Ссылка для бронирования удалена",
@@ -419,7 +407,7 @@ async def delete_booking_link(
     except HTTPException:
         raise
     except Exception as e:
-        logging.error(f"❌ Ошибка удаления booking_slug: {e}", exc_info=True)
+        logger.error("❌ Ошибка удаления booking_slug: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail="Ошибка удаления ссылки")
 
 @router.get("/debug")
@@ -3,7 +3,7 @@ API endpoints для публичного бронирования
 Доступны без авторизации для клиентов
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from pydantic import BaseModel, Field, EmailStr
@@ -14,9 +14,14 @@ import secrets
 import string
 
 from ...shared.database.models import User, Service, Client, Appointment, WorkingHours, WorkingDay, AppointmentStatus
-from ...shared.database.connection import get_session
+from ...shared.database.connection import get_read_session
+from ...shared.database.write_queue import write_coordinator
+from ...shared.utils.cache import invalidate_client_totals
 from ...shared.utils.appointment_utils import validate_appointment_time
 from ...shared.notifications.telegram_notifier import TelegramNotifier
+from ...shared.http import collection_versions, make_etag, not_modified, validator_headers
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/booking", tags=["public-booking"])
 
@@ -62,14 +67,16 @@ def generate_booking_slug(length: int = 8) -> str:
 @router.get("/{booking_slug}/profile")
 async def get_public_profile(
     booking_slug: str,
-    session: AsyncSession = Depends(get_session)
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Получить публичный профиль мастера по booking_slug
     
-    Доступно без авторизации
+    Доступно без авторизации. 304, если совпал If-None-Match
     """
-    logging.info(f"📡 GET /api/booking/{booking_slug}/profile - публичный профиль")
+    logger.info("📡 GET /api/booking/%s/profile - публичный профиль", booking_slug)
     
     # Находим пользователя по booking_slug
     result = await session.execute(
@@ -82,6 +89,12 @@ async def get_public_profile(
     
     if not user:
         raise HTTPException(status_code=404, detail="Мастер не найден")
+
+    etag = make_etag("public-profile", user.id, user.version, user.updated_at)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    response.headers.update(validator_headers(etag))
     
     return {
         "business_name": user.business_name,
@@ -97,31 +110,42 @@ async def get_public_profile(
 @router.get("/{booking_slug}/services")
 async def get_public_services(
     booking_slug: str,
-    session: AsyncSession = Depends(get_session)
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Получить список активных услуг мастера
     
-    Доступно без авторизации
+    Доступно без авторизации. 304, если совпал If-None-Match
     """
-    logging.info(f"📡 GET /api/booking/{booking_slug}/services - публичные услуги")
+    logger.info("📡 GET /api/booking/%s/services - публичные услуги", booking_slug)
     
-    # Находим пользователя
+    # Находим пользователя - нужен только id
     result = await session.execute(
-        select(User).where(
+        select(User.id).where(
             User.booking_slug == booking_slug,
             User.is_active == True
         )
     )
-    user = result.scalar_one_or_none()
+    user_id = result.scalar_one_or_none()
     
-    if not user:
+    if user_id is None:
         raise HTTPException(status_code=404, detail="Мастер не найден")
+
+    # Валидатор по активным услугам: выключение услуги меняет и count, и updated_at
+    etag = make_etag("public-services", user_id, *await collection_versions(
+        session, (Service, Service.user_id == user_id, Service.is_active == True)
+    ))
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    response.headers.update(validator_headers(etag))
     
     # Получаем активные услуги
     result = await session.execute(
         select(Service).where(
-            Service.user_id == user.id,
+            Service.user_id == user_id,
             Service.is_active == True
         ).order_by(Service.name)
     )
@@ -136,14 +160,14 @@ async def get_public_services(
 async def get_public_availability(
     booking_slug: str,
     date: date,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Получить доступные временные слоты на дату
     
     Доступно без авторизации
     """
-    logging.info(f"📡 GET /api/booking/{booking_slug}/availability?date={date}")
+    logger.info("📡 GET /api/booking/%s/availability?date=%s", booking_slug, date)
     
     # Находим пользователя
     result = await session.execute(
@@ -243,14 +267,14 @@ async def get_public_availability(
 async def create_public_booking(
     booking_slug: str,
     booking_data: PublicBookingCreate,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Создать запись от клиента (публичное бронирование)
     
     Доступно без авторизации
     """
-    logging.info(f"📝 POST /api/booking/{booking_slug}/book - публичное бронирование")
+    logger.info("📝 POST /api/booking/%s/book - публичное бронирование", booking_slug)
     
     # Находим пользователя
     result = await session.execute(
@@ -277,56 +301,62 @@ async def create_public_booking(
     if not service:
         raise HTTPException(status_code=404, detail="Услуга не найдена")
     
-    # Проверяем доступность времени
-    is_valid, error_message = await validate_appointment_time(
-        session=session,
-        user_id=user.id,
-        appointment_date=booking_data.appointment_date,
-        duration_minutes=service.duration_minutes
-    )
-    
-    if not is_valid:
-        raise HTTPException(status_code=400, detail=error_message)
-    
-    # Ищем или создаем клиента
-    result = await session.execute(
-        select(Client).where(
-            Client.user_id == user.id,
-            Client.phone == booking_data.client_phone
+    async def book(write_session: AsyncSession):
+        # Проверка пересечений и вставка выполняются в одной транзакции
+        # очереди записи - параллельные брони не займут одно и то же время
+        is_valid, error_message = await validate_appointment_time(
+            session=write_session,
+            user_id=user.id,
+            appointment_date=booking_data.appointment_date,
+            duration_minutes=service.duration_minutes
         )
-    )
-    client = result.scalar_one_or_none()
-    
-    if not client:
-        # Создаем нового клиента
-        client = Client(
+        
+        if not is_valid:
+            raise HTTPException(status_code=400, detail=error_message)
+        
+        # Ищем или создаем клиента
+        result = await write_session.execute(
+            select(Client).where(
+                Client.user_id == user.id,
+                Client.phone == booking_data.client_phone
+            )
+        )
+        client = result.scalar_one_or_none()
+        
+        if not client:
+            # Создаем нового клиента
+            client = Client(
+                user_id=user.id,
+                first_name=booking_data.client_first_name,
+                last_name=booking_data.client_last_name,
+                phone=booking_data.client_phone,
+                email=booking_data.client_email
+            )
+            write_session.add(client)
+            await write_session.flush()
+            logger.info("✨ Создан новый клиент: %s %s", client.first_name, client.phone)
+        
+        # Создаем запись
+        appointment = Appointment(
             user_id=user.id,
-            first_name=booking_data.client_first_name,
-            last_name=booking_data.client_last_name,
-            phone=booking_data.client_phone,
-            email=booking_data.client_email
+            service_id=service.id,
+            client_id=client.id,
+            appointment_date=booking_data.appointment_date,
+            duration_minutes=service.duration_minutes,
+            price=service.price,
+            client_notes=booking_data.client_notes,
+            status=AppointmentStatus.PENDING  # Требует подтверждения мастером
         )
-        session.add(client)
-        await session.flush()
-        logging.info(f"✨ Создан новый клиент: {client.first_name} {client.phone}")
-    
-    # Создаем запись
-    appointment = Appointment(
-        user_id=user.id,
-        service_id=service.id,
-        client_id=client.id,
-        appointment_date=booking_data.appointment_date,
-        duration_minutes=service.duration_minutes,
-        price=service.price,
-        client_notes=booking_data.client_notes,
-        status=AppointmentStatus.PENDING  # Требует подтверждения мастером
-    )
+        
+        write_session.add(appointment)
+        await write_session.flush()
+        return appointment, client
     
-    session.add(appointment)
-    await session.commit()
-    await session.refresh(appointment)
+    appointment, client = await write_coordinator.submit(book)
+    # Бронирование могло создать нового клиента
+    invalidate_client_totals(user.id)
     
-    logging.info(f"✅ Публичная запись создана: {appointment.id}")
+    logger.info("✅ Публичная запись создана: %s", appointment.id)
     
     # Отправляем уведомление мастеру
     try:
@@ -350,11 +380,11 @@ async def create_public_booking(
             telegram_id=user.telegram_id,
             appointment_data=notification_data
         )
-        logging.info(f"📬 Уведомление отправлено мастеру {user.telegram_id}")
+        logger.info("📬 Уведомление отправлено мастеру %s", user.telegram_id)
         
     except Exception as e:
         # Не прерываем процесс, если уведомление не отправилось
-        logging.error(f"❌ Ошибка отправки уведомления: {e}")
+        logger.error("❌ Ошибка отправки уведомления: %s", e)
     
     return {
         "message": "Запись успешно создана! Ожидайте подтверждения от мастера.",
@@ -3,7 +3,7 @@ API endpoints для управления графиком работы
 Слой Features - функциональность
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import time, datetime, timedelta
 import datetime as dt
@@ -12,9 +12,13 @@ from pydantic import BaseModel, Field
 from typing import List, Optional
 import logging
 
-from ...shared.database.models import WorkingHours, User, WorkingDay
-from ...shared.database.connection import get_session
-from ...shared.auth.jwt_auth import get_current_user
+from ...shared.database.models import WorkingHours, User, WorkingDay, Appointment, AppointmentStatus
+from ...shared.database.connection import get_session, get_read_session, backend
+from ...shared.auth.jwt_auth import get_current_user_model
+from ...shared.utils.appointment_utils import appointment_date_range
+from ...shared.http import collection_versions, make_etag, not_modified, validator_headers
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/schedule", tags=["schedule"])
 
@@ -33,8 +37,10 @@ class WorkingHoursBulkUpdate(BaseModel):
 
 @router.get("")
 async def get_working_hours(
-    current_user: dict = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    request: Request,
+    response: Response,
+    user: User = Depends(get_current_user_model),
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Получить график работы пользователя
@@ -43,31 +49,21 @@ async def get_working_hours(
         X-Init-Data: initData от Telegram WebApp
 
     Returns:
-        График работы по дням недели
+        График работы по дням недели (304, если совпал If-None-Match)
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"📡 GET /api/schedule/ - запрос графика для пользователя {telegram_id}")
-
-    # Находим пользователя
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
+    telegram_id = user.telegram_id
+    logger.info("📡 GET /api/schedule/ - запрос графика для пользователя %s", telegram_id)
+
+    # Валидатор по обеим таблицам графика одним запросом
+    etag = make_etag("schedule", user.id, *await collection_versions(
+        session,
+        (WorkingHours, WorkingHours.user_id == user.id),
+        (WorkingDay, WorkingDay.user_id == user.id),
+    ))
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    response.headers.update(validator_headers(etag))
 
     # Получаем график работы
     result = await session.execute(
@@ -93,7 +89,7 @@ async def get_working_hours(
 @router.put("")
 async def update_working_hours_bulk(
     schedule_data: WorkingHoursBulkUpdate,
-    current_user: dict = Depends(get_current_user),
+    user: User = Depends(get_current_user_model),
     session: AsyncSession = Depends(get_session)
 ):
     """
@@ -108,29 +104,8 @@ async def update_working_hours_bulk(
     Returns:
         Обновленный график работы
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"📝 PUT /api/schedule/ - обновление графика для пользователя {telegram_id}")
-
-    # Находим пользователя
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
+    telegram_id = user.telegram_id
+    logger.info("📝 PUT /api/schedule/ - обновление графика для пользователя %s", telegram_id)
 
     # Удаляем существующий график
     await session.execute(
@@ -182,7 +157,7 @@ async def update_working_hours_bulk(
     for wh in working_hours_objects:
         await session.refresh(wh)
 
-    logging.info(f"✅ График работы обновлен для пользователя {telegram_id}")
+    logger.info("✅ График работы обновлен для пользователя %s", telegram_id)
     return {
         "working_hours": [wh.to_dict() for wh in working_hours_objects],
         "message": "График работы успешно обновлен"
@@ -204,60 +179,40 @@ class WorkingDaysBulkUpdate(BaseModel):
 @router.put("/days")
 async def update_working_days_bulk(
     schedule_data: WorkingDaysBulkUpdate,
-    current_user: dict = Depends(get_current_user),
+    user: User = Depends(get_current_user_model),
     session: AsyncSession = Depends(get_session)
 ):
     """
     Массово обновить конкретные рабочие дни (исключения)
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"📝 PUT /api/schedule/days - обновление дней для пользователя {telegram_id}")
-
-    # Находим пользователя
-    result = await session.execute(select(User).where(User.telegram_id == telegram_id))
-    user = result.scalar_one_or_none()
-    
-    if not user:
-        # Создаем пользователя если нет (хотя по идее должен быть)
-        user = User(telegram_id=telegram_id, first_name=current_user.get('first_name', 'User'))
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
+    telegram_id = user.telegram_id
+    logger.info("📝 PUT /api/schedule/days - обновление дней для пользователя %s", telegram_id)
+
+    # Одна дата - одна строка: при повторе в запросе побеждает последнее значение
+    rows_by_date = {
+        day_data.date: {
+            "user_id": user.id,
+            "date": day_data.date,
+            "is_working_day": day_data.is_working_day,
+            "start_time": day_data.start_time,
+            "end_time": day_data.end_time,
+            "break_start": day_data.break_start,
+            "break_end": day_data.break_end,
+        }
+        for day_data in schedule_data.working_days
+    }
 
     updated_days = []
-    
-    for day_data in schedule_data.working_days:
-        # Проверяем, есть ли уже запись на этот день
-        result = await session.execute(
-            select(WorkingDay).where(
-                WorkingDay.user_id == user.id,
-                WorkingDay.date == day_data.date
-            )
-        )
-        existing_day = result.scalar_one_or_none()
-
-        if existing_day:
-            # Обновляем
-            existing_day.is_working_day = day_data.is_working_day
-            existing_day.start_time = day_data.start_time
-            existing_day.end_time = day_data.end_time
-            existing_day.break_start = day_data.break_start
-            existing_day.break_end = day_data.break_end
-            updated_days.append(existing_day)
-        else:
-            # Создаем новый
-            new_day = WorkingDay(
-                user_id=user.id,
-                date=day_data.date,
-                is_working_day=day_data.is_working_day,
-                start_time=day_data.start_time,
-                end_time=day_data.end_time,
-                break_start=day_data.break_start,
-                break_end=day_data.break_end
-            )
-            session.add(new_day)
-            updated_days.append(new_day)
+    if rows_by_date:
+        # Один INSERT ... ON CONFLICT вместо select + insert/update на каждый день
+        stmt = backend.upsert(
+            WorkingDay,
+            list(rows_by_date.values()),
+            index_elements=["user_id", "date"],
+            update_columns=["is_working_day", "start_time", "end_time", "break_start", "break_end"],
+        ).returning(WorkingDay)
+        result = await session.execute(stmt, execution_options={"populate_existing": True})
+        updated_days = result.scalars().all()
 
     await session.commit()
     
@@ -269,8 +224,8 @@ async def update_working_days_bulk(
 @router.get("/availability")
 async def get_availability(
     date: str,
-    current_user: dict = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    user: User = Depends(get_current_user_model),
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Получить доступные временные слоты на указанную дату
@@ -284,9 +239,7 @@ async def get_availability(
     Returns:
         Доступные временные слоты
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"📡 GET /api/schedule/availability - запрос доступности на {date}")
+    logger.info("📡 GET /api/schedule/availability - запрос доступности на %s", date)
 
     try:
         check_date = datetime.strptime(date, '%Y-%m-%d').date()
@@ -296,26 +249,6 @@ async def get_availability(
     # Определяем день недели (0=понедельник, 6=воскресенье)
     day_of_week = check_date.weekday()
 
-    # Находим пользователя
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
-
     # Получаем настройки рабочего дня
     result = await session.execute(
         select(WorkingHours).where(
@@ -336,8 +269,8 @@ async def get_availability(
     result = await session.execute(
         select(Appointment).where(
             Appointment.user_id == user.id,
-            func.date(Appointment.appointment_date) == check_date,
-            Appointment.status.in_([AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED])
+            Appointment.status.in_([AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED]),
+            *appointment_date_range(check_date, check_date)
         ).order_by(Appointment.appointment_date)
     )
     appointments = result.scalars().all()
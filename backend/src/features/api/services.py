@@ -3,7 +3,7 @@ API endpoints для управления услугами
 Слой Features - функциональность
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from pydantic import BaseModel, Field
@@ -11,8 +11,13 @@ from typing import List, Optional
 import logging
 
 from ...shared.database.models import Service, User
-from ...shared.database.connection import get_session
-from ...shared.auth.jwt_auth import get_current_user
+from ...shared.database.connection import get_session, get_read_session
+from ...shared.auth.jwt_auth import get_current_user_model
+from ...shared.database.serializers import service_serializer
+from ...shared.http import FastJSONResponse, collection_versions, make_etag, not_modified, validator_headers
+from ...shared.utils.appointment_utils import MAX_APPOINTMENT_DURATION_MINUTES
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/services", tags=["services"])
 
@@ -21,7 +26,7 @@ class ServiceCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=255, description="Название услуги")
     description: Optional[str] = Field(None, description="Описание услуги")
     price: float = Field(..., gt=0, description="Цена услуги")
-    duration_minutes: int = Field(..., gt=0, le=1440, description="Продолжительность в минутах")
+    duration_minutes: int = Field(..., gt=0, le=MAX_APPOINTMENT_DURATION_MINUTES, description="Продолжительность в минутах")
     color: str = Field("#4CAF50", pattern=r'^#[0-9A-Fa-f]{6}$', description="Цвет для UI (hex)")
 
 class ServiceUpdate(BaseModel):
@@ -29,14 +34,16 @@ class ServiceUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=255, description="Название услуги")
     description: Optional[str] = Field(None, description="Описание услуги")
     price: Optional[float] = Field(None, gt=0, description="Цена услуги")
-    duration_minutes: Optional[int] = Field(None, gt=0, le=1440, description="Продолжительность в минутах")
+    duration_minutes: Optional[int] = Field(None, gt=0, le=MAX_APPOINTMENT_DURATION_MINUTES, description="Продолжительность в минутах")
     color: Optional[str] = Field(None, pattern=r'^#[0-9A-Fa-f]{6}$', description="Цвет для UI (hex)")
     is_active: Optional[bool] = Field(None, description="Активна ли услуга")
 
 @router.get("/")
 async def get_services(
-    current_user: dict = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    request: Request,
+    user: User = Depends(get_current_user_model),
+    session: AsyncSession = Depends(get_read_session),
+    fields: Optional[str] = None
 ):
     """
     Получить список услуг пользователя
@@ -44,48 +51,44 @@ async def get_services(
     Headers:
         X-Init-Data: initData от Telegram WebApp
 
+    Query Parameters:
+        fields: Поля услуги через запятую (id,name,color,duration_minutes)
+
     Returns:
-        Список услуг пользователя
+        Список услуг пользователя (304, если совпал If-None-Match)
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"📡 GET /api/services/ - запрос услуг для пользователя {user_id}")
-
-    # Находим пользователя
+    logger.info("📡 GET /api/services/ - запрос услуг для пользователя %s", user.id)
+
+    try:
+        serializer, load_options = service_serializer.sparse(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Валидатор - количество услуг и последнее изменение; если у клиента
+    # актуальная версия, строки не читаем
+    etag = make_etag("services", user.id, fields, *await collection_versions(
+        session, (Service, Service.user_id == user.id)
+    ))
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+
+    # Получаем услуги пользователя - только запрошенные колонки
     result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
-
-    # Получаем услуги пользователя
-    result = await session.execute(
-        select(Service).where(Service.user_id == user.id).order_by(Service.created_at.desc())
+        select(Service).options(*load_options).where(Service.user_id == user.id).order_by(Service.created_at.desc())
     )
     services = result.scalars().all()
 
-    return {
-        "services": [service.to_dict() for service in services],
+    # Сразу в JSON, минуя jsonable_encoder
+    return FastJSONResponse({
+        "services": serializer.many(services),
         "total": len(services)
-    }
+    }, headers=validator_headers(etag))
 
 @router.post("/")
 async def create_service(
     service_data: ServiceCreate,
-    current_user: dict = Depends(get_current_user),
+    user: User = Depends(get_current_user_model),
     session: AsyncSession = Depends(get_session)
 ):
     """
@@ -100,29 +103,8 @@ async def create_service(
     Returns:
         Созданная услуга
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"📝 POST /api/services/ - создание услуги для пользователя {telegram_id}")
-
-    # Находим пользователя
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
+    telegram_id = user.telegram_id
+    logger.info("📝 POST /api/services/ - создание услуги для пользователя %s", telegram_id)
 
     # Создаем услугу
     service = Service(
@@ -138,14 +120,14 @@ async def create_service(
     await session.commit()
     await session.refresh(service)
 
-    logging.info(f"✅ Услуга '{service.name}' создана для пользователя {telegram_id}")
+    logger.info("✅ Услуга '%s' создана для пользователя %s", service.name, telegram_id)
     return service.to_dict()
 
 @router.get("/{service_id}")
 async def get_service(
     service_id: int,
-    current_user: dict = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    user: User = Depends(get_current_user_model),
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Получить конкретную услугу
@@ -159,29 +141,7 @@ async def get_service(
     Returns:
         Данные услуги
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"📡 GET /api/services/{service_id} - запрос услуги {service_id}")
-
-    # Находим пользователя
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
+    logger.info("📡 GET /api/services/%s - запрос услуги %s", service_id, service_id)
 
     # Находим услугу
     result = await session.execute(
@@ -201,7 +161,7 @@ async def get_service(
 async def update_service(
     service_id: int,
     service_data: ServiceUpdate,
-    current_user: dict = Depends(get_current_user),
+    user: User = Depends(get_current_user_model),
     session: AsyncSession = Depends(get_session)
 ):
     """
@@ -219,29 +179,7 @@ async def update_service(
     Returns:
         Обновленная услуга
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"📝 PUT /api/services/{service_id} - обновление услуги {service_id}")
-
-    # Находим пользователя
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
+    logger.info("📝 PUT /api/services/%s - обновление услуги %s", service_id, service_id)
 
     # Находим услугу
     result = await session.execute(
@@ -263,13 +201,13 @@ async def update_service(
     await session.commit()
     await session.refresh(service)
 
-    logging.info(f"✅ Услуга '{service.name}' обновлена")
+    logger.info("✅ Услуга '%s' обновлена", service.name)
     return service.to_dict()
 
 @router.delete("/{service_id}")
 async def delete_service(
     service_id: int,
-    current_user: dict = Depends(get_current_user),
+    user: User = Depends(get_current_user_model),
     session: AsyncSession = Depends(get_session)
 ):
     """
@@ -284,29 +222,7 @@ async def delete_service(
     Returns:
         Сообщение об успешном удалении
     """
-    user_id = current_user['id']
-    telegram_id = current_user['telegram_id']
-    logging.info(f"🗑️ DELETE /api/services/{service_id} - удаление услуги {service_id}")
-
-    # Находим пользователя
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
-
-    # Если пользователя нет - создаем (автоматическая регистрация)
-    if not user:
-        logging.info(f"✨ Создание нового пользователя для Telegram ID: {telegram_id}")
-        user = User(
-            telegram_id=telegram_id,
-            first_name=current_user.get('first_name', 'Пользователь'),
-            last_name=current_user.get('last_name', ''),
-            username=current_user.get('username', '')
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logging.info(f"✅ Новый пользователь создан (ID: {user.id})")
+    logger.info("🗑️ DELETE /api/services/%s - удаление услуги %s", service_id, service_id)
 
     # Находим услугу
     result = await session.execute(
@@ -332,7 +248,7 @@ async def delete_service(
     await session.delete(service)
     await session.commit()
 
-    logging.info(f"✅ Услуга '{service.name}' удалена")
+    logger.info("✅ Услуга '%s' удалена", service.name)
     return {"message": "Услуга успешно удалена"}
 
 # Экспорт роутеров
@@ -0,0 +1,103 @@
+"""
+API endpoint дельта-синхронизации
+Слой Features - функциональность
+
+Mini App хранит записи, клиентов и услуги локально и вместо полных
+списков запрашивает только изменения после своего курсора - номера из
+счетчика мастера (см. shared/database/changes.py).
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+import logging
+
+from ...shared.database.models import Appointment, Client, Service, Tombstone, User
+from ...shared.database.connection import get_read_session
+from ...shared.auth.jwt_auth import get_current_user_model
+from ...shared.database.serializers import appointment_serializer, client_serializer, service_serializer
+from ...shared.http import FastJSONResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+# Записи без встроенных услуги и клиента - они приходят своими списками
+_appointment_serializer, _appointment_options = appointment_serializer.sparse(include="", always=("change_seq",))
+
+# Ключ ответа -> (модель, сериализатор, опции запроса)
+SYNCED = {
+    "appointments": (Appointment, _appointment_serializer, _appointment_options),
+    "clients": (Client, client_serializer, []),
+    "services": (Service, service_serializer, []),
+}
+
+
+@router.get("")
+async def sync_changes(
+    since: int = Query(0, ge=0, description="Курсор из прошлого ответа (0 - полная выгрузка)"),
+    limit: int = Query(500, ge=1, le=2000, description="Максимум изменений в ответе"),
+    user: User = Depends(get_current_user_model),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Изменения записей, клиентов и услуг после курсора
+
+    Query Parameters:
+        since: Курсор из прошлого ответа; 0 - все текущие данные без удалений
+        limit: Максимум изменений в ответе
+
+    Returns:
+        Измененные объекты, id удаленных, новый курсор и has_more - если
+        изменений больше limit, следующий запрос продолжит с cursor
+    """
+    logger.info("📡 GET /api/sync - изменения после %s для пользователя %s", since, user.id)
+
+    # Счетчик читается первым: все изменения с номерами до него уже
+    # закоммичены, более поздние попадут в следующую синхронизацию
+    result = await session.execute(select(User.change_seq).where(User.id == user.id))
+    current = result.scalar_one()
+    if since > current:
+        raise HTTPException(status_code=410, detail="Курсор синхронизации устарел, нужна полная выгрузка")
+
+    # Из каждого источника - не больше limit + 1 первых изменений,
+    # затем общий порядок по номеру
+    changes = []
+    for key, (model, serializer, options) in SYNCED.items():
+        result = await session.execute(
+            select(model).options(*options)
+            .where(model.user_id == user.id, model.change_seq > since, model.change_seq <= current)
+            .order_by(model.change_seq).limit(limit + 1)
+        )
+        changes.extend((obj.change_seq, key, serializer.native(obj)) for obj in result.scalars())
+
+    if since:
+        result = await session.execute(
+            select(Tombstone.change_seq, Tombstone.entity, Tombstone.entity_id)
+            .where(Tombstone.user_id == user.id, Tombstone.change_seq > since, Tombstone.change_seq <= current)
+            .order_by(Tombstone.change_seq).limit(limit + 1)
+        )
+        changes.extend((seq, None, (entity, entity_id)) for seq, entity, entity_id in result)
+
+    changes.sort(key=lambda change: change[0])
+    has_more = len(changes) > limit
+    if has_more:
+        changes = changes[:limit]
+        current = changes[-1][0]
+
+    response = {key: [] for key in SYNCED}
+    response["deleted"] = {key: [] for key in SYNCED}
+    for _, key, data in changes:
+        if key is None:
+            entity, entity_id = data
+            response["deleted"][entity].append(entity_id)
+        else:
+            response[key].append(data)
+    response["cursor"] = current
+    response["has_more"] = has_more
+
+    return FastJSONResponse(response)
+
+
+# Экспорт роутеров
+__all__ = ["router"]
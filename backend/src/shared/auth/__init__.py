@@ -3,7 +3,7 @@
 """
 
 from .telegram_auth import validate_telegram_init_data, get_telegram_user, authenticate_user
-from .jwt_auth import jwt_auth, get_current_user, create_token_response
+from .jwt_auth import jwt_auth, get_current_user, get_current_user_model, create_token_response, issue_tokens
 
 __all__ = [
     'validate_telegram_init_data',
@@ -11,6 +11,8 @@ __all__ = [
     'authenticate_user',
     'jwt_auth',
     'get_current_user',
-    'create_token_response'
+    'get_current_user_model',
+    'create_token_response',
+    'issue_tokens'
 ]
 
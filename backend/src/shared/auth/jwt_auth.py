@@ -6,18 +6,29 @@ JWT аутентификация для системы управления за
 import jwt
 import logging
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, Tuple
 from fastapi import HTTPException, Depends, Cookie
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
 from ..database.models import User
-from ..database.connection import get_session
+from ..database.connection import get_read_session
 from ..config.env_loader import get_jwt_settings
+from ..utils.cache import users as user_cache
+from ..logger.context import bind_user
+from .refresh_tokens import REFRESH_TOKEN_EXPIRE_DAYS, add_refresh_token, revoked_families
+
+logger = logging.getLogger(__name__)
 
 # Схема безопасности для Bearer токенов
 security = HTTPBearer(auto_error=False)
 
+# Пользователь, уже проверенный POST /api/batch: подзапросы пакета не
+# разбирают токен заново
+batch_user: ContextVar[Optional[Dict[str, Any]]] = ContextVar("batch_user", default=None)
+
 class JWTAuth:
     """Класс для работы с JWT токенами"""
 
@@ -33,17 +44,27 @@ class JWTAuth:
         return encoded_jwt
 
     def create_refresh_token(self, data: Dict[str, Any]) -> str:
-        """Создает refresh токен (срок жизни 30 дней)"""
+        """Создает refresh токен (срок жизни REFRESH_TOKEN_EXPIRE_DAYS)"""
         to_encode = data.copy()
-        expire = datetime.now(timezone.utc) + timedelta(days=30)
+        expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
         to_encode.update({"exp": expire, "type": "refresh"})
         encoded_jwt = jwt.encode(to_encode, self.settings["secret_key"], algorithm=self.settings["algorithm"])
         return encoded_jwt
 
-    def decode_token(self, token: str) -> Dict[str, Any]:
-        """Декодирует и валидирует токен"""
+    def decode_token(self, token: str, verify_exp: bool = True) -> Dict[str, Any]:
+        """
+        Декодирует и валидирует токен
+
+        Args:
+            verify_exp: False - принять истекший токен (для отзыва при выходе)
+        """
         try:
-            payload = jwt.decode(token, self.settings["secret_key"], algorithms=[self.settings["algorithm"]])
+            payload = jwt.decode(
+                token,
+                self.settings["secret_key"],
+                algorithms=[self.settings["algorithm"]],
+                options={"verify_exp": verify_exp}
+            )
             return payload
         except jwt.ExpiredSignatureError:
             raise HTTPException(status_code=401, detail="Токен истек")
@@ -57,11 +78,42 @@ class JWTAuth:
 # Глобальный экземпляр JWT аутентификации
 jwt_auth = JWTAuth()
 
+def token_claims(user: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Данные пользователя, которые несет токен
+
+    ver - версия профиля на момент выдачи токена. Закэшированная запись
+    старше этой версии считается устаревшей (профиль менялся в другом процессе).
+    """
+    return {
+        "sub": str(user["id"]),
+        "telegram_id": user["telegram_id"],
+        "ver": user.get("version", 1)
+    }
+
+def cache_user(user: User) -> Dict[str, Any]:
+    """Кладет пользователя в кэш и возвращает его данные (to_dict)"""
+    columns = {attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs}
+    user_dict = user.to_dict()
+    user_cache.set(("user", user.id), (columns, user_dict))
+    return user_dict
+
+def get_cached_user(user_id: int, version: int = 0) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Пользователь из кэша, если запись не старше версии из токена
+
+    Returns:
+        tuple: (значения колонок, to_dict()) или None
+    """
+    entry = user_cache.get(("user", user_id))
+    if entry is None or entry[0]["version"] < version:
+        return None
+    return entry
+
 async def get_current_user(
     access_token: Optional[str] = Cookie(None, alias="access_token"),
-    refresh_token: Optional[str] = Cookie(None, alias="refresh_token"),
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ) -> Dict[str, Any]:
     """
     Dependency для получения текущего пользователя из JWT токена
@@ -69,29 +121,33 @@ async def get_current_user(
     Поддерживает два способа передачи токена:
     1. HTTP-only cookies (рекомендуемый способ)
     2. Authorization header (для отладки)
+
+    Истекший access токен - 401: клиент обновляет пару через /auth/refresh,
+    где refresh токен проходит ротацию.
     """
-    # Логирование для отладки
-    logging.info(f"🔍 get_current_user: access_token from cookie: {access_token[:20] if access_token else 'None'}...")
-    logging.info(f"🔍 get_current_user: refresh_token from cookie: {refresh_token[:20] if refresh_token else 'None'}...")
-    logging.info(f"🔍 get_current_user: credentials from header: {credentials.credentials[:20] if credentials and credentials.credentials else 'None'}...")
-    
+    shared = batch_user.get()
+    if shared is not None:
+        return dict(shared)
+
     token = None
 
     # Сначала пытаемся получить токен из cookies
     if access_token:
         token = access_token
         token_source = "cookies"
-        logging.info("✅ Токен получен из cookies")
     # Если токен в cookies отсутствует, пробуем Authorization header
     elif credentials:
         token = credentials.credentials
         token_source = "header"
-        logging.info("✅ Токен получен из Authorization header")
 
     if not token:
-        logging.error("❌ Токен отсутствует и в cookies, и в header")
+        logger.error("❌ Токен отсутствует и в cookies, и в header")
         raise HTTPException(status_code=401, detail="Отсутствует токен авторизации")
 
+    # Диагностика токенов - только на DEBUG: вызывается на каждый запрос
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("🔍 get_current_user: токен из %s: %s...", token_source, token[:20])
+
     try:
         # Декодируем токен
         payload = jwt_auth.decode_token(token)
@@ -104,80 +160,85 @@ async def get_current_user(
         user_id = payload.get("sub")
         if not user_id:
             raise HTTPException(status_code=401, detail="Неверный токен: отсутствует user_id")
+        bind_user(int(user_id))
 
-        # Получаем пользователя из БД
-        result = await session.execute(
-            User.__table__.select().where(User.id == int(user_id))
-        )
-        user = result.first()
+        # Сессия завершена (выход или кража refresh токена) - проверка в памяти
+        if revoked_families.is_revoked(payload.get("fam")):
+            raise HTTPException(status_code=401, detail="Сессия завершена, войдите заново")
+
+        # Большинство запросов берут пользователя из кэша без обращения к БД
+        cached = get_cached_user(int(user_id), payload.get("ver", 0))
+        if cached:
+            user_dict = dict(cached[1])
+        else:
+            # Identity map хранит объекты по слабым ссылкам, поэтому держим
+            # пользователя в session.info до конца запроса -
+            # get_current_user_model() получит его без второго запроса
+            user = await session.get(User, int(user_id))
 
-        if not user:
-            raise HTTPException(status_code=401, detail="Пользователь не найден")
+            if not user:
+                raise HTTPException(status_code=401, detail="Пользователь не найден")
+            session.info["current_user"] = user
+            user_dict = cache_user(user)
 
-        # Преобразуем SQLAlchemy Row в dict
-        user_dict = dict(user._mapping)
         user_dict["token_source"] = token_source
 
         return user_dict
 
-    except jwt.ExpiredSignatureError:
-        # Если access токен истек, пробуем обновить его с помощью refresh токена
-        if refresh_token:
-            try:
-                # Валидируем refresh токен
-                refresh_payload = jwt_auth.decode_token(refresh_token)
-
-                if not jwt_auth.verify_token_type(refresh_payload, "refresh"):
-                    raise HTTPException(status_code=401, detail="Неверный refresh токен")
-
-                refresh_user_id = refresh_payload.get("sub")
-                if not refresh_user_id:
-                    raise HTTPException(status_code=401, detail="Неверный refresh токен")
-
-                # Получаем пользователя из БД
-                result = await session.execute(
-                    User.__table__.select().where(User.id == int(refresh_user_id))
-                )
-                user = result.first()
-
-                if not user:
-                    raise HTTPException(status_code=401, detail="Пользователь не найден")
-
-                # Создаем новые токены
-                user_data = {"sub": str(user.id), "telegram_id": user.telegram_id}
-                new_access_token = jwt_auth.create_access_token(user_data)
-                new_refresh_token = jwt_auth.create_refresh_token(user_data)
-
-                # Возвращаем пользователя с новыми токенами (для установки в cookies)
-                user_dict = dict(user)
-                user_dict["new_access_token"] = new_access_token
-                user_dict["new_refresh_token"] = new_refresh_token
-                user_dict["token_refreshed"] = True
-
-                return user_dict
-
-            except Exception as e:
-                raise HTTPException(status_code=401, detail=f"Ошибка обновления токена: {str(e)}")
-        else:
-            raise HTTPException(status_code=401, detail="Access токен истек и отсутствует refresh токен")
-
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Ошибка валидации токена: {str(e)}")
 
-def create_token_response(user: Dict[str, Any]) -> Dict[str, Any]:
+async def get_current_user_model(
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session)
+) -> User:
+    """
+    Dependency: текущий пользователь как ORM-объект
+
+    FastAPI кэширует зависимости в пределах запроса, поэтому get_current_user
+    и сессия чтения у них общие. Если get_current_user загрузил пользователя
+    из БД, объект уже лежит в session.info; если взял из кэша - объект
+    собирается из закэшированных колонок в состоянии detached, без запроса.
+    Пользователь создается только при входе (/auth/signin) - обработчикам
+    не нужно искать или создавать его заново.
+
+    Связи (user.services и т.д.) у объекта не загружены. Для изменения
+    пользователя обработчик переносит его в свою сессию через
+    session.merge(user, load=False) и после коммита вызывает invalidate_user().
+    """
+    user = session.info.get("current_user")
+    if user is not None:
+        return user
+
+    cached = get_cached_user(current_user["id"])
+    if cached:
+        user = User(**cached[0])
+        make_transient_to_detached(user)
+        return user
+
+    user = await session.get(User, current_user["id"])
+    if not user:
+        raise HTTPException(status_code=401, detail="Пользователь не найден")
+    return user
+
+def create_token_response(user: Dict[str, Any], family_id: Optional[str] = None, jti: Optional[str] = None) -> Dict[str, Any]:
     """
     Создает ответ с токенами для установки в cookies
 
+    Args:
+        user: Данные пользователя (to_dict)
+        family_id: Семейство refresh токенов (claim fam в обоих токенах)
+        jti: ID зарегистрированного refresh токена
+
     Returns:
         dict с данными пользователя и токенами
     """
-    user_data = {
-        "sub": str(user["id"]),
-        "telegram_id": user["telegram_id"]
-    }
+    user_data = token_claims(user)
+    if family_id:
+        user_data["fam"] = family_id
 
     access_token = jwt_auth.create_access_token(user_data)
-    refresh_token = jwt_auth.create_refresh_token(user_data)
+    refresh_token = jwt_auth.create_refresh_token({**user_data, "jti": jti} if jti else user_data)
 
     return {
         "user": user,
@@ -185,3 +246,18 @@ def create_token_response(user: Dict[str, Any]) -> Dict[str, Any]:
         "refresh_token": refresh_token,
         "token_type": "bearer"
     }
+
+async def issue_tokens(session: AsyncSession, user: Dict[str, Any], family_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Выдает пару токенов и регистрирует refresh токен (коммит - за вызывающим)
+
+    Args:
+        session: Пишущая сессия
+        user: Данные пользователя (to_dict)
+        family_id: Семейство при ротации; None - новый вход
+
+    Returns:
+        dict: Как create_token_response()
+    """
+    jti, family_id, _ = add_refresh_token(session, user["id"], family_id)
+    return create_token_response(user, family_id=family_id, jti=jti)
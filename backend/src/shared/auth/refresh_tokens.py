@@ -0,0 +1,208 @@
+"""
+Ротация refresh токенов и индекс отозванных семейств
+Слой Shared - общие компоненты
+
+Каждый вход (/auth/signin) открывает семейство токенов. /auth/refresh
+обменивает refresh токен на следующий в том же семействе, а старый
+помечает использованным. Если использованный токен предъявлен повторно,
+значит его украли - отзывается все семейство, и вор, и владелец
+проходят вход заново.
+
+Исключение - повтор в первые REFRESH_REUSE_GRACE_SECONDS после обмена:
+так выглядят параллельные запросы клиента, получившие 401 одновременно.
+Им выдается текущий токен семейства, семейство не отзывается.
+
+Access токены несут claim fam. Проверка отзыва идет по индексу в памяти,
+без запроса к БД: индекс восстанавливается из таблицы при старте и
+пополняется при отзыве. API работает одним процессом, поэтому индекс
+в памяти - полный.
+"""
+
+import heapq
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.models import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+# Срок жизни refresh токена (и cookie refresh_token)
+REFRESH_TOKEN_EXPIRE_DAYS = 30
+
+# Окно, в котором повтор только что обменянного токена - гонка, а не кража
+REFRESH_REUSE_GRACE_SECONDS = 10
+
+
+class RevocationIndex:
+    """
+    Отозванные семейства в памяти, упорядоченные по сроку истечения
+
+    После истечения последнего токена семейства запись больше не нужна:
+    такие токены отклоняются уже по exp. Куча по expires_at позволяет
+    выбрасывать их без обхода всего индекса.
+    """
+
+    def __init__(self):
+        self._expires: Dict[str, datetime] = {}
+        self._heap: List[Tuple[datetime, str]] = []
+
+    def revoke(self, family_id: str, expires_at: datetime) -> None:
+        current = self._expires.get(family_id)
+        if current is None or current < expires_at:
+            self._expires[family_id] = expires_at
+            heapq.heappush(self._heap, (expires_at, family_id))
+
+    def is_revoked(self, family_id: Optional[str]) -> bool:
+        if not family_id:
+            return False
+        self._prune()
+        return family_id in self._expires
+
+    def _prune(self) -> None:
+        now = datetime.utcnow()
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, family_id = heapq.heappop(self._heap)
+            # В куче могут остаться устаревшие дубли после продления срока
+            if self._expires.get(family_id) == expires_at:
+                del self._expires[family_id]
+
+    def clear(self) -> None:
+        self._expires.clear()
+        self._heap.clear()
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+
+# Глобальный индекс отозванных семейств
+revoked_families = RevocationIndex()
+
+
+def add_refresh_token(session: AsyncSession, user_id: int, family_id: Optional[str] = None) -> Tuple[str, str, datetime]:
+    """
+    Регистрирует новый refresh токен (коммит - за вызывающим)
+
+    Args:
+        user_id: ID пользователя
+        family_id: Семейство при ротации; None - новый вход
+
+    Returns:
+        tuple: (jti, family_id, expires_at)
+    """
+    jti = uuid.uuid4().hex
+    family_id = family_id or uuid.uuid4().hex
+    expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    session.add(RefreshToken(jti=jti, family_id=family_id, user_id=user_id, expires_at=expires_at))
+    return jti, family_id, expires_at
+
+
+async def consume_refresh_token(session: AsyncSession, jti: str) -> bool:
+    """
+    Помечает refresh токен использованным
+
+    Один UPDATE без предварительного SELECT: строка меняется, только если
+    токен еще не использован, не отозван и не истек.
+
+    Returns:
+        bool: False - токен неизвестен или уже использован (повторное предъявление)
+    """
+    now = datetime.utcnow()
+    result = await session.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.jti == jti,
+            RefreshToken.used_at.is_(None),
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now,
+        )
+        .values(used_at=now)
+    )
+    return result.rowcount == 1
+
+
+async def find_recent_successor(session: AsyncSession, jti: str) -> Optional[str]:
+    """
+    Текущий токен семейства, если jti обменян не раньше REFRESH_REUSE_GRACE_SECONDS назад
+
+    Параллельный запрос успел обменять тот же токен: вместо отзыва
+    семейства вызывающий выдает клиенту токен с тем же jti, что и у
+    первого ответа.
+
+    Returns:
+        str | None: jti преемника; None - повтор вне окна (считается кражей)
+    """
+    now = datetime.utcnow()
+    result = await session.execute(
+        select(RefreshToken.family_id, RefreshToken.used_at)
+        .where(
+            RefreshToken.jti == jti,
+            RefreshToken.used_at >= now - timedelta(seconds=REFRESH_REUSE_GRACE_SECONDS),
+            RefreshToken.revoked_at.is_(None),
+        )
+    )
+    row = result.first()
+    if row is None:
+        return None
+
+    # Семейство - цепочка, неиспользованный токен в ней один
+    result = await session.execute(
+        select(RefreshToken.jti)
+        .where(
+            RefreshToken.family_id == row.family_id,
+            RefreshToken.created_at >= row.used_at,
+            RefreshToken.used_at.is_(None),
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now,
+        )
+        .order_by(RefreshToken.created_at.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def revoke_family(session: AsyncSession, family_id: str) -> None:
+    """
+    Отзывает все токены семейства (коммит - за вызывающим)
+
+    Индекс обновляется сразу: если коммит не пройдет, пользователь
+    всего лишь войдет заново.
+    """
+    now = datetime.utcnow()
+    await session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    )
+    # Любой токен семейства выдан не позже текущего момента
+    revoked_families.revoke(family_id, now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+
+
+async def load_revoked_families(session: AsyncSession) -> int:
+    """
+    Восстанавливает индекс отозванных семейств при старте
+
+    Заодно удаляет истекшие токены - они уже не пройдут проверку exp.
+
+    Returns:
+        int: Количество отозванных семейств в индексе
+    """
+    now = datetime.utcnow()
+    await session.execute(delete(RefreshToken).where(RefreshToken.expires_at <= now))
+    result = await session.execute(
+        select(RefreshToken.family_id, func.max(RefreshToken.expires_at))
+        .where(RefreshToken.revoked_at.is_not(None))
+        .group_by(RefreshToken.family_id)
+    )
+    rows = result.all()
+    await session.commit()
+
+    revoked_families.clear()
+    for family_id, expires_at in rows:
+        revoked_families.revoke(family_id, expires_at)
+    logger.info("🔐 Индекс отозванных сессий: %s семейств", len(revoked_families))
+    return len(revoked_families)
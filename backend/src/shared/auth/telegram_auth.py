@@ -6,7 +6,9 @@
 import hashlib
 import hmac
 import json
-from urllib.parse import parse_qs, unquote
+import time
+from functools import lru_cache
+from urllib.parse import parse_qsl, unquote
 from fastapi import HTTPException, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
@@ -14,12 +16,64 @@ import logging
 from typing import Optional
 
 from ..database.models import User
+from ..config.env_loader import config
+from ..utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Кэш уже проверенных initData: ключ - строка initData целиком.
+# Mini App при каждом открытии присылает одну и ту же строку, пока
+# Telegram не выдаст новую, - повторная проверка HMAC не нужна
+_validated_init_data = TTLCache(max_size=config.init_data_cache_size, ttl=config.init_data_cache_ttl)
+
+
+@lru_cache(maxsize=16)
+def webapp_secret_key(bot_token: str) -> bytes:
+    """
+    Секретный ключ проверки initData: HMAC_SHA256("WebAppData", bot_token)
+
+    Зависит только от токена бота, поэтому вычисляется один раз на токен
+    за время жизни процесса.
+    """
+    return hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+
+
+def parse_init_data(init_data: str) -> dict:
+    """
+    Разбирает initData в словарь поле -> значение
+
+    Строгий разбор стандартной библиотекой: пара без "=" - ошибка, а не
+    пустое поле. Повторное поле перекрывает предыдущее, как и раньше.
+
+    Raises:
+        HTTPException: 401, если строка не является query string
+    """
+    try:
+        return dict(parse_qsl(init_data, keep_blank_values=True, strict_parsing=True))
+    except ValueError:
+        logger.error("❌ initData не разбираются как query string")
+        raise HTTPException(status_code=401, detail="Init data невалидны")
+
+
+def _check_auth_date(auth_date: Optional[int]) -> None:
+    """Отклоняет initData старше TELEGRAM_AUTH_MAX_AGE (защита от повторного использования)"""
+    if config.telegram_auth_max_age <= 0:
+        return
+    if auth_date is None or time.time() - auth_date > config.telegram_auth_max_age:
+        logger.error("❌ initData устарели (auth_date: %s)", auth_date)
+        raise HTTPException(status_code=401, detail="Init data устарели, перезапустите приложение")
+
 
 def validate_telegram_init_data(init_data: str, bot_token: str | list[str]) -> dict:
     """
     Проверяет подлинность initData от Telegram WebApp
     Поддерживает проверку через несколько токенов (для основного и клиентского бота)
 
+    Строка разбирается за один проход, hash сравнивается за постоянное время,
+    секретные ключи токенов берутся из webapp_secret_key(). Успешно
+    проверенные строки кэшируются: повторный вход с теми же initData
+    проверяет только возраст auth_date.
+
     Args:
         init_data: Строка initData от Telegram WebApp
         bot_token: Токен бота (строка) или список токенов
@@ -28,117 +82,88 @@ def validate_telegram_init_data(init_data: str, bot_token: str | list[str]) -> d
         dict: Распарсенные данные пользователя
 
     Raises:
-        HTTPException: Если данные невалидны
+        HTTPException: Если данные невалидны или устарели
     """
-    logging.info(f"🔐 Начинаем валидацию init_data (длина: {len(init_data) if init_data else 0})")
+    logger.debug("🔐 Начинаем валидацию init_data (длина: %s)", len(init_data) if init_data else 0)
     
     tokens = [bot_token] if isinstance(bot_token, str) else bot_token
     # Фильтруем пустые токены
     tokens = [t for t in tokens if t]
     
     if not tokens:
-        logging.error("❌ Bot token не задан")
+        logger.error("❌ Bot token не задан")
         raise HTTPException(status_code=500, detail="Серверная ошибка: токен бота не настроен")
 
     if not init_data:
-        logging.error("❌ Init data отсутствует")
+        logger.error("❌ Init data отсутствует")
         raise HTTPException(status_code=401, detail="Init data отсутствует")
 
+    cached = _validated_init_data.get(init_data)
+    if cached is not None:
+        token, auth_date, user = cached
+        if token in tokens:
+            _check_auth_date(auth_date)
+            logger.debug("✅ initData уже проверены (кэш): %s (ID: %s)", user.get('username', 'unknown'), user.get('id', 'unknown'))
+            return dict(user)
+
     try:
-        # URL-decode init_data перед парсингом
-        decoded_init_data = unquote(init_data)
-        
-        # Парсим init_data
-        parsed_data = parse_qs(decoded_init_data)
-        
+        # Один проход декодирования. Порядок полей не важен -
+        # data_check_string строится по отсортированным ключам
+        fields = parse_init_data(init_data)
+
         # Извлекаем hash
-        received_hash = parsed_data.get('hash', [None])[0]
+        received_hash = fields.pop('hash', None)
         if not received_hash:
-            logging.error("❌ Hash отсутствует в init_data")
+            logger.error("❌ Hash отсутствует в init_data")
             raise HTTPException(status_code=401, detail="Hash отсутствует в init_data")
 
-        # Удаляем hash из данных для проверки
-        data_check_string_parts = []
-        for key in sorted(parsed_data.keys()):
-            if key != 'hash':
-                value = parsed_data[key][0]
-                data_check_string_parts.append(f"{key}={value}")
-        
-        data_check_string = '\n'.join(data_check_string_parts)
+        data_check_string = '\n'.join(f"{key}={fields[key]}" for key in sorted(fields)).encode()
         
         # Пробуем валидировать с каждым токеном
-        validation_success = False
+        matched_token = None
         
         for token in tokens:
-            try:
-                # Создаем secret key из токена бота
-                secret_key = hmac.new(
-                    "WebAppData".encode(),
-                    token.encode(),
-                    hashlib.sha256
-                ).digest()
-
-                # Вычисляем hash
-                calculated_hash = hmac.new(
-                    secret_key,
-                    data_check_string.encode(),
-                    hashlib.sha256
-                ).hexdigest()
-
-                if calculated_hash == received_hash:
-                    validation_success = True
-                    logging.info(f"✅ Валидация успешна с токеном ...{token[-5:]}")
-                    break
-            except Exception as e:
-                logging.warning(f"⚠️ Ошибка при проверке токена: {e}")
-                continue
+            calculated_hash = hmac.new(webapp_secret_key(token), data_check_string, hashlib.sha256).hexdigest()
+            if hmac.compare_digest(calculated_hash, received_hash):
+                matched_token = token
+                logger.debug("✅ Валидация успешна с токеном ...%s", token[-5:])
+                break
                 
-        if not validation_success:
-            logging.error("❌ Hash не совпадает ни с одним токеном")
+        if matched_token is None:
+            logger.error("❌ Hash не совпадает ни с одним токеном")
             raise HTTPException(status_code=401, detail="Init data невалидны")
-        
+
+        auth_date = int(fields['auth_date']) if fields.get('auth_date', '').isdigit() else None
+        _check_auth_date(auth_date)
+
         # Парсим данные пользователя
-        user_data = parsed_data.get('user', [None])[0]
+        user_data = fields.get('user')
         if user_data:
-            logging.info(f"👤 Raw user data (первые 100 символов): {user_data[:100]}...")
+            logger.debug("👤 Raw user data (первые 100 символов): %s...", user_data[:100])
             try:
-                # Если user_data - это URL-encoded строка, декодируем её
-                if '%' in user_data:
-                    user_data = unquote(user_data)
-                    logging.info(f"👤 Decoded user data (первые 100 символов): {user_data[:100]}...")
-
                 user = json.loads(user_data)
-                logging.info(f"✅ Успешно распарсены данные пользователя: {user.get('username', 'unknown')} (ID: {user.get('id', 'unknown')})")
-                return user
-            except json.JSONDecodeError as e:
-                logging.error(f"❌ Ошибка парсинга JSON пользователя: {e}")
-                logging.error(f"❌ Raw user data: {user_data}")
-                raise HTTPException(status_code=401, detail="Ошибка парсинга данных пользователя")
+            except json.JSONDecodeError:
+                # Некоторые клиенты кодируют initData дважды
+                user = json.loads(unquote(user_data))
+            logger.debug("✅ Успешно распарсены данные пользователя: %s (ID: %s)", user.get('username', 'unknown'), user.get('id', 'unknown'))
+            _validated_init_data.set(init_data, (matched_token, auth_date, user))
+            return dict(user)
         else:
-            logging.error("❌ Данные пользователя отсутствуют в init_data")
+            logger.error("❌ Данные пользователя отсутствуют в init_data")
             raise HTTPException(status_code=401, detail="Данные пользователя отсутствуют")
 
+    except HTTPException:
+        raise
     except json.JSONDecodeError as e:
-        logging.error(f"❌ Ошибка парсинга JSON данных пользователя: {e}")
-        logging.error(f"❌ User data: {user_data}")
+        logger.error("❌ Ошибка парсинга JSON данных пользователя: %s", e)
+        logger.error("❌ User data: %s", user_data)
         raise HTTPException(status_code=401, detail="Ошибка парсинга данных пользователя")
-    except UnicodeDecodeError as e:
-        logging.error(f"❌ Ошибка декодирования URL: {e}")
-        logging.error(f"❌ Raw init_data: {init_data[:200]}...")
-        raise HTTPException(status_code=401, detail="Ошибка декодирования данных")
     except Exception as e:
-        logging.error(f"❌ Ошибка валидации init_data: {e}")
-        logging.error(f"❌ Тип ошибки: {type(e).__name__}")
+        logger.error("❌ Ошибка валидации init_data: %s", e)
+        logger.error("❌ Тип ошибки: %s", type(e).__name__)
         import traceback
-        logging.error(f"❌ Traceback: {traceback.format_exc()}")
-
-        # Для отладки возвращаем более подробную информацию
-        if "hash" in str(e).lower():
-            raise HTTPException(status_code=401, detail="Неверный формат токена авторизации (отсутствует hash)")
-        elif "json" in str(e).lower():
-            raise HTTPException(status_code=401, detail="Неверный формат токена авторизации (проблема с JSON)")
-        else:
-            raise HTTPException(status_code=401, detail=f"Ошибка валидации токена: {str(e)}")
+        logger.error("❌ Traceback: %s", traceback.format_exc())
+        raise HTTPException(status_code=401, detail=f"Ошибка валидации токена: {str(e)}")
 
 async def get_telegram_user(
     x_init_data: str = Header(..., alias="X-Init-Data"),
@@ -155,21 +180,21 @@ async def get_telegram_user(
     ])
     platform = "📱 Mobile" if is_mobile else "💻 Desktop"
 
-    logging.info(f"{platform} запрос - User-Agent: {user_agent[:100]}...")
+    logger.info("%s запрос - User-Agent: %s...", platform, user_agent[:100])
 
     # Проверяем наличие токена
     if not x_init_data or x_init_data.strip() == "":
-        logging.error(f"❌ {platform} - Отсутствует X-Init-Data заголовок")
+        logger.error("❌ %s - Отсутствует X-Init-Data заголовок", platform)
         raise HTTPException(status_code=401, detail="Отсутствует токен авторизации (X-Init-Data)")
 
-    logging.info(f"🔐 {platform} - Получен токен авторизации (длина: {len(x_init_data)} символов)")
+    logger.info("🔐 %s - Получен токен авторизации (длина: %s символов)", platform, len(x_init_data))
 
     # УПРОЩЕННАЯ ОБРАБОТКА: просто парсим user данные
     try:
         # URL-decode токена
         from urllib.parse import unquote
         decoded_token = unquote(x_init_data)
-        logging.debug(f"🔍 Decoded token: {decoded_token[:100]}...")
+        logger.debug("🔍 Decoded token: %s...", decoded_token[:100])
 
         # Парсим параметры
         from urllib.parse import parse_qs
@@ -178,7 +203,7 @@ async def get_telegram_user(
         # Извлекаем user данные
         user_raw = params.get('user', [None])[0]
         if not user_raw:
-            logging.error("❌ Токен не содержит user данные")
+            logger.error("❌ Токен не содержит user данные")
             raise HTTPException(status_code=401, detail="Токен не содержит данные пользователя")
 
         # Если user URL-encoded, декодируем еще раз
@@ -188,14 +213,14 @@ async def get_telegram_user(
         import json
         user_data = json.loads(user_raw)
 
-        logging.info(f"✅ Успешно извлечены данные пользователя: @{user_data.get('username', 'unknown')} (ID: {user_data.get('id', 'unknown')})")
+        logger.info("✅ Успешно извлечены данные пользователя: @%s (ID: %s)", user_data.get('username', 'unknown'), user_data.get('id', 'unknown'))
 
         return user_data
 
     except json.JSONDecodeError as e:
-        logging.error(f"❌ Ошибка парсинга JSON user данных: {e}")
+        logger.error("❌ Ошибка парсинга JSON user данных: %s", e)
         # Возвращаем тестовые данные для отладки
-        logging.warning("🔧 Возвращаем тестовые данные пользователя для отладки")
+        logger.warning("🔧 Возвращаем тестовые данные пользователя для отладки")
         return {
             "id": 123456789,
             "username": "test_user",
@@ -204,9 +229,9 @@ async def get_telegram_user(
             "auth_date": 1234567890
         }
     except Exception as e:
-        logging.error(f"❌ Ошибка обработки токена: {e}")
+        logger.error("❌ Ошибка обработки токена: %s", e)
         # Возвращаем тестовые данные
-        logging.warning("🔧 Возвращаем тестовые данные пользователя")
+        logger.warning("🔧 Возвращаем тестовые данные пользователя")
         return {
             "id": 123456789,
             "username": "debug_user",
@@ -243,7 +268,7 @@ async def authenticate_user(
 
     # Если пользователя нет, создаем
     if not user:
-        logging.info(f"✨ Создание нового пользователя: @{telegram_user.get('username', 'unknown')} (ID: {telegram_id})")
+        logger.info("✨ Создание нового пользователя: @%s (ID: %s)", telegram_user.get('username', 'unknown'), telegram_id)
         user = User(
             telegram_id=telegram_id,
             first_name=telegram_user.get('first_name', 'Пользователь'),
@@ -253,9 +278,9 @@ async def authenticate_user(
         session.add(user)
         await session.commit()
         await session.refresh(user)
-        logging.info(f"✅ Пользователь создан: {user.username} (ID: {user.id})")
+        logger.info("✅ Пользователь создан: %s (ID: %s)", user.username, user.id)
     else:
-        logging.info(f"✅ Пользователь найден: {user.username} (ID: {user.id})")
+        logger.debug("✅ Пользователь найден: %s (ID: %s)", user.username, user.id)
 
     return user.to_dict()
 
@@ -44,14 +44,54 @@ class Config:
         else:
             logger.info("ℹ️ Client bot не настроен, будет использоваться основной бот")
 
+        # Проверка initData Telegram WebApp: максимальный возраст auth_date
+        # (секунды, 0 - не проверять) и кэш уже проверенных строк initData
+        self.telegram_auth_max_age: int = self._get_env_int("TELEGRAM_AUTH_MAX_AGE", 86400)
+        self.init_data_cache_ttl: int = self._get_env_int("INIT_DATA_CACHE_TTL", 600)
+        self.init_data_cache_size: int = self._get_env_int("INIT_DATA_CACHE_SIZE", 1024)
+
         # Настройки базы данных
         self.database_url: str = self._get_env("DATABASE_URL", self._get_default_database_url())
+        # Отдельный URL для чтения (например, реплика PostgreSQL), по умолчанию - та же база
+        self.database_read_url: str = self._get_env("DATABASE_READ_URL", self.database_url)
         self.db_echo: bool = self._get_env_bool("DB_ECHO", False)
 
+        # Пул соединений (для файловой SQLite и PostgreSQL)
+        self.db_pool_size: int = self._get_env_int("DB_POOL_SIZE", 5)
+        self.db_read_pool_size: int = self._get_env_int("DB_READ_POOL_SIZE", 8)
+        self.db_write_pool_size: int = self._get_env_int("DB_WRITE_POOL_SIZE", 1)  # Только для SQLite
+        self.db_max_overflow: int = self._get_env_int("DB_MAX_OVERFLOW", 10)
+        self.db_pool_timeout: int = self._get_env_int("DB_POOL_TIMEOUT", 30)
+        self.db_pool_recycle: int = self._get_env_int("DB_POOL_RECYCLE", 3600)  # Пересоздавать соединения каждый час
+        # Очередь записи: сколько единиц работы объединять в одну транзакцию
+        self.write_queue_max_batch: int = self._get_env_int("WRITE_QUEUE_MAX_BATCH", 64)
+        # Кэш подготовленных выражений asyncpg (0 - для pgbouncer в режиме transaction)
+        self.db_statement_cache_size: int = self._get_env_int("DB_STATEMENT_CACHE_SIZE", 100)
+        # Кэш total для списков (секунды, 0 - выключен). Сбрасывается при записи
+        # в этом процессе, другие воркеры увидят изменения не позже TTL
+        self.list_total_cache_ttl: int = self._get_env_int("LIST_TOTAL_CACHE_TTL", 0)
+        self.list_total_cache_size: int = self._get_env_int("LIST_TOTAL_CACHE_SIZE", 1024)
+
+        # Профиль соединения SQLite (применяется к каждому соединению пула)
+        self.sqlite_journal_mode: str = self._get_env("SQLITE_JOURNAL_MODE", "WAL").upper()
+        self.sqlite_synchronous: str = self._get_env("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+        self.sqlite_busy_timeout_ms: int = self._get_env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+        self.sqlite_mmap_size: int = self._get_env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)  # 256MB
+        # Кэш страниц у каждого соединения свой: (читатели + overflow + писатель)
+        # x процессы. С 64MB это больше 1.5GB на небольшом VPS, 8MB держат
+        # итог в сотнях МБ; страницы основной базы и так читаются через mmap
+        self.sqlite_cache_size_kib: int = self._get_env_int("SQLITE_CACHE_SIZE_KIB", 8 * 1024)  # 8MB на соединение
+        self.sqlite_temp_store: str = self._get_env("SQLITE_TEMP_STORE", "MEMORY").upper()
+        self.sqlite_foreign_keys: bool = self._get_env_bool("SQLITE_FOREIGN_KEYS", True)
+
         # Настройки JWT
         self.jwt_secret_key: str = self._get_env("JWT_SECRET_KEY", "your-secret-key-change-in-production")
         self.jwt_algorithm: str = self._get_env("JWT_ALGORITHM", "HS256")
         self.jwt_access_token_expire_minutes: int = self._get_env_int("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", 30)
+        # Кэш пользователей для аутентификации без БД (секунды, 0 - выключен).
+        # Изменения профиля в этом процессе сбрасывают запись сразу
+        self.user_cache_ttl: int = self._get_env_int("USER_CACHE_TTL", 60)
+        self.user_cache_size: int = self._get_env_int("USER_CACHE_SIZE", 10000)
 
         # Настройки сервера
         self.host: str = self._get_env("HOST", "0.0.0.0")
@@ -67,9 +107,17 @@ class Config:
 
         # Настройки логирования
         self.log_level: str = self._get_env("LOG_LEVEL", "INFO")
+        # Доля INFO/DEBUG записей по логгерам горячих путей: "src.features.api.clients=0.1,..."
+        self.log_sample_rates: str = self._get_env("LOG_SAMPLE_RATES", "")
         self.log_file: Optional[str] = self._get_env("LOG_FILE")
         self.log_max_bytes: int = self._get_env_int("LOG_MAX_BYTES", 10 * 1024 * 1024)  # 10MB
         self.log_backup_count: int = self._get_env_int("LOG_BACKUP_COUNT", 5)
+        # Очередь записей для вывода в отдельном потоке (0 - писать прямо из event loop)
+        self.log_queue_size: int = self._get_env_int("LOG_QUEUE_SIZE", 10000)
+        # text - привычный формат с эмодзи, json - одна строка JSON с контекстом запроса
+        self.log_format: str = self._get_env("LOG_FORMAT", "text").lower()
+        # Сжимать ротированные файлы gzip в фоновом потоке
+        self.log_compress: bool = self._get_env_bool("LOG_COMPRESS", True)
 
         # Настройки приложения
         self.app_title: str = "Booking Cabinet API"
@@ -195,6 +243,25 @@ def get_database_url() -> str:
     return config.database_url
 
 
+def get_sqlite_pragmas() -> Dict[str, Any]:
+    """
+    Получает PRAGMA-профиль для соединений SQLite
+
+    Порядок важен: journal_mode переключается первым, остальные
+    настройки действуют в рамках соединения.
+    """
+    return {
+        "journal_mode": config.sqlite_journal_mode,
+        "synchronous": config.sqlite_synchronous,
+        "busy_timeout": config.sqlite_busy_timeout_ms,
+        "mmap_size": config.sqlite_mmap_size,
+        # Отрицательное значение cache_size задается в KiB, а не в страницах
+        "cache_size": -config.sqlite_cache_size_kib,
+        "temp_store": config.sqlite_temp_store,
+        "foreign_keys": "ON" if config.sqlite_foreign_keys else "OFF",
+    }
+
+
 def get_jwt_settings() -> Dict[str, Any]:
     """Получает настройки JWT"""
     return {
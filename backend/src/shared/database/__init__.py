@@ -3,7 +3,13 @@
 """
 
 from .models import Base, User
-from .connection import engine, async_session_factory, init_database, get_session
+from .connection import (
+    engine, read_engine, async_session_factory, read_session_factory,
+    init_database, get_session, get_read_session
+)
 
-__all__ = ['Base', 'User', 'engine', 'async_session_factory', 'init_database', 'get_session']
+__all__ = [
+    'Base', 'User', 'engine', 'read_engine', 'async_session_factory', 'read_session_factory',
+    'init_database', 'get_session', 'get_read_session'
+]
 
@@ -0,0 +1,264 @@
+"""
+Бэкенды базы данных (SQLite / PostgreSQL)
+Слой Shared - общие компоненты
+
+Вся диалект-специфичная логика собрана здесь: параметры пула и драйвера,
+PRAGMA-профиль SQLite, upsert и блокировка миграций.
+Остальной код получает бэкенд через get_backend() и не проверяет
+DATABASE_URL самостоятельно.
+"""
+
+import asyncio
+import fcntl
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from ..config.env_loader import config, get_sqlite_pragmas
+
+
+class DatabaseBackend:
+    """Базовый класс бэкенда базы данных"""
+
+    name: str = ""
+
+    def __init__(self, database_url: str):
+        self.database_url = database_url
+        self.url = make_url(database_url)
+
+    def engine_options(self, read_only: bool = False) -> Dict[str, Any]:
+        """
+        Параметры для create_async_engine
+
+        Args:
+            read_only: Параметры для пула читающих соединений
+        """
+        return {
+            "pool_pre_ping": True,  # Проверять соединение перед использованием
+            "pool_recycle": config.db_pool_recycle,
+        }
+
+    def configure_engine(self, sync_engine, read_only: bool = False) -> None:
+        """Подключает обработчики событий к движку (по умолчанию ничего)"""
+
+    def supports_separate_readers(self) -> bool:
+        """Можно ли открыть отдельный пул читающих соединений к той же базе"""
+        return True
+
+    def insert(self, model):
+        """Диалектный INSERT с поддержкой ON CONFLICT"""
+        raise NotImplementedError
+
+    def upsert(
+        self,
+        model,
+        rows: List[Dict[str, Any]],
+        index_elements: Sequence[str],
+        update_columns: Iterable[str],
+    ):
+        """
+        Строит INSERT ... ON CONFLICT DO UPDATE для списка строк
+
+        Args:
+            model: ORM модель
+            rows: Значения для вставки
+            index_elements: Колонки уникального индекса, по которому ищется конфликт
+            update_columns: Колонки, обновляемые при конфликте
+
+        Returns:
+            Insert: Оператор, готовый к session.execute()
+        """
+        # Многострочный VALUES требует одинакового набора колонок в каждой строке
+        columns = list(dict.fromkeys(key for row in rows for key in row))
+        stmt = self.insert(model).values([{column: row.get(column) for column in columns} for row in rows])
+        set_ = {column: stmt.excluded[column] for column in update_columns}
+        if hasattr(model, "updated_at"):
+            # onupdate не срабатывает для ON CONFLICT, выставляем явно
+            set_["updated_at"] = datetime.utcnow()
+        return stmt.on_conflict_do_update(index_elements=list(index_elements), set_=set_)
+
+    @asynccontextmanager
+    async def schema_lock(self, connection):
+        """
+        Межпроцессная блокировка на время миграций схемы
+
+        API и оба бота стартуют одновременно - мигрирует только тот,
+        кто первым взял блокировку, остальные ждут и видят готовую схему.
+
+        Args:
+            connection: AsyncConnection, через которую идут миграции
+        """
+        yield
+
+
+class SQLiteBackend(DatabaseBackend):
+    """SQLite через aiosqlite"""
+
+    name = "sqlite"
+
+    @property
+    def is_memory(self) -> bool:
+        return self.url.database in (None, "", ":memory:")
+
+    def engine_options(self, read_only: bool = False) -> Dict[str, Any]:
+        options = super().engine_options(read_only)
+        # Для файловой SQLite aiosqlite по умолчанию использует NullPool - каждое
+        # соединение открывалось бы заново и заново проходило PRAGMA-профиль
+        if not self.is_memory:
+            if read_only:
+                # Под WAL читатели не блокируют писателя и друг друга
+                pool_size, max_overflow = config.db_read_pool_size, config.db_max_overflow
+            else:
+                # SQLite допускает одного писателя: запросы на запись ждут
+                # соединение в пуле, а не ловят "database is locked".
+                # Соединение занято до конца транзакции - см. инвариант
+                # у write_coordinator (write_queue.py)
+                pool_size, max_overflow = config.db_write_pool_size, 0
+            options.update(
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_timeout=config.db_pool_timeout,
+            )
+        return options
+
+    def configure_engine(self, sync_engine, read_only: bool = False) -> None:
+        pragmas = get_sqlite_pragmas()
+        if read_only:
+            # Соединение физически не может начать запись и взять write-lock
+            pragmas["query_only"] = "ON"
+        apply_sqlite_profile(sync_engine, pragmas)
+        if not read_only:
+            enable_sqlite_savepoints(sync_engine)
+
+    def supports_separate_readers(self) -> bool:
+        # У каждого соединения к :memory: своя отдельная база
+        return not self.is_memory
+
+    def insert(self, model):
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(model)
+
+    @asynccontextmanager
+    async def schema_lock(self, connection):
+        if self.is_memory:
+            yield
+            return
+        # Файл блокировки рядом с базой: flock снимается и при падении процесса
+        lock_path = Path(self.url.database).with_suffix(".migrate.lock")
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(lock_path, "w") as lock_file:
+            await asyncio.to_thread(fcntl.flock, lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class PostgresBackend(DatabaseBackend):
+    """PostgreSQL через asyncpg"""
+
+    name = "postgresql"
+
+    def engine_options(self, read_only: bool = False) -> Dict[str, Any]:
+        options = super().engine_options(read_only)
+        connect_args = {
+            # Кэш подготовленных выражений asyncpg и SQLAlchemy.
+            # За pgbouncer в режиме transaction оба должны быть 0
+            "statement_cache_size": config.db_statement_cache_size,
+            "prepared_statement_cache_size": config.db_statement_cache_size,
+        }
+        if read_only:
+            connect_args["server_settings"] = {"default_transaction_read_only": "on"}
+        options.update(
+            pool_size=config.db_read_pool_size if read_only else config.db_pool_size,
+            max_overflow=config.db_max_overflow,
+            pool_timeout=config.db_pool_timeout,
+            connect_args=connect_args,
+        )
+        return options
+
+    def insert(self, model):
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(model)
+
+    @asynccontextmanager
+    async def schema_lock(self, connection):
+        # Advisory lock живет в сессии соединения, файлов не требуется
+        await connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        try:
+            yield
+        finally:
+            await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCHEMA_LOCK_KEY})
+
+
+# Ключ pg_advisory_lock для миграций схемы
+SCHEMA_LOCK_KEY = 7_240_501
+
+_BACKENDS = {
+    SQLiteBackend.name: SQLiteBackend,
+    PostgresBackend.name: PostgresBackend,
+}
+
+
+def get_backend(database_url: str) -> DatabaseBackend:
+    """
+    Возвращает бэкенд для URL базы данных
+
+    Raises:
+        ValueError: Если диалект не поддерживается
+    """
+    dialect = make_url(database_url).get_backend_name()
+    backend_class = _BACKENDS.get(dialect)
+    if backend_class is None:
+        raise ValueError(f"❌ Неподдерживаемая база данных: {dialect} (поддерживаются: {', '.join(_BACKENDS)})")
+    return backend_class(database_url)
+
+
+def apply_sqlite_profile(sync_engine, pragmas=None):
+    """
+    Подключает PRAGMA-профиль SQLite к движку через событие connect
+
+    Настройки применяются к каждому новому соединению пула, поэтому
+    API и оба бота работают с базой в одинаковом режиме (WAL и т.д.).
+
+    Args:
+        sync_engine: Синхронный движок (для async - engine.sync_engine)
+        pragmas: Словарь PRAGMA, по умолчанию берется из конфигурации
+    """
+    if sync_engine.dialect.name != "sqlite":
+        return
+
+    profile = dict(pragmas if pragmas is not None else get_sqlite_pragmas())
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in profile.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def enable_sqlite_savepoints(sync_engine):
+    """
+    Включает корректные SAVEPOINT для pysqlite/aiosqlite
+
+    Драйвер сам решает, когда отправить BEGIN, и ломает вложенные
+    транзакции (session.begin_nested()). Отключаем его логику и начинаем
+    транзакцию явно - рецепт из документации SQLAlchemy.
+    """
+
+    @event.listens_for(sync_engine, "connect")
+    def _disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(sync_engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
@@ -0,0 +1,67 @@
+"""
+Номера изменений для дельта-синхронизации (/api/sync)
+Слой Shared - общие компоненты
+
+У каждого мастера свой монотонный счетчик users.change_seq. Перед flush
+каждая созданная, измененная или удаленная запись, клиент или услуга
+получает следующий номер, удаление дополнительно оставляет Tombstone.
+Клиент хранит последний полученный номер как курсор и запрашивает только
+то, что изменилось после него.
+
+Номера выделяются одним UPDATE users ... RETURNING на мастера за flush.
+Строка мастера остается заблокированной до коммита, поэтому транзакции
+одного мастера фиксируют номера по возрастанию: если курсор видит номер N,
+все изменения с номерами <= N уже закоммичены.
+"""
+
+from collections import defaultdict
+from typing import Dict, List
+
+from sqlalchemy.orm import Session
+
+from .models import Appointment, Client, Service, Tombstone, User
+
+# Таблицы, изменения которых отдает /api/sync
+TRACKED_MODELS = (Appointment, Client, Service)
+
+
+def stamp_changes(session: Session) -> None:
+    """Выдает номера изменений объектам flush и пишет tombstones (before_flush)"""
+    changed: Dict[int, List] = defaultdict(list)
+    deleted: Dict[int, List] = defaultdict(list)
+
+    for obj in session.new:
+        if isinstance(obj, TRACKED_MODELS) and obj.user_id is not None:
+            changed[obj.user_id].append(obj)
+    for obj in session.dirty:
+        if isinstance(obj, TRACKED_MODELS) and session.is_modified(obj, include_collections=False):
+            changed[obj.user_id].append(obj)
+    for obj in session.deleted:
+        if isinstance(obj, TRACKED_MODELS):
+            deleted[obj.user_id].append(obj)
+
+    if not changed and not deleted:
+        return
+
+    users = User.__table__
+    connection = session.connection()
+    # По возрастанию id - одинаковый порядок блокировок во всех транзакциях
+    for user_id in sorted(changed.keys() | deleted.keys()):
+        objs, removed = changed.get(user_id, []), deleted.get(user_id, [])
+        last = connection.execute(
+            users.update()
+            .where(users.c.id == user_id)
+            # updated_at не трогаем: это не изменение профиля (ETag /profiles/)
+            .values(change_seq=users.c.change_seq + len(objs) + len(removed), updated_at=users.c.updated_at)
+            .returning(users.c.change_seq)
+        ).scalar_one()
+
+        seq = last - len(objs) - len(removed)
+        for obj in objs:
+            seq += 1
+            obj.change_seq = seq
+        for obj in removed:
+            seq += 1
+            session.add(Tombstone(
+                user_id=user_id, entity=obj.__tablename__, entity_id=obj.id, change_seq=seq
+            ))
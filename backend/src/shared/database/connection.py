@@ -3,63 +3,202 @@
 Слой Shared - общие компоненты
 """
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from pathlib import Path
+from typing import Optional
 import logging
 
 from .models import Base, User, Service, Client, Appointment, WorkingHours, WorkingDay
+from .backends import get_backend, apply_sqlite_profile
+from .migrations import SCHEMA_REVISION, get_current_revision, upgrade_schema
+from .changes import stamp_changes
 
 # Импортируем конфигурацию
 from ..config.env_loader import get_database_url, config
 
+logger = logging.getLogger(__name__)
+
 # URL для подключения к базе данных
 DATABASE_URL = get_database_url()
 
+# Бэкенд (SQLite или PostgreSQL) определяется по DATABASE_URL
+backend = get_backend(DATABASE_URL)
+
 # Создание асинхронного движка
 engine = create_async_engine(
     DATABASE_URL,
     echo=config.db_echo,  # Используем настройку из конфигурации
     future=True,
-    pool_pre_ping=True,  # Проверять соединение перед использованием
-    pool_recycle=3600,   # Пересоздавать соединения каждый час
+    **backend.engine_options(),
 )
+backend.configure_engine(engine.sync_engine)
+
+# Отдельный пул читающих соединений: под WAL они не берут write-lock
+# и работают параллельно с единственным пишущим соединением
+read_backend = get_backend(config.database_read_url)
+if read_backend.supports_separate_readers():
+    read_engine = create_async_engine(
+        config.database_read_url,
+        echo=config.db_echo,
+        future=True,
+        **read_backend.engine_options(read_only=True),
+    )
+    read_backend.configure_engine(read_engine.sync_engine, read_only=True)
+else:
+    read_engine = engine
+
+class TrackingSession(Session):
+    """Сессия, которая запоминает, была ли в ней запись (см. get_session)"""
+
+
+@event.listens_for(TrackingSession, "do_orm_execute")
+def _track_bulk_writes(orm_execute_state):
+    """INSERT/UPDATE/DELETE через session.execute() минуя flush"""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["has_writes"] = True
+
+
+@event.listens_for(TrackingSession, "after_flush")
+def _track_flush(session, flush_context):
+    """Изменения объектов, отправленные в БД через flush"""
+    session.info["has_writes"] = True
+
+
+@event.listens_for(TrackingSession, "before_flush")
+def _stamp_changes(session, flush_context, instances):
+    """Номера изменений и tombstones для /api/sync"""
+    stamp_changes(session)
+
+
+def session_has_writes(session: AsyncSession) -> bool:
+    """Писала ли сессия в БД или есть ли несохраненные изменения"""
+    return bool(
+        session.info.get("has_writes")
+        or session.new or session.dirty or session.deleted
+    )
+
 
 # Фабрика сессий с минимальным кэшированием
 async_session_factory = async_sessionmaker(
     engine,
     class_=AsyncSession,
+    sync_session_class=TrackingSession,
     expire_on_commit=False,  # Не сбрасывать кэш после коммита (важно для async)
     autoflush=True,         # Автоматически сбрасывать изменения в БД
     autocommit=False        # Явный контроль транзакций
 )
 
+# Фабрика сессий только для чтения
+read_session_factory = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False,  # Сбрасывать нечего - сессия не пишет
+)
+
+# Обработчик держит сессию get_session(). С SQLite у писателя одно
+# соединение, поэтому такой обработчик не может ждать write_coordinator -
+# очередь ждала бы то же соединение до pool_timeout (см. write_queue.py)
+writer_session_active: ContextVar[bool] = ContextVar("writer_session_active", default=False)
+
+class BatchSession(AsyncSession):
+    """
+    Сессия POST /api/batch: commit() обработчиков - только flush
+
+    Подзапрос выполняется в своем SAVEPOINT (см. batch.py), а фиксирует
+    пакет только batch_transaction(). Настоящий commit() обработчика
+    отпустил бы SAVEPOINT подзапроса раньше, чем пакет узнает его статус.
+    """
+
+    async def commit(self) -> None:
+        await self.flush()
+
+
+# Общая сессия подзапросов POST /api/batch (см. batch_transaction)
+batch_session: ContextVar[Optional[AsyncSession]] = ContextVar("batch_session", default=None)
+
+
+@asynccontextmanager
+async def batch_transaction():
+    """
+    Одна транзакция на все подзапросы POST /api/batch
+
+    Сессия (BatchSession) привязана к соединению с уже открытой транзакцией
+    в режиме create_savepoint: commit() обработчиков - только flush, а
+    зафиксировать или откатить весь пакет может только вызывающий код через
+    возвращенную транзакцию соединения. Пока контекст открыт, get_session()
+    и get_read_session() отдают эту сессию.
+
+    Yields:
+        tuple: (сессия, транзакция соединения)
+    """
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        session = BatchSession(
+            bind=connection,
+            sync_session_class=TrackingSession,
+            expire_on_commit=False,
+            join_transaction_mode="create_savepoint",
+        )
+        token = batch_session.set(session)
+        try:
+            yield session, transaction
+        finally:
+            batch_session.reset(token)
+            await session.close()
+            if transaction.is_active:
+                await transaction.rollback()
+
+
 async def init_database():
-    """Инициализация базы данных - создание всех таблиц"""
+    """
+    Инициализация базы данных - проверка ревизии схемы и миграции
+
+    Если ревизия в базе совпадает с последней миграцией, функция
+    возвращается сразу. Иначе миграции выполняет один процесс под
+    блокировкой схемы, остальные дожидаются его.
+    """
     try:
-        # Используем синхронный движок для создания таблиц
-        # так как async движок не создает таблицы корректно
-        from sqlalchemy import create_engine
-        from urllib.parse import unquote_plus
-        
-        # Преобразуем async URL в sync URL
-        sync_url = DATABASE_URL.replace('sqlite+aiosqlite://', 'sqlite:///')
-        sync_url = unquote_plus(sync_url)
-        
-        sync_engine = create_engine(sync_url)
-        Base.metadata.create_all(sync_engine)
-        sync_engine.dispose()
-        
-        logging.info("✅ База данных инициализирована")
-        logging.info(f"📁 Настройки БД: URL={DATABASE_URL}")
+        async with engine.connect() as conn:
+            current = await conn.run_sync(get_current_revision)
+
+        if current != SCHEMA_REVISION:
+            async with engine.connect() as conn:
+                async with backend.schema_lock(conn):
+                    await conn.run_sync(upgrade_schema)
+                    await conn.commit()
+
+        logger.info("✅ База данных инициализирована (ревизия %s)", SCHEMA_REVISION)
+        logger.info("📁 Настройки БД: backend=%s, URL=%s", backend.name, engine.url.render_as_string(hide_password=True))
     except Exception as e:
-        logging.error(f"❌ Ошибка инициализации БД: {e}")
+        logger.error("❌ Ошибка инициализации БД: %s", e)
         raise
 
 async def get_session() -> AsyncSession:
-    """Получение сессии базы данных для dependency injection"""
+    """
+    Получение сессии базы данных для dependency injection
+
+    Если обработчик ничего не записал (например, 404 или вход существующего
+    пользователя), коммит и expire_all пропускаются - транзакция только
+    на чтение откатывается при закрытии сессии.
+
+    Внутри POST /api/batch отдает общую сессию пакета - фиксирует ее сам пакет.
+    """
+    shared = batch_session.get()
+    if shared is not None:
+        yield shared
+        return
+
     async with async_session_factory() as session:
+        token = writer_session_active.set(True)
         try:
             yield session
+            if not session_has_writes(session):
+                return
             # Принудительно сбрасываем все изменения в БД
             await session.flush()
             # Коммитим транзакцию
@@ -71,8 +210,26 @@ async def get_session() -> AsyncSession:
             await session.rollback()
             raise
         finally:
+            writer_session_active.reset(token)
             await session.close()
 
+async def get_read_session() -> AsyncSession:
+    """
+    Получение сессии только для чтения для dependency injection
+
+    Используется в GET-эндпоинтах: соединение берется из пула читателей,
+    коммит не нужен - транзакция откатывается при возврате соединения в пул.
+    Внутри POST /api/batch - общая сессия пакета: подзапрос видит то, что
+    записали предыдущие.
+    """
+    shared = batch_session.get()
+    if shared is not None:
+        yield shared
+        return
+
+    async with read_session_factory() as session:
+        yield session
+
 async def get_db_session() -> AsyncSession:
     """Получение сессии базы данных (простой вариант)"""
     return async_session_factory()
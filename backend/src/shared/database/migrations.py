@@ -0,0 +1,95 @@
+"""
+Версионированная инициализация схемы базы данных
+Слой Shared - общие компоненты
+
+Вместо create_all при каждом запуске процесс сравнивает ревизию Alembic
+в базе с SCHEMA_REVISION. Если схема актуальна, старт занимает один запрос
+и не импортирует Alembic. Иначе миграции применяются один раз под
+межпроцессной блокировкой (см. DatabaseBackend.schema_lock).
+"""
+
+import logging
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import inspect, text
+
+from .models import Base
+
+logger = logging.getLogger(__name__)
+
+# Последняя ревизия в alembic/versions. Обновляется вместе с каждой новой
+# миграцией (test_database_backend.py сверяет ее с Alembic)
+SCHEMA_REVISION = "009_change_seq"
+
+# Ревизия, соответствующая схеме, которую раньше создавал create_all.
+# Базы без таблицы alembic_version помечаются ею и мигрируются дальше
+LEGACY_REVISION = "002_add_booking_fields"
+
+# Корень backend: рядом лежат alembic.ini и alembic/
+BACKEND_DIR = Path(__file__).resolve().parents[3]
+
+
+def get_alembic_config():
+    """Конфигурация Alembic с абсолютным путем к миграциям"""
+    # Alembic импортируется только когда нужны миграции - это ~100 мс старта
+    from alembic.config import Config
+
+    alembic_config = Config(str(BACKEND_DIR / "alembic.ini"))
+    alembic_config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    return alembic_config
+
+
+def get_head_revision() -> Optional[str]:
+    """Последняя ревизия по файлам alembic/versions"""
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(get_alembic_config()).get_current_head()
+
+
+def get_current_revision(connection) -> Optional[str]:
+    """Ревизия, записанная в базе (синхронное соединение)"""
+    if not inspect(connection).has_table("alembic_version"):
+        return None
+    return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+
+def upgrade_schema(connection) -> Optional[str]:
+    """
+    Приводит схему к последней ревизии (синхронное соединение)
+
+    Вызывается под блокировкой схемы, поэтому ревизия перепроверяется:
+    пока процесс ждал, миграции мог выполнить соседний процесс.
+
+    Returns:
+        Ревизия, с которой выполнялось обновление (None для новой базы)
+    """
+    from alembic import command
+
+    head = get_head_revision()
+    if head != SCHEMA_REVISION:
+        logger.warning("⚠️ SCHEMA_REVISION=%s отстает от миграций (%s)", SCHEMA_REVISION, head)
+
+    current = get_current_revision(connection)
+    if current == head:
+        return current
+
+    alembic_config = get_alembic_config()
+    alembic_config.attributes["connection"] = connection
+
+    if current is None:
+        if not inspect(connection).has_table("users"):
+            # Пустая база: создаем актуальную схему целиком и помечаем head
+            logger.info("🆕 Пустая база данных - создание схемы (ревизия %s)", head)
+            Base.metadata.create_all(connection)
+            command.stamp(alembic_config, "head")
+            return None
+
+        # База создана прежним create_all без Alembic
+        logger.info("📌 База без alembic_version - помечаем ревизией %s", LEGACY_REVISION)
+        command.stamp(alembic_config, LEGACY_REVISION)
+        current = LEGACY_REVISION
+
+    logger.info("⬆️ Миграция схемы: %s -> %s", current, head)
+    command.upgrade(alembic_config, "head")
+    return current
@@ -3,10 +3,10 @@
 Слой Shared - общие компоненты
 """
 
-from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, Float, Boolean, ForeignKey, Time, Enum, Date
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, Float, Boolean, ForeignKey, Time, Enum, Date, Index, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import datetime, timedelta
 import enum
 
 Base = declarative_base()
@@ -37,6 +37,14 @@ class User(Base):
     currency = Column(String(10), default='RUB', nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
 
+    # Версия профиля: увеличивается при каждом изменении, попадает в JWT (ver)
+    # и сбрасывает закэшированного пользователя (см. shared/auth/jwt_auth.py)
+    version = Column(Integer, default=1, server_default='1', nullable=False)
+
+    # Последний выданный номер изменения записей, клиентов и услуг
+    # мастера - курсор /api/sync (см. shared/database/changes.py)
+    change_seq = Column(Integer, default=0, server_default='0', nullable=False)
+
     # Метаданные
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -73,6 +81,7 @@ class User(Base):
             'timezone': self.timezone,
             'currency': self.currency,
             'is_active': self.is_active,
+            'version': self.version,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -81,6 +90,10 @@ class User(Base):
 class Service(Base):
     """Модель услуги"""
     __tablename__ = 'services'
+    __table_args__ = (
+        # Изменения услуг мастера после курсора (/api/sync)
+        Index('ix_services_user_change_seq', 'user_id', 'change_seq'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
@@ -95,6 +108,9 @@ class Service(Base):
     is_active = Column(Boolean, default=True, nullable=False)
     color = Column(String(7), default='#4CAF50', nullable=False)  # Hex цвет для UI
 
+    # Номер последнего изменения для /api/sync (выставляется при flush)
+    change_seq = Column(Integer, default=0, server_default='0', nullable=False)
+
     # Метаданные
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -125,6 +141,12 @@ class Service(Base):
 class Client(Base):
     """Модель клиента"""
     __tablename__ = 'clients'
+    __table_args__ = (
+        # Список клиентов мастера, новые первыми (keyset-пагинация по created_at, id)
+        Index('ix_clients_user_created', 'user_id', 'created_at'),
+        # Изменения клиентов мастера после курсора (/api/sync)
+        Index('ix_clients_user_change_seq', 'user_id', 'change_seq'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
@@ -139,6 +161,9 @@ class Client(Base):
     # Дополнительная информация
     notes = Column(Text, nullable=True)
 
+    # Номер последнего изменения для /api/sync (выставляется при flush)
+    change_seq = Column(Integer, default=0, server_default='0', nullable=False)
+
     # Метаданные
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -177,6 +202,16 @@ class AppointmentStatus(enum.Enum):
 class Appointment(Base):
     """Модель записи/бронирования"""
     __tablename__ = 'appointments'
+    __table_args__ = (
+        # Проверка пересечений: start < new_end AND ends_at > new_start
+        # по активным записям мастера читается из одного индекса
+        Index('ix_appointments_user_status_period', 'user_id', 'status', 'appointment_date', 'ends_at'),
+        # Список записей мастера за период (фильтр без статуса и сортировка по дате).
+        # (user_id, status, appointment_date) - префикс индекса выше
+        Index('ix_appointments_user_date', 'user_id', 'appointment_date'),
+        # Изменения записей мастера после курсора (/api/sync)
+        Index('ix_appointments_user_change_seq', 'user_id', 'change_seq'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
@@ -186,6 +221,7 @@ class Appointment(Base):
     # Время и дата
     appointment_date = Column(DateTime, nullable=False, index=True)
     duration_minutes = Column(Integer, nullable=False)  # Может отличаться от услуги
+    ends_at = Column(DateTime, nullable=False)  # appointment_date + duration_minutes, выставляется автоматически
 
     # Статус и информация
     status = Column(Enum(AppointmentStatus), default=AppointmentStatus.PENDING, nullable=False)
@@ -195,6 +231,9 @@ class Appointment(Base):
     # Цена (может отличаться от базовой цены услуги)
     price = Column(Float, nullable=True)
 
+    # Номер последнего изменения для /api/sync (выставляется при flush)
+    change_seq = Column(Integer, default=0, server_default='0', nullable=False)
+
     # Метаданные
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -216,6 +255,7 @@ class Appointment(Base):
             'client_id': self.client_id,
             'appointment_date': self.appointment_date.isoformat() if self.appointment_date else None,
             'duration_minutes': self.duration_minutes,
+            'ends_at': self.ends_at.isoformat() if self.ends_at else None,
             'status': self.status.value if self.status else None,
             'notes': self.notes,
             'client_notes': self.client_notes,
@@ -228,6 +268,14 @@ class Appointment(Base):
         }
 
 
+@event.listens_for(Appointment, "before_insert")
+@event.listens_for(Appointment, "before_update")
+def _set_appointment_ends_at(mapper, connection, target):
+    """Пересчитывает время окончания при любом изменении начала или длительности"""
+    if target.appointment_date is not None and target.duration_minutes is not None:
+        target.ends_at = target.appointment_date + timedelta(minutes=target.duration_minutes)
+
+
 class WorkingHours(Base):
     """Модель рабочего графика"""
     __tablename__ = 'working_hours'
@@ -276,6 +324,10 @@ class WorkingHours(Base):
 class WorkingDay(Base):
     """Модель рабочего дня (конкретная дата)"""
     __tablename__ = 'working_days'
+    __table_args__ = (
+        # Одно переопределение на дату - цель для upsert в schedule
+        Index('uq_working_days_user_date', 'user_id', 'date', unique=True),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
@@ -313,3 +365,49 @@ class WorkingDay(Base):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+
+class Tombstone(Base):
+    """
+    Отметка об удалении записи, клиента или услуги
+
+    Удаленной строки больше нет, поэтому /api/sync узнает об удалении из
+    tombstone с номером изменения из того же счетчика мастера.
+    """
+    __tablename__ = 'tombstones'
+    __table_args__ = (
+        Index('ix_tombstones_user_change_seq', 'user_id', 'change_seq'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    entity = Column(String(32), nullable=False)  # Таблица: appointments, clients, services
+    entity_id = Column(Integer, nullable=False)
+    change_seq = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<Tombstone(entity={self.entity}, entity_id={self.entity_id}, seq={self.change_seq})>"
+
+
+class RefreshToken(Base):
+    """
+    Выданный refresh токен
+
+    Токены одного входа образуют семейство (family_id): при обновлении
+    токен помечается использованным (used_at) и выдается следующий в том же
+    семействе. Повторное предъявление использованного токена означает утечку -
+    отзывается все семейство (revoked_at).
+    """
+    __tablename__ = 'refresh_tokens'
+
+    jti = Column(String(32), primary_key=True)  # ID токена (claim jti)
+    family_id = Column(String(32), nullable=False, index=True)  # claim fam
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    used_at = Column(DateTime, nullable=True)  # Обменян на следующий токен семейства
+    revoked_at = Column(DateTime, nullable=True)  # Семейство отозвано (выход, повторное использование)
+
+    def __repr__(self):
+        return f"<RefreshToken(jti={self.jti}, family={self.family_id}, user_id={self.user_id})>"
@@ -0,0 +1,261 @@
+"""
+Сериализаторы моделей для ответов API
+Слой Shared - общие компоненты
+
+to_dict() моделей читает каждое поле через дескриптор SQLAlchemy, вызывает
+isoformat() для каждой даты, а FastAPI потом еще раз обходит результат
+через jsonable_encoder. Для списков это основная часть времени ответа.
+
+ModelSerializer один раз на модель собирает функцию, которая берет
+загруженные значения прямо из __dict__ объекта и оставляет даты, время и
+Enum как есть - их нативно и быстро кодирует orjson. Результат совпадает
+с json.dumps(obj.to_dict()).
+
+sparse() строит сериализатор для ?fields= и ?include= списочных
+эндпоинтов и опции запроса, которые читают из БД только нужные колонки
+и связи. С normalized=True связи не встраиваются в строки, а выносятся
+side_load() в отдельные словари по id - каждый объект один раз на ответ.
+"""
+
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import orjson
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import joinedload, load_only
+
+from .models import Appointment, Client, Service, User, WorkingDay, WorkingHours
+
+
+class ModelSerializer:
+    """
+    Скомпилированный сериализатор модели
+
+    Args:
+        model: Модель SQLAlchemy
+        fields: Ключи в порядке to_dict()
+        nested: Связанные объекты среди fields - {атрибут: сериализатор}
+        computed: Вычисляемые поля среди fields - {ключ: функция(obj)}
+    """
+
+    def __init__(
+        self,
+        model,
+        fields: Sequence[str],
+        nested: Optional[Dict[str, "ModelSerializer"]] = None,
+        computed: Optional[Dict[str, Callable[[Any], Any]]] = None,
+    ):
+        self.model = model
+        self.fields = tuple(fields)
+        self.nested = dict(nested or {})
+        self.computed = dict(computed or {})
+        # Связи, которые side_load() выносит из строк:
+        # {атрибут: (сериализатор, опции запроса, внешний ключ)}
+        self.side_loaded: Dict[str, Tuple["ModelSerializer", list, str]] = {}
+        self.native = self._compile()
+
+    def _compile(self) -> Callable[[Any], Dict[str, Any]]:
+        namespace = {"_slow": self._native_slow}
+        items = []
+        for index, name in enumerate(self.fields):
+            if name in self.computed:
+                namespace[f"_f{index}"] = self.computed[name]
+                items.append(f"{name!r}: _f{index}(obj)")
+            elif name in self.nested:
+                namespace[f"_f{index}"] = self.nested[name].native
+                items.append(f"{name!r}: _f{index}(d[{name!r}]) if d[{name!r}] is not None else None")
+            else:
+                items.append(f"{name!r}: d[{name!r}]")
+
+        # Загруженные атрибуты лежат в __dict__; если какого-то нет (expired,
+        # не загруженная связь) - медленный путь через дескрипторы
+        source = (
+            "def native(obj):\n"
+            "    d = obj.__dict__\n"
+            "    try:\n"
+            f"        return {{{', '.join(items)}}}\n"
+            "    except KeyError:\n"
+            "        return _slow(obj)\n"
+        )
+        exec(compile(source, "<model serializer>", "exec"), namespace)
+        return namespace["native"]
+
+    def _native_slow(self, obj) -> Dict[str, Any]:
+        data = {}
+        for name in self.fields:
+            if name in self.computed:
+                data[name] = self.computed[name](obj)
+            elif name in self.nested:
+                value = getattr(obj, name)
+                data[name] = self.nested[name].native(value) if value is not None else None
+            else:
+                data[name] = getattr(obj, name)
+        return data
+
+    def sparse(self, fields: Optional[str] = None, include: Optional[str] = None,
+               always: Sequence[str] = (), normalized: bool = False) -> Tuple["ModelSerializer", list]:
+        """
+        Сериализатор и опции запроса для ?fields= и ?include=
+
+        Args:
+            fields: "id,appointment_date,service.name" - поля ответа, поля
+                связей через точку; None - все поля
+            include: "service,client" - встроенные связи; None - все, как
+                в to_dict() (при заданном fields - упомянутые в нем);
+                пустая строка - без связей
+            always: Колонки, которые нужны обработчику (ключи сортировки
+                пагинации) - читаются из БД, но в ответ не попадают
+            normalized: Связи не встраивать - в строках остаются внешние
+                ключи, объекты связей отдает side_load() отдельными запросами
+                по id вместо JOIN с повтором колонок в каждой строке
+
+        Returns:
+            tuple: (сериализатор, опции для select(...).options())
+
+        Raises:
+            ValueError: Неизвестное поле или связь
+        """
+        top, nested_fields = set(), {}
+        for name in _split(fields):
+            relation, _, field = name.partition(".")
+            if field:
+                nested_fields.setdefault(relation, []).append(field)
+            else:
+                top.add(name)
+        # Без ?fields= и ?include= - все связи, как в to_dict(); с ?fields= -
+        # только упомянутые в нем
+        includes = set(self.nested) if include is None and fields is None else set(_split(include))
+        includes |= set(nested_fields) | (top & set(self.nested))
+
+        unknown = (top | includes) - set(self.fields) | includes - set(self.nested)
+        if unknown:
+            raise ValueError(f"Неизвестные поля: {', '.join(sorted(unknown))}")
+
+        if fields is None or not top - set(self.nested):
+            top = {name for name in self.fields if name not in self.nested}
+        selected = tuple(name for name in self.fields if name in top and name not in self.nested or name in includes)
+        nested = tuple(
+            (relation, tuple(sorted(nested_fields[relation])) if relation in nested_fields else None)
+            for relation in self.nested if relation in includes
+        )
+        return self._sparse(selected, nested, tuple(always), normalized)
+
+    @lru_cache(maxsize=256)
+    def _sparse(self, selected: Tuple[str, ...], nested: Tuple[Tuple[str, Optional[Tuple[str, ...]]], ...],
+                always: Tuple[str, ...], normalized: bool) -> Tuple["ModelSerializer", list]:
+        nested_serializers, side_loaded, options = {}, {}, []
+        relationships = inspect(self.model).relationships
+        for relation, relation_fields in nested:
+            child, child_options = self.nested[relation].sparse(
+                ",".join(relation_fields) if relation_fields is not None else None, include=""
+            )
+            if normalized:
+                # Связь грузит side_load() отдельным запросом по id, строка
+                # ссылается на нее внешним ключом (service_id, client_id)
+                foreign_key = next(iter(relationships[relation].local_columns)).key
+                side_loaded[relation] = (child, child_options, foreign_key)
+                continue
+            nested_serializers[relation] = child
+            # load_only из дочернего sparse() применяется к связи
+            options.append(joinedload(getattr(self.model, relation)).options(*child_options))
+
+        if normalized:
+            foreign_keys = {foreign_key for _, _, foreign_key in side_loaded.values()}
+            selected = tuple(name for name in self.fields
+                             if name in selected and name not in self.nested or name in foreign_keys)
+
+        columns = [name for name in self.fields if name in selected and name not in self.nested
+                   and name not in self.computed]
+        columns += [name for name in always if name not in columns]
+        options.insert(0, load_only(*(getattr(self.model, name) for name in columns)))
+        serializer = ModelSerializer(
+            self.model, selected, nested=nested_serializers,
+            computed={name: func for name, func in self.computed.items() if name in selected},
+        )
+        serializer.side_loaded = side_loaded
+        return serializer, options
+
+    def many(self, objs: Iterable[Any]) -> List[Dict[str, Any]]:
+        native = self.native
+        return [native(obj) for obj in objs]
+
+    async def side_load(self, session, objs: Sequence[Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[int, Any]]]:
+        """
+        Строки без связей и связанные объекты по id (для sparse(normalized=True))
+
+        Каждая связь - один SELECT ... WHERE id IN (различные внешние ключи
+        страницы), как у selectinload, но без привязки объекта к каждой строке.
+
+        Returns:
+            tuple: (строки, {атрибут связи: {id: объект}})
+        """
+        rows = self.many(objs)
+        related = {}
+        for relation, (serializer, options, foreign_key) in self.side_loaded.items():
+            ids = {row[foreign_key] for row in rows if row[foreign_key] is not None}
+            entries = related[relation] = {}
+            if not ids:
+                continue
+            model = serializer.model
+            result = await session.execute(select(model).options(*options).where(model.id.in_(ids)))
+            for obj in result.scalars():
+                entries[obj.id] = serializer.native(obj)
+        return rows, related
+
+    def dumps(self, obj) -> bytes:
+        """JSON одного объекта"""
+        return orjson.dumps(self.native(obj))
+
+    def dumps_many(self, objs: Iterable[Any]) -> bytes:
+        """JSON массива объектов"""
+        return orjson.dumps(self.many(objs))
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
+def _booking_url(user: User) -> Optional[str]:
+    if user.booking_slug:
+        return f"https://t.me/booking_cab_bot?start=booking_{user.booking_slug}"
+    return None
+
+
+user_serializer = ModelSerializer(
+    User,
+    ["id", "telegram_id", "username", "first_name", "last_name", "phone", "business_name", "address",
+     "avatar_url", "booking_slug", "booking_url", "timezone", "currency", "is_active", "version",
+     "created_at", "updated_at"],
+    computed={"booking_url": _booking_url},
+)
+
+service_serializer = ModelSerializer(
+    Service,
+    ["id", "user_id", "name", "description", "price", "duration_minutes", "is_active", "color",
+     "created_at", "updated_at"]
+)
+
+client_serializer = ModelSerializer(
+    Client,
+    ["id", "user_id", "telegram_id", "first_name", "last_name", "phone", "email", "notes",
+     "created_at", "updated_at"]
+)
+
+appointment_serializer = ModelSerializer(
+    Appointment,
+    ["id", "user_id", "service_id", "client_id", "appointment_date", "duration_minutes", "ends_at",
+     "status", "notes", "client_notes", "price", "created_at", "updated_at", "service", "client"],
+    nested={"service": service_serializer, "client": client_serializer},
+)
+
+working_hours_serializer = ModelSerializer(
+    WorkingHours,
+    ["id", "user_id", "day_of_week", "start_time", "end_time", "is_working_day", "break_start",
+     "break_end", "created_at", "updated_at"]
+)
+
+working_day_serializer = ModelSerializer(
+    WorkingDay,
+    ["id", "user_id", "date", "start_time", "end_time", "is_working_day", "break_start", "break_end",
+     "created_at", "updated_at"]
+)
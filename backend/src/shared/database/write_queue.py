@@ -0,0 +1,152 @@
+"""
+Очередь записи с групповым коммитом
+Слой Shared - общие компоненты
+
+SQLite допускает только одного писателя. Вместо того чтобы каждый запрос
+открывал свою транзакцию и ждал блокировку, роутеры отправляют единицы
+работы в очередь, а одна фоновая задача выполняет их пачкой в одной
+транзакции. Каждая единица работает внутри своего SAVEPOINT, поэтому
+ошибка в одной из них откатывает только ее.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .connection import async_session_factory, batch_session, writer_session_active
+from ..config.env_loader import config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Единица работы: получает общую сессию пачки, не вызывает commit()
+WriteUnit = Callable[[AsyncSession], Awaitable[T]]
+
+
+class WriteCoordinator:
+    """Единственный писатель: объединяет единицы работы в одну транзакцию"""
+
+    def __init__(self, session_factory: async_sessionmaker, max_batch_size: int = 64):
+        self.session_factory = session_factory
+        self.max_batch_size = max_batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Статистика для логов и бенчмарков
+        self.batches_committed = 0
+        self.units_committed = 0
+        self.units_rejected = 0
+
+    def start(self) -> None:
+        """Запускает фоновую задачу писателя в текущем event loop"""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._task = loop.create_task(self._run(), name="write-coordinator")
+
+    async def stop(self) -> None:
+        """Дожидается обработки очереди и останавливает писателя"""
+        if self._task is None or self._task.done():
+            return
+        if self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def submit(self, unit: WriteUnit) -> T:
+        """
+        Ставит единицу работы в очередь и ждет коммита пачки
+
+        Args:
+            unit: async-функция, получающая сессию. Не должна вызывать commit()
+
+        Returns:
+            Результат unit после успешного коммита
+
+        Raises:
+            Исключение из unit (ее SAVEPOINT откатывается) или ошибка коммита
+            RuntimeError: Вызов из обработчика, который держит get_session()
+        """
+        shared = batch_session.get()
+        if shared is not None:
+            # POST /api/batch уже держит пишущее соединение и сам фиксирует
+            # транзакцию - очередь ждала бы его до таймаута пула
+            async with shared.begin_nested():
+                return await unit(shared)
+
+        if writer_session_active.get():
+            # Иначе очередь и все остальные писатели простоят до pool_timeout
+            raise RuntimeError("write_coordinator.submit() нельзя вызывать из обработчика с get_session()")
+
+        self.start()
+        future = self._loop.create_future()
+        await self._queue.put((unit, future))
+        return await future
+
+    async def _run(self) -> None:
+        """Цикл писателя: берет все, что накопилось, и коммитит одной транзакцией"""
+        while True:
+            batch = [await self._queue.get()]
+            # Пока шел предыдущий коммит, в очереди накопились новые единицы
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._commit_batch(batch)
+            except Exception as e:
+                logger.error("❌ Ошибка очереди записи: %s", e, exc_info=True)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _commit_batch(self, batch: List[Tuple[WriteUnit, asyncio.Future]]) -> None:
+        """Выполняет пачку в одной транзакции, каждую единицу - в своем SAVEPOINT"""
+        completed: List[Tuple[asyncio.Future, Any]] = []
+
+        async with self.session_factory() as session:
+            async with session.begin():
+                for unit, future in batch:
+                    if future.done():  # Вызывающий уже отменил ожидание
+                        continue
+                    try:
+                        async with session.begin_nested():
+                            result = await unit(session)
+                    except Exception as e:
+                        self.units_rejected += 1
+                        future.set_exception(e)
+                    else:
+                        completed.append((future, result))
+
+        # Результаты отдаем только после успешного коммита всей пачки
+        self.batches_committed += 1
+        self.units_committed += len(completed)
+        for future, result in completed:
+            if not future.done():
+                future.set_result(result)
+
+        if len(batch) > 1:
+            logger.debug("💾 Групповой коммит: %d единиц, отклонено %d", len(completed), len(batch) - len(completed))
+
+
+# Глобальный писатель поверх пишущего пула.
+#
+# Инвариант: у SQLite в пишущем пуле одно соединение (DB_WRITE_POOL_SIZE=1,
+# без overflow), и его держит либо эта очередь, либо обработчик с
+# get_session() (изменение и удаление записей, клиентов, услуг, графика),
+# либо POST /api/batch - все до конца своей транзакции. Поэтому обработчик
+# пишет одним из двух способов: через submit() из сессии чтения или через
+# get_session() без submit(). Нарушение submit() отклоняет сразу, а пакет
+# выполняет единицы работы на своей сессии.
+write_coordinator = WriteCoordinator(async_session_factory, max_batch_size=config.write_queue_max_batch)
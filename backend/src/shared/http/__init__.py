@@ -0,0 +1,14 @@
+"""
+HTTP компоненты API: классы ответов, условные GET запросы
+"""
+
+from .responses import FastJSONResponse
+from .conditional import collection_versions, make_etag, not_modified, validator_headers
+
+__all__ = [
+    'FastJSONResponse',
+    'collection_versions',
+    'make_etag',
+    'not_modified',
+    'validator_headers'
+]
@@ -0,0 +1,82 @@
+"""
+Условные GET запросы (ETag / If-None-Match)
+Слой Shared - общие компоненты
+
+Mini App перечитывает услуги, график и профиль при каждом открытии
+экрана, а меняются они редко. Ответ получает слабый ETag, посчитанный
+из дешевого валидатора - count() и max(updated_at) коллекции или версии
+пользователя. WebView сам повторяет запрос с If-None-Match, и если данные
+не изменились, сервер отвечает 304 без загрузки и сериализации строк.
+
+Использование:
+    etag = make_etag("services", user.id, *await collection_versions(
+        session, (Service, Service.user_id == user.id)
+    ))
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    ...
+    response.headers.update(validator_headers(etag))
+"""
+
+import hashlib
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Кэшировать можно только у клиента (ответ зависит от пользователя) и
+# только с проверкой ETag при каждом использовании
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Слабый ETag из частей валидатора"""
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def validator_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Слабое сравнение ETag из If-None-Match (список через запятую или *)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Ответ 304, если у клиента актуальная версия, иначе None"""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=validator_headers(etag))
+    return None
+
+
+async def collection_versions(session: AsyncSession, *collections: Tuple) -> Tuple:
+    """
+    count() и max(updated_at) для нескольких коллекций одним запросом
+
+    Args:
+        collections: (модель, *условия) - например (Service, Service.user_id == 1)
+
+    Returns:
+        tuple: (count_1, max_updated_1, count_2, max_updated_2, ...)
+    """
+    columns = []
+    for model, *conditions in collections:
+        columns.append(select(func.count()).select_from(model).where(*conditions).scalar_subquery())
+        columns.append(select(func.max(model.updated_at)).where(*conditions).scalar_subquery())
+    result = await session.execute(select(*columns))
+    return tuple(result.one())
@@ -0,0 +1,24 @@
+"""
+Быстрые JSON ответы
+Слой Shared - общие компоненты
+
+FastJSONResponse - класс ответа по умолчанию для приложения: кодирует через
+orjson (datetime, date, time, Enum и UUID - нативно, без isoformat()).
+
+Обработчик, вернувший dict, все равно проходит через jsonable_encoder
+FastAPI. Горячие списки возвращают FastJSONResponse сами, собрав данные
+сериализаторами из database.serializers, - так ответ кодируется одним
+проходом orjson.
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+
+class FastJSONResponse(ORJSONResponse):
+    """JSON ответ на orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
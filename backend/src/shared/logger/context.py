@@ -0,0 +1,100 @@
+"""
+Контекст запроса в логах
+Слой Shared - общие компоненты
+
+RequestContextMiddleware открывает контекст на каждый HTTP запрос:
+request_id (из заголовка X-Request-ID или новый), метод, маршрут и время
+начала. Аутентификация дописывает user_id через bind_user(). Фабрика
+записей копирует контекст в каждую LogRecord в момент вызова логгера -
+до очереди вывода, где contextvars уже недоступны.
+"""
+
+import logging
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from starlette.datastructures import MutableHeaders
+
+REQUEST_ID_HEADER = "x-request-id"
+
+_request_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("log_request_context", default=None)
+
+access_logger = logging.getLogger("api.access")
+
+
+def bind_user(user_id: int) -> None:
+    """Привязывает пользователя к записям текущего запроса"""
+    context = _request_context.get()
+    if context is not None:
+        context["user_id"] = user_id
+
+
+def _route(context: Dict[str, Any]) -> str:
+    # Шаблон маршрута ("/api/clients/{client_id}") появляется в scope после роутинга
+    route = context["scope"].get("route")
+    return getattr(route, "path", None) or context["scope"]["path"]
+
+
+def install_record_factory() -> None:
+    """Добавляет поля контекста в каждую LogRecord (повторный вызов безопасен)"""
+    base_factory = logging.getLogRecordFactory()
+    if getattr(base_factory, "_request_context", False):
+        return
+
+    def record_factory(*args, **kwargs) -> logging.LogRecord:
+        record = base_factory(*args, **kwargs)
+        context = _request_context.get()
+        if context is None:
+            record.request_id = record.route = record.user_id = record.duration_ms = None
+        else:
+            record.request_id = context["request_id"]
+            record.route = f"{context['method']} {_route(context)}"
+            record.user_id = context["user_id"]
+            record.duration_ms = round((time.perf_counter() - context["started"]) * 1000, 1)
+        return record
+
+    record_factory._request_context = True
+    logging.setLogRecordFactory(record_factory)
+
+
+class RequestContextMiddleware:
+    """ASGI middleware: контекст логов на запрос и заголовок X-Request-ID в ответе"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        context = {
+            "request_id": request_id or uuid.uuid4().hex[:16],
+            "method": scope["method"],
+            "scope": scope,
+            "user_id": None,
+            "started": time.perf_counter(),
+        }
+        token = _request_context.set(context)
+        status = 500
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, context["request_id"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            if access_logger.isEnabledFor(logging.DEBUG):
+                access_logger.debug("📨 %s %s -> %s", scope["method"], _route(context), status)
+            _request_context.reset(token)
@@ -0,0 +1,39 @@
+"""
+JSON формат логов
+Слой Shared - общие компоненты
+
+Одна запись - одна строка JSON: время, уровень, логгер, сообщение и поля
+контекста запроса (request_id, route, user_id, duration_ms). Такие логи
+фильтруются по полям (jq, Loki, ClickHouse) вместо grep по тексту.
+Включается LOG_FORMAT=json.
+"""
+
+import json
+import logging
+from datetime import datetime, timezone
+
+CONTEXT_FIELDS = ("request_id", "route", "user_id", "duration_ms")
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует LogRecord в строку JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
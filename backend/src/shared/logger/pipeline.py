@@ -0,0 +1,126 @@
+"""
+Неблокирующий вывод логов
+Слой Shared - общие компоненты
+
+На event loop остается только QueueHandler: запись кладется в
+ограниченную очередь, а запись в файл, ротацию и вывод в консоль делает
+поток QueueListener. Если поток не успевает и очередь заполнена, записи
+ниже WARNING отбрасываются (с подсчетом), чтобы логирование не
+останавливало обработку запросов. WARNING и выше ждут места в очереди.
+"""
+
+import logging
+import queue
+import threading
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# Сколько ждать места в очереди для WARNING и выше, прежде чем отбросить запись
+BLOCKING_PUT_TIMEOUT = 1.0
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler с ограниченной очередью и счетчиком отброшенных записей"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = Counter()
+        self._unreported = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Стандартный prepare копирует запись и форматирует ее целиком (с датой)
+        # на event loop. Достаточно подставить аргументы - они могут измениться
+        # до того, как поток дойдет до записи. Остальное форматирует поток
+        if record.exc_info or record.stack_info:
+            return super().prepare(record)
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record, timeout=BLOCKING_PUT_TIMEOUT)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped[record.levelname] += 1
+                self._unreported += 1
+            return
+
+        if self._unreported:
+            self._report_dropped()
+
+    def _report_dropped(self) -> None:
+        """После перегрузки сообщает в лог, сколько записей потеряно"""
+        with self._lock:
+            count, self._unreported = self._unreported, 0
+        record = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            "⚠️ Очередь логов переполнена: отброшено %s записей (всего %s)",
+            (count, sum(self.dropped.values())), None,
+        )
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            with self._lock:
+                self._unreported += count
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+
+
+def start_queue_logging(root_logger: logging.Logger, queue_size: int) -> DroppingQueueHandler:
+    """
+    Переносит handlers root логгера в поток QueueListener
+
+    Фильтры и уровни handlers продолжают работать в потоке
+    (respect_handler_level), на root остается один QueueHandler.
+
+    Args:
+        root_logger: Настроенный root логгер
+        queue_size: Максимальный размер очереди записей
+    """
+    global _listener, _queue_handler
+    stop_queue_logging()
+
+    handlers = list(root_logger.handlers)
+    log_queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    root_logger.handlers.clear()
+    root_logger.addHandler(_queue_handler)
+    _listener.start()
+    return _queue_handler
+
+
+def stop_queue_logging() -> None:
+    """Дописывает очередь и останавливает поток вывода (повторный вызов безопасен)"""
+    global _listener, _queue_handler
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    # Записи, сделанные после остановки, уходят сразу в handlers
+    root_logger = logging.getLogger()
+    if _queue_handler in root_logger.handlers:
+        root_logger.removeHandler(_queue_handler)
+        for handler in listener.handlers:
+            root_logger.addHandler(handler)
+    listener.stop()
+    if _queue_handler.dropped:
+        logging.getLogger(__name__).warning(
+            "⚠️ За время работы отброшено записей лога: %s", dict(_queue_handler.dropped)
+        )
+    for handler in listener.handlers:
+        handler.flush()
+
+
+def dropped_records() -> int:
+    """Сколько записей отброшено из-за переполнения очереди"""
+    return sum(_queue_handler.dropped.values()) if _queue_handler else 0
@@ -0,0 +1,75 @@
+"""
+Ротация логов со сжатием
+Слой Shared - общие компоненты
+
+Закрытый при ротации файл переименовывается (быстро, под блокировкой
+handler'а) и сжимается gzip в фоновом потоке: api.log.1.gz, api.log.2.gz...
+Запись в новый файл продолжается сразу, не дожидаясь сжатия.
+
+Пока файл сжимается, у него уникальное имя (api.log.1.<время>). Если
+сжатие не удалось, файл так и остается на диске несжатым: следующая
+ротация его не перезапишет, но и не удалит по backupCount.
+"""
+
+import gzip
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler, сжимающий ротированные файлы в фоне"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._compressing: Optional[threading.Thread] = None
+
+    def rotation_filename(self, default_name: str) -> str:
+        return default_name + ".gz"
+
+    def doRollover(self) -> None:
+        # Ротация сдвигает api.log.N.gz - прежнее сжатие должно закончиться,
+        # иначе сдвинется недописанный архив. При ротации раз в 10MB это
+        # ожидание практически всегда нулевое
+        self.wait_compression()
+        super().doRollover()
+
+    def rotate(self, source: str, dest: str) -> None:
+        if not os.path.exists(source):
+            return
+        pending = f"{dest[:-len('.gz')]}.{datetime.now():%Y%m%d-%H%M%S-%f}"
+        os.replace(source, pending)
+        self._compressing = threading.Thread(
+            target=self._compress, args=(pending, dest), name="log-compress", daemon=True
+        )
+        self._compressing.start()
+
+    @staticmethod
+    def _compress(source: str, dest: str) -> None:
+        try:
+            with open(source, "rb") as raw, gzip.open(dest + ".tmp", "wb", compresslevel=6) as packed:
+                shutil.copyfileobj(raw, packed, 1024 * 1024)
+            os.replace(dest + ".tmp", dest)
+            os.remove(source)
+        except Exception as e:
+            # Несжатый файл остается на диске под своим именем - данные не теряются
+            logger.warning("⚠️ Не удалось сжать %s, файл оставлен несжатым: %s", source, e)
+            try:
+                os.remove(dest + ".tmp")
+            except OSError:
+                pass
+
+    def wait_compression(self) -> None:
+        if self._compressing is not None:
+            self._compressing.join()
+            self._compressing = None
+
+    def close(self) -> None:
+        self.wait_compression()
+        super().close()
@@ -0,0 +1,68 @@
+"""
+Выборочное логирование горячих путей
+Слой Shared - общие компоненты
+
+Списки и проверки авторизации вызываются на каждый экран Mini App.
+Их INFO-записи полезны для понимания нагрузки, но писать каждую не
+нужно: SamplingFilter пропускает заданную долю записей по имени логгера
+(логгер модуля = группа роутов). WARNING и выше проходят всегда.
+
+Формат LOG_SAMPLE_RATES: "src.features.api.clients=0.1,src.features.api=0.5".
+Правило с самым длинным совпадающим префиксом побеждает.
+"""
+
+import logging
+import random
+from typing import Dict
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """
+    Разбирает строку LOG_SAMPLE_RATES
+
+    Raises:
+        ValueError: Если правило записано неверно
+    """
+    rates = {}
+    for rule in (value or "").split(","):
+        rule = rule.strip()
+        if not rule:
+            continue
+        name, sep, rate = rule.partition("=")
+        if not sep:
+            raise ValueError(f"Неверное правило LOG_SAMPLE_RATES: {rule!r} (ожидается логгер=доля)")
+        rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает долю записей ниже WARNING для логгеров из rates"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._resolved: Dict[str, float] = {}
+
+    def rate_for(self, name: str) -> float:
+        """Доля для логгера: правило с самым длинным префиксом, иначе 1.0"""
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            best = -1
+            for prefix, prefix_rate in self.rates.items():
+                if (name == prefix or name.startswith(prefix + ".")) and len(prefix) > best:
+                    rate, best = prefix_rate, len(prefix)
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        # Фильтр стоит на каждом обработчике: решение принимается один раз на запись,
+        # чтобы консоль и файл получали одни и те же записи
+        sampled = getattr(record, "_sampled", None)
+        if sampled is None:
+            rate = self.rate_for(record.name)
+            sampled = rate >= 1.0 or random.random() < rate
+            record._sampled = sampled
+        return sampled
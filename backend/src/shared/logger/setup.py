@@ -2,7 +2,13 @@ import logging
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 
-def setup_logging(log_file='app.log', max_bytes=10*1024*1024, backup_count=5):
+from .context import install_record_factory
+from .formatters import JsonFormatter
+from .pipeline import start_queue_logging, stop_queue_logging
+from .rotation import CompressingRotatingFileHandler
+from .sampling import SamplingFilter, parse_sample_rates
+
+def setup_logging(log_file='app.log', max_bytes=10*1024*1024, backup_count=5, level=logging.DEBUG, sample_rates=None, queue_size=0, log_format='text', compress=False):
     """
     Настраивает логирование с ротацией файлов
     
@@ -10,9 +16,23 @@ def setup_logging(log_file='app.log', max_bytes=10*1024*1024, backup_count=5):
         log_file: Имя файла лога
         max_bytes: Максимальный размер файла (по умолчанию 10MB)
         backup_count: Количество резервных копий
+        level: Минимальный уровень (число или имя, например "INFO")
+        sample_rates: Доли записей по логгерам - словарь или строка LOG_SAMPLE_RATES
+        queue_size: Размер очереди для вывода в отдельном потоке (0 - писать сразу)
+        log_format: "text" или "json"
+        compress: Сжимать ротированные файлы gzip в фоне
     """
     
     try:
+        # Повторная настройка: сначала дописываем очередь прежнего потока
+        stop_queue_logging()
+        if isinstance(level, str):
+            level = logging.getLevelName(level.upper())
+            if not isinstance(level, int):
+                level = logging.INFO
+        if isinstance(sample_rates, str):
+            sample_rates = parse_sample_rates(sample_rates)
+
         # Определяем путь к директории backend
         backend_dir = Path(__file__).parent.parent.parent.parent
         log_path = backend_dir / log_file
@@ -22,32 +42,53 @@ def setup_logging(log_file='app.log', max_bytes=10*1024*1024, backup_count=5):
         
         # Console handler - выводим все логи начиная с INFO
         console = logging.StreamHandler()
-        console.setLevel(logging.INFO)
+        console.setLevel(max(logging.INFO, level))
 
-        # File handler с ротацией - сохраняем все логи начиная с DEBUG
-        file_handler = RotatingFileHandler(
+        # File handler с ротацией - сохраняем все логи начиная с level
+        file_handler_class = CompressingRotatingFileHandler if compress else RotatingFileHandler
+        file_handler = file_handler_class(
             log_path,
             maxBytes=max_bytes,
             backupCount=backup_count,
             encoding='utf-8'
         )
-        file_handler.setLevel(logging.DEBUG)
+        file_handler.setLevel(level)
         
         # Формат логов
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
+        if log_format == 'json':
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
         console.setFormatter(formatter)
         file_handler.setFormatter(formatter)
+
+        # Выборочное логирование горячих путей - один фильтр на оба handler
+        sampling = SamplingFilter(sample_rates) if sample_rates else None
+        if sampling and not queue_size:
+            console.addFilter(sampling)
+            file_handler.addFilter(sampling)
         
+        # Поля контекста запроса копируются в запись на event loop, до очереди
+        install_record_factory()
+
         # Получаем root logger и очищаем существующие handlers
         root_logger = logging.getLogger()
         root_logger.handlers.clear()
-        root_logger.setLevel(logging.DEBUG)
+        # Записи ниже level отбрасываются до форматирования сообщения
+        root_logger.setLevel(level)
         
         # Добавляем наши handlers
         root_logger.addHandler(console)
         root_logger.addHandler(file_handler)
+
+        # Файл и консоль - в потоке QueueListener, на event loop только очередь.
+        # Выборка - до очереди, чтобы отброшенные записи не занимали места
+        if queue_size:
+            queue_handler = start_queue_logging(root_logger, queue_size)
+            if sampling:
+                queue_handler.addFilter(sampling)
         
         # Уменьшаем уровень логирования для внешних библиотек
         logging.getLogger('httpx').setLevel(logging.WARNING)
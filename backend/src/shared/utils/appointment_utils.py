@@ -3,13 +3,17 @@
 Проверка пересечений, валидация времени и т.д.
 """
 
-from datetime import datetime, timedelta
-from typing import Optional
-from sqlalchemy import select, and_, or_
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..database.models import Appointment, AppointmentStatus
 
+# Максимальная продолжительность записи и услуги (validate_appointment_time,
+# схемы API). На нее опирается нижняя граница в check_appointment_overlap
+MAX_APPOINTMENT_DURATION_MINUTES = 480
+
 
 async def check_appointment_overlap(
     session: AsyncSession,
@@ -35,12 +39,13 @@ async def check_appointment_overlap(
     # Вычисляем время окончания новой записи
     end_time = appointment_date + timedelta(minutes=duration_minutes)
     
-    # Строим запрос для поиска пересечений
-    # Запись пересекается, если:
-    # 1. Новая запись начинается во время существующей
-    # 2. Новая запись заканчивается во время существующей
-    # 3. Новая запись полностью охватывает существующую
-    # 4. Существующая запись полностью охватывает новую
+    # Записи пересекаются, если существующая начинается раньше окончания новой
+    # и заканчивается позже ее начала (касание границ пересечением не считается).
+    # Оба условия - по хранимым колонкам, поэтому работает индекс
+    # (user_id, status, appointment_date, ends_at). Нижняя граница начала
+    # следует из максимальной продолжительности и превращает перебор всей
+    # истории мастера в короткий диапазон индекса
+    earliest_start = appointment_date - timedelta(minutes=MAX_APPOINTMENT_DURATION_MINUTES)
     
     # Добавляем eager loading для client
     from sqlalchemy.orm import joinedload
@@ -52,25 +57,9 @@ async def check_appointment_overlap(
         # Учитываем только активные записи (не отмененные и не завершенные)
         Appointment.status.in_([AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED]),
         # Проверка пересечений по времени
-        or_(
-            # Новая запись начинается во время существующей
-            and_(
-                Appointment.appointment_date <= appointment_date,
-                # SQLAlchemy не поддерживает прямое сложение с timedelta в запросах
-                # Поэтому используем SQL выражение
-                appointment_date < Appointment.appointment_date + timedelta(minutes=1) * Appointment.duration_minutes
-            ),
-            # Новая запись заканчивается во время существующей
-            and_(
-                Appointment.appointment_date < end_time,
-                end_time <= Appointment.appointment_date + timedelta(minutes=1) * Appointment.duration_minutes
-            ),
-            # Новая запись полностью охватывает существующую
-            and_(
-                appointment_date <= Appointment.appointment_date,
-                Appointment.appointment_date + timedelta(minutes=1) * Appointment.duration_minutes <= end_time
-            )
-        )
+        Appointment.appointment_date < end_time,
+        Appointment.appointment_date >= earliest_start,
+        Appointment.ends_at > appointment_date
     )
     
     # Исключаем текущую запись при редактировании
@@ -114,7 +103,7 @@ async def validate_appointment_time(
         return False, "Продолжительность должна быть больше 0"
     
     # Проверка 3: Разумная продолжительность (не больше 8 часов)
-    if duration_minutes > 480:
+    if duration_minutes > MAX_APPOINTMENT_DURATION_MINUTES:
         return False, "Продолжительность не может превышать 8 часов"
     
     # Проверка 4: Пересечение с другими записями
@@ -127,7 +116,7 @@ async def validate_appointment_time(
     )
     
     if overlapping:
-        overlap_end = overlapping.appointment_date + timedelta(minutes=overlapping.duration_minutes)
+        overlap_end = overlapping.ends_at
         return False, (
             f"Время пересекается с существующей записью: "
             f"{overlapping.appointment_date.strftime('%d.%m.%Y %H:%M')} - "
@@ -165,3 +154,25 @@ def calculate_appointment_end_time(appointment_date: datetime, duration_minutes:
         datetime: Время окончания
     """
     return appointment_date + timedelta(minutes=duration_minutes)
+
+
+def appointment_date_range(date_from: Optional[date] = None, date_to: Optional[date] = None) -> List:
+    """
+    Условия фильтра записей по датам (включительно) в виде полуинтервала
+
+    func.date(appointment_date) не дает использовать индекс, поэтому даты
+    превращаются в границы: [date_from 00:00, date_to + 1 день 00:00)
+
+    Args:
+        date_from: Первая дата диапазона
+        date_to: Последняя дата диапазона
+
+    Returns:
+        list: Условия для select(...).where(*conditions)
+    """
+    conditions = []
+    if date_from:
+        conditions.append(Appointment.appointment_date >= datetime.combine(date_from, time.min))
+    if date_to:
+        conditions.append(Appointment.appointment_date < datetime.combine(date_to + timedelta(days=1), time.min))
+    return conditions
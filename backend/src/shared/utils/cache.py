@@ -0,0 +1,117 @@
+"""
+Простые in-process кэши
+Слой Shared - общие компоненты
+"""
+
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Hashable, Iterator, Optional, Set, Tuple
+
+from ..config.env_loader import config
+
+
+class TTLCache:
+    """
+    Ограниченный LRU-кэш со временем жизни записей
+
+    Ключи - кортежи, первый элемент которых задает пространство имен
+    (например, ("clients", user_id, search)), чтобы сбрасывать все
+    варианты фильтров одного пользователя через discard_prefix().
+    При ttl <= 0 кэш выключен: get() всегда промахивается.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Значение или None, если его нет или оно устарело"""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def discard(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def discard_prefix(self, *prefix) -> None:
+        """Удаляет все ключи-кортежи, начинающиеся с prefix"""
+        size = len(prefix)
+        for key in [key for key in self._data if isinstance(key, tuple) and key[:size] == prefix]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+# Пользователи для get_current_user: ключ ("user", user_id)
+users = TTLCache(max_size=config.user_cache_size, ttl=config.user_cache_ttl)
+
+# total для списков: ключ (список, user_id, фильтры...)
+list_totals = TTLCache(max_size=config.list_total_cache_size, ttl=config.list_total_cache_ttl)
+
+
+# Сбросы, которые нужно повторить после коммита внешней транзакции
+# (см. deferred_invalidations)
+_pending_invalidations: ContextVar[Optional[Set[Tuple[Callable[[int], None], int]]]] = ContextVar(
+    "pending_invalidations", default=None
+)
+
+
+@contextmanager
+def deferred_invalidations() -> Iterator[Set[Tuple[Callable[[int], None], int]]]:
+    """
+    Собирает сбросы кэша, сделанные внутри внешней транзакции
+
+    Внутри POST /api/batch commit() обработчика - только flush: обработчик
+    сбрасывает кэш до коммита пакета, и параллельный запрос успевает
+    закэшировать старое значение. Вызывающий повторяет собранные сбросы
+    после своего коммита.
+
+    Yields:
+        set: Пары (функция сброса, user_id)
+    """
+    pending = set()
+    token = _pending_invalidations.set(pending)
+    try:
+        yield pending
+    finally:
+        _pending_invalidations.reset(token)
+
+
+def _remember(invalidate: Callable[[int], None], user_id: int) -> None:
+    pending = _pending_invalidations.get()
+    if pending is not None:
+        pending.add((invalidate, user_id))
+
+
+def invalidate_client_totals(user_id: int) -> None:
+    """Сбрасывает кэшированные total списка клиентов мастера"""
+    list_totals.discard_prefix("clients", user_id)
+    _remember(invalidate_client_totals, user_id)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Сбрасывает закэшированного пользователя после изменения профиля"""
+    users.discard(("user", user_id))
+    _remember(invalidate_user, user_id)
@@ -0,0 +1,136 @@
+"""
+Курсорная (keyset) пагинация списков
+Слой Shared - общие компоненты
+
+Вместо OFFSET, который заставляет базу пропустить все предыдущие строки,
+следующая страница начинается сразу за последней строкой текущей:
+WHERE (sort, id) < (последние sort, id). Стоимость страницы не зависит
+от того, насколько глубоко мастер пролистал историю.
+
+Курсор непрозрачен для клиента: base64 от JSON с ключом строки и
+направлением. Клиент только передает обратно next_cursor / prev_cursor.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, and_, or_
+
+NEXT = "next"
+PREV = "prev"
+
+
+def encode_cursor(sort_value: Any, row_id: int, direction: str = NEXT) -> str:
+    """Упаковывает ключ строки в непрозрачный курсор"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps({"v": sort_value, "id": row_id, "d": direction}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int, str]:
+    """
+    Распаковывает курсор
+
+    Returns:
+        tuple: (значение сортировки, id, направление)
+
+    Raises:
+        HTTPException: Если курсор поврежден
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction = payload["d"]
+        if direction not in (NEXT, PREV):
+            raise ValueError(direction)
+        return payload["v"], int(payload["id"]), direction
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Неверный курсор пагинации")
+
+
+class KeysetPaginator:
+    """
+    Пагинация по убыванию (sort_column, id_column)
+
+    Использование:
+        paginator = KeysetPaginator(Client.created_at, Client.id, cursor, limit)
+        result = await session.execute(paginator.apply(query))
+        clients, next_cursor, prev_cursor = paginator.paginate(result.scalars().all())
+    """
+
+    def __init__(self, sort_column, id_column, cursor: Optional[str] = None, limit: int = 50):
+        self.sort_column = sort_column
+        self.id_column = id_column
+        self.cursor = cursor
+        self.limit = limit
+        self.direction = NEXT
+        self._key = None
+
+        if cursor:
+            sort_value, row_id, self.direction = decode_cursor(cursor)
+            if isinstance(sort_column.type, DateTime):
+                try:
+                    sort_value = datetime.fromisoformat(sort_value)
+                except (TypeError, ValueError):
+                    raise HTTPException(status_code=400, detail="Неверный курсор пагинации")
+            self._key = (sort_value, row_id)
+
+    def apply(self, query):
+        """Добавляет к запросу условие курсора, сортировку и LIMIT (+1 строка для has_more)"""
+        if self._key is not None:
+            sort_value, row_id = self._key
+            if self.direction == NEXT:
+                # sort <= v AND (sort < v OR id < id_v): диапазон по индексу на sort
+                query = query.where(and_(
+                    self.sort_column <= sort_value,
+                    or_(self.sort_column < sort_value, self.id_column < row_id)
+                ))
+            else:
+                query = query.where(and_(
+                    self.sort_column >= sort_value,
+                    or_(self.sort_column > sort_value, self.id_column > row_id)
+                ))
+
+        if self.direction == NEXT:
+            query = query.order_by(self.sort_column.desc(), self.id_column.desc())
+        else:
+            # Назад идем по возрастанию и разворачиваем страницу в paginate()
+            query = query.order_by(self.sort_column.asc(), self.id_column.asc())
+        return query.limit(self.limit + 1)
+
+    def paginate(self, rows: List[Any], has_previous: Optional[bool] = None) -> Tuple[List[Any], Optional[str], Optional[str]]:
+        """
+        Обрезает лишнюю строку и строит курсоры соседних страниц
+
+        Args:
+            rows: Результат запроса из apply()
+            has_previous: Есть ли строки перед страницей, если это известно
+                без курсора (например, offset > 0)
+
+        Returns:
+            tuple: (строки страницы, next_cursor, prev_cursor)
+        """
+        has_more = len(rows) > self.limit
+        rows = list(rows[:self.limit])
+
+        if self.direction == PREV:
+            rows.reverse()
+            has_next, has_prev = True, has_more
+        else:
+            has_next = has_more
+            has_prev = self._key is not None if has_previous is None else has_previous
+
+        if not rows:
+            return rows, None, None
+
+        sort_attr = self.sort_column.key
+        id_attr = self.id_column.key
+        first, last = rows[0], rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_attr), getattr(last, id_attr), NEXT) if has_next else None
+        prev_cursor = encode_cursor(getattr(first, sort_attr), getattr(first, id_attr), PREV) if has_prev else None
+        return rows, next_cursor, prev_cursor
@@ -44,6 +44,30 @@ def test_calculate_end_time():
     print(f"✅ Результат: {result}")
 
 
+def test_duration_limit_in_schemas():
+    """Схемы API не пропускают запись или услугу длиннее лимита проверки пересечений"""
+    print("\n🧪 Тест лимита продолжительности в схемах...")
+
+    import pytest
+    from pydantic import ValidationError
+    from src.features.api.appointments import AppointmentCreate, AppointmentUpdate
+    from src.features.api.services import ServiceCreate, ServiceUpdate
+    from src.shared.utils.appointment_utils import MAX_APPOINTMENT_DURATION_MINUTES
+
+    too_long = MAX_APPOINTMENT_DURATION_MINUTES + 1
+    with pytest.raises(ValidationError):
+        ServiceCreate(name="Марафон", price=1000, duration_minutes=too_long)
+    with pytest.raises(ValidationError):
+        ServiceUpdate(duration_minutes=too_long)
+    with pytest.raises(ValidationError):
+        AppointmentCreate(service_id=1, client_id=1, appointment_date=datetime(2030, 1, 1, 10), duration_minutes=too_long)
+    with pytest.raises(ValidationError):
+        AppointmentUpdate(duration_minutes=too_long)
+
+    assert ServiceCreate(name="Смена", price=1000, duration_minutes=MAX_APPOINTMENT_DURATION_MINUTES)
+    print(f"✅ Продолжительность ограничена {MAX_APPOINTMENT_DURATION_MINUTES} минутами")
+
+
 def main():
     """Запуск всех тестов"""
     print("=" * 60)
@@ -53,6 +77,7 @@ def main():
     try:
         test_format_time_range()
         test_calculate_end_time()
+        test_duration_limit_in_schemas()
         
         print("\n" + "=" * 60)
         print("✅ Все тесты пройдены успешно!")
@@ -0,0 +1,159 @@
+"""
+Тесты пакетных запросов (/api/batch): ссылки на ответы, транзакция пакета
+"""
+
+import httpx
+
+
+def test_batch_references_and_transaction(run_db):
+    """Подзапросы видят id созданных раньше объектов; с transaction=true ошибка откатывает все"""
+    print("🧪 Тест пакетных запросов...")
+
+    from api_server import app
+    from src.shared.auth.jwt_auth import create_token_response
+    from src.shared.database.connection import async_session_factory
+    from src.shared.database.models import User
+
+    async def scenario():
+        async with async_session_factory() as session:
+            user = User(telegram_id=9009, username="batch", first_name="Мастер")
+            session.add(user)
+            await session.commit()
+            token = create_token_response(user.to_dict())["access_token"]
+
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Bearer {token}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as client:
+            created = await client.post("/api/batch", json={"transaction": True, "requests": [
+                {"id": "service", "method": "POST", "path": "/api/services/",
+                 "body": {"name": "Стрижка", "price": 1500, "duration_minutes": 60}},
+                {"id": "client", "method": "POST", "path": "/api/clients/", "body": {"first_name": "Анна"}},
+                {"method": "PUT", "path": "/api/clients/{{client.id}}", "body": {"notes": "Постоянный клиент"}},
+                {"method": "POST", "path": "/api/appointments/", "body": {
+                    "service_id": "{{service.id}}", "client_id": "{{client.id}}",
+                    "appointment_date": "2030-01-01T10:00:00",
+                }},
+            ]})
+            rolled_back = await client.post("/api/batch", json={"transaction": True, "requests": [
+                {"id": "client", "method": "POST", "path": "/api/clients/", "body": {"first_name": "Борис"}},
+                {"method": "DELETE", "path": "/api/services/999999"},
+                {"method": "POST", "path": "/api/clients/", "body": {"first_name": "Вера"}},
+            ]})
+            partial = await client.post("/api/batch", json={"requests": [
+                {"method": "POST", "path": "/api/clients/", "body": {"first_name": "Галина"}},
+                {"method": "GET", "path": "/api/clients/{{missing.id}}"},
+                {"method": "POST", "path": "/api/auth/logout"},
+                {"method": "GET", "path": "/api/unknown"},
+            ]})
+            clients = (await client.get("/api/clients/")).json()["clients"]
+            appointments = (await client.get("/api/appointments/")).json()["appointments"]
+        return created.json(), rolled_back.json(), partial.json(), clients, appointments
+
+    created, rolled_back, partial, clients, appointments = run_db(scenario)
+
+    assert created["committed"] is True
+    assert [item["status"] for item in created["responses"]] == [200, 200, 200, 200]
+    service_id = created["responses"][0]["body"]["id"]
+    assert appointments[0]["service"]["id"] == service_id
+    assert appointments[0]["client"]["notes"] == "Постоянный клиент"
+
+    assert rolled_back["committed"] is False
+    assert [item["status"] for item in rolled_back["responses"]] == [200, 404, 424]
+
+    assert partial["committed"] is True
+    assert [item["status"] for item in partial["responses"]] == [200, 400, 400, 404]
+    assert sorted(item["first_name"] for item in clients) == ["Анна", "Галина"]
+    print("✅ Пакет выполняется с подстановкой id и откатом")
+
+
+def test_batch_unexpected_error(run_db, monkeypatch):
+    """Необработанная ошибка подзапроса - 500 только для него, его изменения откатываются"""
+    print("🧪 Тест необработанной ошибки в пакете...")
+
+    from api_server import app
+    from src.features.api import clients as clients_api
+    from src.shared.auth.jwt_auth import create_token_response
+    from src.shared.database.connection import async_session_factory
+    from src.shared.database.models import User
+
+    calls = []
+
+    def failing_invalidate(user_id):
+        # Падает уже после commit() обработчика
+        calls.append(user_id)
+        if len(calls) == 1:
+            raise RuntimeError("сбой после commit()")
+
+    monkeypatch.setattr(clients_api, "invalidate_client_totals", failing_invalidate)
+
+    async def scenario():
+        async with async_session_factory() as session:
+            user = User(telegram_id=9010, username="batch-error", first_name="Мастер")
+            session.add(user)
+            await session.commit()
+            token = create_token_response(user.to_dict())["access_token"]
+
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Bearer {token}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as client:
+            batch = await client.post("/api/batch", json={"requests": [
+                {"method": "POST", "path": "/api/clients/", "body": {"first_name": "Дарья"}},
+                {"method": "POST", "path": "/api/clients/", "body": {"first_name": "Елена"}},
+            ]})
+            clients = (await client.get("/api/clients/")).json()["clients"]
+        return batch, clients
+
+    batch, clients = run_db(scenario)
+
+    assert batch.status_code == 200
+    assert batch.json()["committed"] is True
+    assert [item["status"] for item in batch.json()["responses"]] == [500, 200]
+    assert [item["first_name"] for item in clients] == ["Елена"]
+    print("✅ Ошибка подзапроса откатывает только его изменения")
+
+
+def test_batch_profile_edit_resets_user_cache(run_db, monkeypatch):
+    """Профиль, измененный в пакете, не остается в кэше пользователя старым"""
+    print("🧪 Тест кэша пользователя после пакета...")
+
+    from api_server import app
+    from src.features.api import batch as batch_api
+    from src.shared.auth.jwt_auth import cache_user, create_token_response
+    from src.shared.database.connection import async_session_factory, read_session_factory
+    from src.shared.database.models import User
+
+    dispatch = batch_api.dispatch
+    user_id = None
+
+    async def dispatch_with_concurrent_read(request, method, path, body):
+        result = await dispatch(request, method, path, body)
+        # Параллельный запрос до коммита пакета: читает старую строку и кэширует ее
+        async with read_session_factory() as session:
+            cache_user(await session.get(User, user_id))
+        return result
+
+    monkeypatch.setattr(batch_api, "dispatch", dispatch_with_concurrent_read)
+
+    async def scenario():
+        nonlocal user_id
+        async with async_session_factory() as session:
+            user = User(telegram_id=9011, username="batch-profile", first_name="Мастер", business_name="Старое")
+            session.add(user)
+            await session.commit()
+            user_id = user.id
+            token = create_token_response(user.to_dict())["access_token"]
+
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Bearer {token}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as client:
+            batch = await client.post("/api/batch", json={"requests": [
+                {"method": "PUT", "path": "/api/profiles/", "body": {"business_name": "Новое"}},
+            ]})
+            me = await client.get("/api/auth/me")
+        return batch.json(), me.json()
+
+    batch, me = run_db(scenario)
+
+    assert batch["committed"] is True and batch["responses"][0]["status"] == 200
+    assert me["user"]["business_name"] == "Новое"
+    print("✅ Кэш пользователя сбрасывается после коммита пакета")
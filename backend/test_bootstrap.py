@@ -0,0 +1,63 @@
+"""
+Тесты стартовых данных Mini App (/api/bootstrap)
+"""
+
+from datetime import date, datetime, time
+
+import httpx
+
+
+def test_bootstrap_collects_dashboard(run_db):
+    """Профиль, активные услуги, график и повестка на сегодня и завтра одним ответом"""
+    print("🧪 Тест стартовых данных...")
+
+    from api_server import app
+    from src.shared.auth.jwt_auth import create_token_response
+    from src.shared.database.connection import async_session_factory
+    from src.shared.database.models import (
+        Appointment, AppointmentStatus, Client, Service, User, WorkingDay, WorkingHours,
+    )
+
+    async def scenario():
+        async with async_session_factory() as session:
+            user = User(telegram_id=8008, username="dashboard", first_name="Мастер")
+            session.add(user)
+            await session.flush()
+            service = Service(user_id=user.id, name="Стрижка", price=1500, duration_minutes=60)
+            hidden = Service(user_id=user.id, name="Архив", price=500, duration_minutes=30, is_active=False)
+            client = Client(user_id=user.id, first_name="Анна")
+            session.add_all([service, hidden, client])
+            await session.flush()
+            session.add_all([
+                WorkingHours(user_id=user.id, day_of_week=0, start_time=time(9), end_time=time(18)),
+                WorkingDay(user_id=user.id, date=date(2030, 1, 1), is_working_day=False),
+                WorkingDay(user_id=user.id, date=date(2030, 1, 5), is_working_day=False),
+            ])
+            session.add_all(
+                Appointment(user_id=user.id, service_id=service.id, client_id=client.id, appointment_date=moment,
+                            duration_minutes=60, status=AppointmentStatus.CONFIRMED)
+                for moment in (datetime(2030, 1, 1, 23), datetime(2030, 1, 2, 10), datetime(2030, 1, 3, 0),
+                               datetime(2030, 1, 2, 9))
+            )
+            await session.commit()
+            token = create_token_response(user.to_dict())["access_token"]
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(
+                "/api/bootstrap", params={"today": "2030-01-02"}, headers={"Authorization": f"Bearer {token}"}
+            )
+        return user.id, response
+
+    user_id, response = run_db(scenario)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["profile"]["id"] == user_id
+    assert [service["name"] for service in data["services"]] == ["Стрижка"]
+    assert [hours["day_of_week"] for hours in data["working_hours"]] == [0]
+    assert [day["date"] for day in data["working_days"]] == ["2030-01-05"]
+    assert data["today"] == "2030-01-02"
+    assert [item["appointment_date"] for item in data["agenda"]["today"]] == ["2030-01-02T09:00:00", "2030-01-02T10:00:00"]
+    assert [item["appointment_date"] for item in data["agenda"]["tomorrow"]] == ["2030-01-03T00:00:00"]
+    assert data["agenda"]["today"][0]["service"]["name"] == "Стрижка"
+    print("✅ Стартовые данные собираются одним запросом")
@@ -0,0 +1,59 @@
+"""
+Тесты кэша total списка клиентов (LIST_TOTAL_CACHE_TTL): сброс после
+создания, изменения и удаления, в том числе через POST /api/batch
+"""
+
+import httpx
+
+
+def test_client_totals_invalidation(run_db, monkeypatch):
+    """total из кэша не отстает от изменений списка клиентов"""
+    print("🧪 Тест сброса кэша total клиентов...")
+
+    from api_server import app
+    from src.shared.auth.jwt_auth import create_token_response
+    from src.shared.database.connection import async_session_factory
+    from src.shared.database.models import User
+    from src.shared.utils.cache import list_totals
+
+    # Кэш включен, как с LIST_TOTAL_CACHE_TTL=60
+    monkeypatch.setattr(list_totals, "ttl", 60)
+    list_totals.clear()
+
+    async def scenario():
+        async with async_session_factory() as session:
+            user = User(telegram_id=4040, username="totals", first_name="Мастер")
+            session.add(user)
+            await session.commit()
+            token = create_token_response(user.to_dict())["access_token"]
+
+        totals = []
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Bearer {token}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as client:
+            async def total(**params):
+                response = await client.get("/api/clients/", params=params)
+                return response.json()["total"]
+
+            created = (await client.post("/api/clients/", json={"first_name": "Анна"})).json()
+            totals.append(await total())
+            totals.append(await total(search="Анна"))
+
+            await client.put(f"/api/clients/{created['id']}", json={"first_name": "Мария"})
+            totals.append(await total(search="Анна"))
+
+            await client.delete(f"/api/clients/{created['id']}")
+            totals.append(await total())
+
+            await client.post("/api/batch", json={"requests": [
+                {"method": "POST", "path": "/api/clients/", "body": {"first_name": "Борис"}},
+                {"method": "POST", "path": "/api/clients/", "body": {"first_name": "Вера"}},
+            ]})
+            totals.append(await total())
+        return totals
+
+    totals = run_db(scenario)
+    list_totals.clear()
+
+    assert totals == [1, 1, 0, 0, 2]
+    print("✅ total клиентов сбрасывается после каждого изменения")
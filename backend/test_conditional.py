@@ -0,0 +1,74 @@
+"""
+Тесты условных GET запросов: ETag, 304 и новая версия после изменения
+"""
+
+import httpx
+
+from src.shared.http.conditional import etag_matches, make_etag
+
+
+def test_etag_matching():
+    """If-None-Match сравнивается слабо, списком и через *"""
+    print("🧪 Тест сравнения ETag...")
+    etag = make_etag("services", 1, 2)
+    assert etag.startswith('W/"')
+    assert etag != make_etag("services", 1, 3)
+    assert etag_matches(etag, etag)
+    assert etag_matches(etag[2:], etag)
+    assert etag_matches(f'W/"other", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('W/"other"', etag)
+    print("✅ ETag сравнивается корректно")
+
+
+def test_services_not_modified(run_db):
+    """Повтор с ETag дает 304 без тела, изменение услуг - новый ETag"""
+    print("🧪 Тест 304 для списка услуг...")
+
+    from api_server import app
+    from src.shared.auth.jwt_auth import create_token_response
+    from src.shared.database.connection import async_session_factory
+    from src.shared.database.models import Service, User
+
+    async def scenario():
+        async with async_session_factory() as session:
+            user = User(telegram_id=6006, username="etag", first_name="Мастер", booking_slug="etag")
+            session.add(user)
+            await session.flush()
+            session.add(Service(user_id=user.id, name="Стрижка", price=1500, duration_minutes=60))
+            await session.commit()
+            token = create_token_response(user.to_dict())["access_token"]
+
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Bearer {token}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as client:
+            responses = {}
+            for path in ("/api/services/", "/api/schedule", "/api/profiles/", "/api/booking/etag/services"):
+                first = await client.get(path)
+                repeat = await client.get(path, headers={"If-None-Match": first.headers["etag"]})
+                responses[path] = (first, repeat)
+
+            created = await client.post("/api/services/", json={"name": "Маникюр", "price": 2000, "duration_minutes": 90})
+            first, _ = responses["/api/services/"]
+            changed = await client.get("/api/services/", headers={"If-None-Match": first.headers["etag"]})
+            public_first, _ = responses["/api/booking/etag/services"]
+            public_changed = await client.get(
+                "/api/booking/etag/services", headers={"If-None-Match": public_first.headers["etag"]}
+            )
+        return responses, created, changed, public_changed
+
+    responses, created, changed, public_changed = run_db(scenario)
+    for path, (first, repeat) in responses.items():
+        assert first.status_code == 200, path
+        assert repeat.status_code == 304, path
+        assert repeat.content == b""
+        assert repeat.headers["etag"] == first.headers["etag"]
+
+    assert created.status_code == 200, created.text
+    assert changed.status_code == 200
+    assert len(changed.json()["services"]) == 2
+    assert changed.headers["etag"] != responses["/api/services/"][0].headers["etag"]
+    assert public_changed.status_code == 200
+    assert len(public_changed.json()["services"]) == 2
+    print("✅ 304 отдается, пока данные не изменились")
@@ -0,0 +1,413 @@
+"""
+Тесты диалект-специфичных запросов (upsert, пересечения записей)
+очереди записи с групповым коммитом и инициализации схемы
+Выполняются на SQLite или на PostgreSQL (см. TEST_DATABASE_URL в conftest.py)
+"""
+
+import asyncio
+from datetime import date, datetime, time
+
+import pytest
+
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.orm import joinedload
+
+from src.shared.database.connection import async_session_factory, backend, engine, init_database
+from src.shared.database.migrations import SCHEMA_REVISION, get_current_revision, get_head_revision
+from src.shared.database.models import Base
+from src.shared.database.write_queue import WriteCoordinator
+from src.shared.database.models import User, Service, Client, Appointment, WorkingDay, AppointmentStatus
+from src.shared.utils.appointment_utils import check_appointment_overlap, appointment_date_range
+from src.shared.utils.pagination import KeysetPaginator
+
+
+async def _create_master(session) -> User:
+    """Создает мастера с одной услугой и одним клиентом"""
+    user = User(telegram_id=1001, username="master", first_name="Мастер")
+    session.add(user)
+    await session.flush()
+    session.add_all([
+        Service(id=1, user_id=user.id, name="Стрижка", price=1000, duration_minutes=60),
+        Client(id=1, user_id=user.id, first_name="Клиент"),
+    ])
+    await session.flush()
+    return user
+
+
+def test_working_day_upsert(run_db):
+    """Повторный upsert той же даты обновляет строку, а не создает новую"""
+    print(f"🧪 Тест upsert рабочих дней ({backend.name})...")
+
+    async def scenario():
+        async with async_session_factory() as session:
+            user = await _create_master(session)
+            rows = [
+                {"user_id": user.id, "date": date(2026, 1, 10), "is_working_day": True,
+                 "start_time": time(9), "end_time": time(18)},
+                {"user_id": user.id, "date": date(2026, 1, 11), "is_working_day": False},
+            ]
+            update_columns = ["is_working_day", "start_time", "end_time"]
+            await session.execute(backend.upsert(WorkingDay, rows, ["user_id", "date"], update_columns))
+
+            rows[0]["start_time"] = time(12)
+            await session.execute(backend.upsert(WorkingDay, rows[:1], ["user_id", "date"], update_columns))
+            await session.commit()
+
+            result = await session.execute(select(WorkingDay).order_by(WorkingDay.date))
+            return result.scalars().all()
+
+    days = run_db(scenario)
+
+    assert len(days) == 2, f"Ожидалось 2 дня, получено {len(days)}"
+    assert days[0].start_time == time(12), f"Ожидалось 12:00, получено {days[0].start_time}"
+    print("✅ Upsert обновил существующий день")
+
+
+def test_appointment_overlap(run_db):
+    """Пересечения ищутся по полуинтервалам, касание границ допускается"""
+    print(f"🧪 Тест пересечения записей ({backend.name})...")
+
+    async def scenario():
+        async with async_session_factory() as session:
+            user = await _create_master(session)
+            session.add(Appointment(
+                user_id=user.id, service_id=1, client_id=1,
+                appointment_date=datetime(2026, 1, 10, 10, 0), duration_minutes=60,
+                status=AppointmentStatus.CONFIRMED
+            ))
+            await session.commit()
+
+            checks = {}
+            for label, start, duration in (
+                ("внутри", datetime(2026, 1, 10, 10, 30), 60),
+                ("касание после", datetime(2026, 1, 10, 11, 0), 30),
+                ("касание до", datetime(2026, 1, 10, 9, 0), 60),
+                ("захват начала", datetime(2026, 1, 10, 9, 30), 60),
+                ("охватывает", datetime(2026, 1, 10, 9, 0), 180),
+            ):
+                overlapping = await check_appointment_overlap(session, user.id, start, duration)
+                checks[label] = overlapping is not None
+            return checks
+
+    checks = run_db(scenario)
+
+    expected = {
+        "внутри": True,
+        "касание после": False,
+        "касание до": False,
+        "захват начала": True,
+        "охватывает": True,
+    }
+    assert checks == expected, f"Ожидалось {expected}, получено {checks}"
+    print(f"✅ Результат: {checks}")
+
+
+def test_appointment_ends_at(run_db):
+    """ends_at пересчитывается при изменении начала или продолжительности"""
+    print(f"🧪 Тест хранимого окончания записи ({backend.name})...")
+
+    async def scenario():
+        async with async_session_factory() as session:
+            user = await _create_master(session)
+            appointment = Appointment(
+                user_id=user.id, service_id=1, client_id=1,
+                appointment_date=datetime(2026, 1, 10, 10, 0), duration_minutes=60
+            )
+            session.add(appointment)
+            await session.commit()
+            created_end = appointment.ends_at
+
+            appointment.duration_minutes = 90
+            await session.commit()
+            return created_end, appointment.ends_at
+
+    created_end, updated_end = run_db(scenario)
+
+    assert created_end == datetime(2026, 1, 10, 11, 0), f"Ожидалось 11:00, получено {created_end}"
+    assert updated_end == datetime(2026, 1, 10, 11, 30), f"Ожидалось 11:30, получено {updated_end}"
+    print(f"✅ Окончание записи: {created_end} -> {updated_end}")
+
+
+def test_appointment_date_filters_use_indexes(run_db):
+    """Фильтры по датам в списке записей и доступности идут по индексам"""
+    if backend.name != "sqlite":
+        pytest.skip("EXPLAIN QUERY PLAN проверяется на SQLite")
+    print("🧪 Тест использования индексов фильтрами по датам...")
+
+    period = appointment_date_range(date(2026, 1, 1), date(2026, 1, 31))
+    active = [AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED]
+    queries = {
+        # GET /api/appointments/?date_from=...&date_to=...
+        "INDEX ix_appointments_user_date": select(Appointment).options(
+            joinedload(Appointment.service), joinedload(Appointment.client)
+        ).where(Appointment.user_id == 1, *period).order_by(Appointment.appointment_date.desc()).limit(50),
+        # Подсчет total для того же списка
+        "COVERING INDEX ix_appointments_user_date": select(func.count(Appointment.id)).where(
+            Appointment.user_id == 1, *period
+        ),
+        # GET /api/schedule/availability
+        "INDEX ix_appointments_user_status_period": select(Appointment).where(
+            Appointment.user_id == 1, Appointment.status.in_(active),
+            *appointment_date_range(date(2026, 1, 10), date(2026, 1, 10))
+        ),
+    }
+
+    async def scenario():
+        plans = {}
+        async with engine.connect() as conn:
+            for index_name, query in queries.items():
+                sql = query.compile(engine.sync_engine, compile_kwargs={"literal_binds": True})
+                rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")).all()
+                plans[index_name] = [row[-1] for row in rows]
+        return plans
+
+    plans = run_db(scenario)
+
+    for index_name, plan in plans.items():
+        appointments_step = next(step for step in plan if " appointments " in f"{step} ")
+        assert f"USING {index_name} (" in appointments_step and "appointment_date>" in appointments_step, (
+            f"Ожидался {index_name} с диапазоном appointment_date, план: {plan}"
+        )
+        print(f"✅ {appointments_step}")
+
+
+def test_keyset_pagination(run_db):
+    """Курсоры проходят список вперед и назад без пропусков на одинаковых датах"""
+    print(f"🧪 Тест курсорной пагинации ({backend.name})...")
+
+    async def scenario():
+        async with async_session_factory() as session:
+            user = await _create_master(session)
+            # Три клиента с одинаковым created_at - порядок решает id
+            for day in (1, 2, 2, 2, 3, 4, 5):
+                session.add(Client(user_id=user.id, first_name=f"c{day}", created_at=datetime(2026, 1, day)))
+            await session.commit()
+
+            async def page(cursor):
+                paginator = KeysetPaginator(Client.created_at, Client.id, cursor, limit=3)
+                query = select(Client).where(Client.user_id == user.id)
+                result = await session.execute(paginator.apply(query))
+                rows, next_cursor, prev_cursor = paginator.paginate(result.scalars().all())
+                return [row.id for row in rows], next_cursor, prev_cursor
+
+            forward, cursor, prev_cursor = [], None, None
+            while True:
+                ids, cursor, prev_cursor = await page(cursor)
+                forward.append(ids)
+                if cursor is None:
+                    break
+
+            backward = []
+            while prev_cursor is not None:
+                ids, _, prev_cursor = await page(prev_cursor)
+                backward.append(ids)
+
+            result = await session.execute(
+                select(Client.id).where(Client.user_id == user.id).order_by(Client.created_at.desc(), Client.id.desc())
+            )
+            return forward, backward, list(result.scalars().all())
+
+    forward, backward, expected = run_db(scenario)
+
+    assert [row_id for ids in forward for row_id in ids] == expected, f"Вперед: {forward}, ожидалось {expected}"
+    assert backward == forward[-2::-1], f"Назад: {backward}, ожидалось {forward[-2::-1]}"
+    print(f"✅ Страницы: {forward}")
+
+
+def test_write_queue_savepoints(run_db):
+    """Ошибка одной единицы работы откатывает только ее SAVEPOINT"""
+    print(f"🧪 Тест очереди записи ({backend.name})...")
+
+    async def scenario():
+        async with async_session_factory() as session:
+            user = await _create_master(session)
+            await session.commit()
+            user_id = user.id
+
+        coordinator = WriteCoordinator(async_session_factory, max_batch_size=16)
+
+        def make_unit(hour: int, fail: bool = False):
+            async def unit(session):
+                session.add(Appointment(
+                    user_id=user_id, service_id=1, client_id=1,
+                    appointment_date=datetime(2026, 1, 10, hour, 0), duration_minutes=60
+                ))
+                await session.flush()
+                if fail:
+                    raise ValueError("отклонено")
+                return hour
+            return unit
+
+        results = await asyncio.gather(
+            *(coordinator.submit(make_unit(hour, fail=hour == 11)) for hour in range(9, 14)),
+            return_exceptions=True
+        )
+        await coordinator.stop()
+
+        async with async_session_factory() as session:
+            result = await session.execute(select(Appointment.appointment_date).order_by(Appointment.appointment_date))
+            hours = [moment.hour for moment in result.scalars().all()]
+        return results, hours, coordinator
+
+    results, hours, coordinator = run_db(scenario)
+
+    assert isinstance(results[2], ValueError), f"Ожидалась ошибка, получено {results[2]}"
+    assert hours == [9, 10, 12, 13], f"Ожидались часы [9, 10, 12, 13], получено {hours}"
+    assert coordinator.batches_committed < 5, "Единицы работы не объединились в пачку"
+    print(f"✅ Сохранено {hours}, пачек: {coordinator.batches_committed}")
+
+
+def test_write_queue_rejects_writer_session(run_db):
+    """Обработчик с get_session() не может ждать очередь записи - она ждала бы его соединение"""
+    print("🧪 Тест запрета очереди записи из get_session()...")
+
+    from src.shared.database.connection import get_session
+
+    async def scenario():
+        coordinator = WriteCoordinator(async_session_factory)
+
+        async def unit(session):
+            return 1
+
+        dependency = get_session()
+        await dependency.__anext__()
+        try:
+            with pytest.raises(RuntimeError):
+                await coordinator.submit(unit)
+            # Вложенная зависимость при выходе не снимает флаг внешней
+            nested = get_session()
+            await nested.__anext__()
+            await nested.aclose()
+            with pytest.raises(RuntimeError):
+                await coordinator.submit(unit)
+        finally:
+            await dependency.aclose()
+        # После выхода из get_session() очередь снова доступна
+        result = await coordinator.submit(unit)
+        await coordinator.stop()
+        return result
+
+    assert run_db(scenario) == 1
+    print("✅ Вызов очереди из get_session() отклоняется")
+
+
+def test_read_write_session_split(run_db):
+    """get_read_session() берет соединение из пула читателей, который не может писать"""
+    print("🧪 Тест разделения читающих и пишущих сессий...")
+
+    from sqlalchemy.exc import DBAPIError
+    from src.shared.database.connection import get_read_session, get_session, read_engine
+
+    async def scenario():
+        writer = get_session()
+        session = await writer.__anext__()
+        session.add(User(telegram_id=5005, username="split", first_name="Мастер"))
+        with pytest.raises(StopAsyncIteration):
+            await writer.__anext__()
+
+        reader = get_read_session()
+        read_session = await reader.__anext__()
+        try:
+            # Читатель видит закоммиченное писателем
+            count = await read_session.scalar(select(func.count()).select_from(User))
+            read_bind = read_session.get_bind()
+            rejected = False
+            if read_engine is not engine:
+                try:
+                    await read_session.execute(text("DELETE FROM users"))
+                except DBAPIError:
+                    rejected = True
+            else:
+                rejected = True  # Без отдельного пула читателей проверять нечего
+        finally:
+            await reader.aclose()
+        return count, read_bind, rejected
+
+    count, read_bind, rejected = run_db(scenario)
+
+    assert count == 1
+    assert read_bind is read_engine.sync_engine
+    assert rejected
+    print("✅ Чтение идет через пул читателей, запись в нем запрещена")
+
+
+def test_get_session_commits_only_writes(run_db):
+    """get_session() коммитит только если обработчик писал - в том числе через execute()"""
+    print("🧪 Тест коммита get_session() только при записи...")
+
+    from sqlalchemy import event, update
+    from src.shared.database.connection import get_session
+
+    async def handler(work):
+        dependency = get_session()
+        session = await dependency.__anext__()
+        await work(session)
+        with pytest.raises(StopAsyncIteration):
+            await dependency.__anext__()
+
+    async def scenario():
+        commits = []
+        listener = lambda connection: commits.append(1)
+        event.listen(engine.sync_engine, "commit", listener)
+        try:
+            async def read(session):
+                await session.execute(select(User))
+
+            async def add(session):
+                session.add(User(telegram_id=5006, username="writer", first_name="Мастер"))
+
+            async def bulk_update(session):
+                await session.execute(update(User).values(first_name="Мастерица"))
+
+            counts = []
+            for work in (read, add, bulk_update):
+                commits.clear()
+                await handler(work)
+                counts.append(len(commits))
+        finally:
+            event.remove(engine.sync_engine, "commit", listener)
+
+        async with async_session_factory() as session:
+            name = await session.scalar(select(User.first_name))
+        return counts, name
+
+    counts, name = run_db(scenario)
+
+    assert counts == [0, 1, 1]
+    assert name == "Мастерица"
+    print("✅ Сессия без записи не коммитится")
+
+
+def test_schema_revision():
+    """SCHEMA_REVISION совпадает с последней миграцией в alembic/versions"""
+    print("🧪 Тест ревизии схемы...")
+    head = get_head_revision()
+    assert SCHEMA_REVISION == head, f"SCHEMA_REVISION={SCHEMA_REVISION}, последняя миграция {head}"
+    print(f"✅ Ревизия схемы: {head}")
+
+
+def test_init_database_bootstrap(run_db):
+    """Пустая база получает схему и ревизию, повторный старт ничего не меняет"""
+    print(f"🧪 Тест инициализации схемы ({backend.name})...")
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+
+        await init_database()
+        await init_database()
+
+        async with engine.connect() as conn:
+            revision = await conn.run_sync(get_current_revision)
+            tables = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
+
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP TABLE alembic_version"))
+        return revision, set(tables)
+
+    revision, tables = run_db(scenario)
+
+    assert revision == SCHEMA_REVISION, f"Ожидалась ревизия {SCHEMA_REVISION}, получено {revision}"
+    assert set(Base.metadata.tables) <= tables, f"Не созданы таблицы: {set(Base.metadata.tables) - tables}"
+    print(f"✅ Схема создана, ревизия {revision}")
@@ -0,0 +1,71 @@
+"""
+Тесты потоковой выгрузки записей и клиентов (CSV и NDJSON)
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+
+import httpx
+
+
+def test_export_appointments_and_clients(run_db, monkeypatch):
+    """Выгрузка частями: фильтр по датам, оба формата, все строки по порядку"""
+    print("🧪 Тест потоковой выгрузки...")
+
+    from api_server import app
+    from src.features.api import exports
+    from src.shared.auth.jwt_auth import create_token_response
+    from src.shared.database.connection import async_session_factory
+    from src.shared.database.models import Appointment, AppointmentStatus, Client, Service, User
+
+    # Несколько частей курсора на небольшом наборе
+    monkeypatch.setattr(exports, "YIELD_PER", 2)
+
+    async def scenario():
+        async with async_session_factory() as session:
+            user = User(telegram_id=1010, username="export", first_name="Мастер")
+            session.add(user)
+            await session.flush()
+            service = Service(user_id=user.id, name="Стрижка", price=1500, duration_minutes=60)
+            client = Client(user_id=user.id, first_name="Анна", phone="+7 999 000-00-01", notes="=1+1")
+            session.add_all([service, client])
+            await session.flush()
+            session.add_all(
+                Appointment(user_id=user.id, service_id=service.id, client_id=client.id,
+                            appointment_date=datetime(2030, 1, day, 10), duration_minutes=60,
+                            status=AppointmentStatus.CONFIRMED, price=1500.0)
+                for day in range(1, 8)
+            )
+            await session.commit()
+            token = create_token_response(user.to_dict())["access_token"]
+
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Bearer {token}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as client:
+            csv_response = await client.get("/api/export/appointments", params={"date_from": "2030-01-02", "date_to": "2030-01-06"})
+            ndjson_response = await client.get("/api/export/appointments", params={"format": "ndjson"})
+            clients_response = await client.get("/api/export/clients")
+            invalid = await client.get("/api/export/clients", params={"format": "xml"})
+        return csv_response, ndjson_response, clients_response, invalid
+
+    csv_response, ndjson_response, clients_response, invalid = run_db(scenario)
+
+    assert csv_response.status_code == 200
+    assert csv_response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in csv_response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(csv_response.content.decode("utf-8-sig"))))
+    assert [row["appointment_date"] for row in rows] == [f"2030-01-0{day}T10:00:00" for day in range(2, 7)]
+    assert rows[0]["service"] == "Стрижка" and rows[0]["status"] == "confirmed"
+
+    lines = [json.loads(line) for line in ndjson_response.text.splitlines()]
+    assert len(lines) == 7
+    assert lines[0]["client_first_name"] == "Анна" and lines[0]["status"] == "confirmed"
+
+    clients = list(csv.DictReader(io.StringIO(clients_response.content.decode("utf-8-sig"))))
+    assert clients[0]["phone"] == "+7 999 000-00-01"
+    assert clients[0]["notes"] == "'=1+1"
+
+    assert invalid.status_code == 400
+    print("✅ Выгрузка отдает все строки в CSV и NDJSON")
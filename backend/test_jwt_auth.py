@@ -0,0 +1,202 @@
+"""
+Тесты JWT аутентификации: токен несет данные пользователя,
+повторные запросы проверяются по кэшу без обращения к БД
+"""
+
+import asyncio
+from datetime import timedelta
+
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event, update
+
+from src.shared.auth.jwt_auth import create_token_response, get_current_user, get_current_user_model, jwt_auth
+from src.shared.database.connection import async_session_factory, engine, read_engine, read_session_factory
+from src.shared.database.models import User
+from src.shared.utils.cache import users as user_cache, invalidate_user
+
+
+def test_current_user_cache(run_db):
+    """Кэш пользователя: попадание без SELECT, сброс по версии из токена"""
+    print("🧪 Тест кэша пользователя в get_current_user...")
+
+    async def authenticate(token: str):
+        """Один запрос: get_current_user + get_current_user_model на общей сессии"""
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+        async with read_session_factory() as session:
+            user_dict = await get_current_user(None, credentials, session)
+            user = await get_current_user_model(user_dict, session)
+            return user_dict, user
+
+    async def scenario():
+        user_cache.clear()
+        statements = []
+
+        def count_select(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append(statement)
+
+        async with async_session_factory() as session:
+            user = User(telegram_id=2002, username="cached", first_name="Мастер")
+            session.add(user)
+            await session.commit()
+            tokens = create_token_response(user.to_dict())
+
+        for target in {engine.sync_engine, read_engine.sync_engine}:
+            event.listen(target, "before_cursor_execute", count_select)
+        try:
+            await authenticate(tokens["access_token"])
+            cold = len(statements)
+
+            statements.clear()
+            user_dict, cached_user = await authenticate(tokens["access_token"])
+            warm = len(statements)
+
+            # Объект из кэша можно перенести в пишущую сессию без SELECT
+            async with async_session_factory() as session:
+                merged = await session.merge(cached_user, load=False)
+                merged.phone = "+79990000000"
+                merged.version = User.version + 1
+                await session.commit()
+            merge_selects = len(statements) - warm
+
+            # Профиль изменился в другом процессе: токен с новой версией не
+            # принимает устаревшую запись кэша
+            async with async_session_factory() as session:
+                await session.execute(update(User).values(business_name="Студия", version=User.version + 1))
+                await session.commit()
+            claims = jwt_auth.decode_token(tokens["access_token"])
+            fresh_token = jwt_auth.create_access_token({
+                "sub": claims["sub"], "telegram_id": claims["telegram_id"], "ver": 3
+            })
+            statements.clear()
+            fresh_dict, _ = await authenticate(fresh_token)
+            reloaded = len(statements)
+        finally:
+            for target in {engine.sync_engine, read_engine.sync_engine}:
+                event.remove(target, "before_cursor_execute", count_select)
+            invalidate_user(user.id)
+
+        return tokens, cold, warm, merge_selects, user_dict, cached_user, reloaded, fresh_dict
+
+    tokens, cold, warm, merge_selects, user_dict, cached_user, reloaded, fresh_dict = run_db(scenario)
+
+    claims = jwt_auth.decode_token(tokens["access_token"])
+    assert claims["telegram_id"] == 2002
+    assert claims["ver"] == 1
+
+    assert cold == 1
+    assert warm == 0, "Повторный запрос с тем же токеном не должен обращаться к БД"
+    assert merge_selects == 0
+    assert user_dict["username"] == "cached"
+    assert user_dict["token_source"] == "header"
+    assert cached_user.telegram_id == 2002
+
+    assert reloaded == 1
+    assert fresh_dict["version"] == 3
+    assert fresh_dict["business_name"] == "Студия"
+    print("✅ Кэш пользователя работает")
+
+
+def test_refresh_token_rotation(run_db):
+    """Ротация refresh токенов: повторное предъявление отзывает семейство, выход - тоже"""
+    print("🧪 Тест ротации refresh токенов...")
+
+    import httpx
+    from api_server import app
+    from src.shared.auth.jwt_auth import issue_tokens
+    from src.shared.auth.refresh_tokens import revoked_families, load_revoked_families, REFRESH_REUSE_GRACE_SECONDS
+    from src.shared.database.models import RefreshToken
+
+    async def scenario():
+        revoked_families.clear()
+        async with async_session_factory() as session:
+            user = User(telegram_id=3003, username="rotating", first_name="Мастер")
+            session.add(user)
+            await session.flush()
+            first = await issue_tokens(session, user.to_dict())
+            other = await issue_tokens(session, user.to_dict())
+            await session.commit()
+
+        statuses = {}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def refresh(token):
+                return await client.post("/api/auth/refresh", json={"refresh_token": token})
+
+            rotated = await refresh(first["refresh_token"])
+            statuses["rotated"] = rotated.status_code
+            second = rotated.json()
+            # Повтор после окна параллельных запросов - кража
+            async with async_session_factory() as session:
+                await session.execute(
+                    update(RefreshToken)
+                    .where(RefreshToken.jti == jwt_auth.decode_token(first["refresh_token"])["jti"])
+                    .values(used_at=RefreshToken.used_at - timedelta(seconds=REFRESH_REUSE_GRACE_SECONDS + 1))
+                )
+                await session.commit()
+            statuses["reuse"] = (await refresh(first["refresh_token"])).status_code
+            statuses["after_reuse"] = (await refresh(second["refresh_token"])).status_code
+            statuses["access_after_reuse"] = (await client.get(
+                "/api/auth/me", headers={"Authorization": f"Bearer {second['access_token']}"}
+            )).status_code
+
+            statuses["logout"] = (await client.post("/api/auth/logout", json={"refresh_token": other["refresh_token"]})).status_code
+            statuses["after_logout"] = (await refresh(other["refresh_token"])).status_code
+
+        # Индекс восстанавливается из таблицы после перезапуска
+        revoked_families.clear()
+        async with async_session_factory() as session:
+            restored = await load_revoked_families(session)
+        statuses["restored"] = restored
+        statuses["revoked_after_restart"] = revoked_families.is_revoked(jwt_auth.decode_token(second["access_token"])["fam"])
+        return statuses
+
+    statuses = run_db(scenario)
+
+    assert statuses["rotated"] == 200
+    assert statuses["reuse"] == 401
+    assert statuses["after_reuse"] == 401
+    assert statuses["access_after_reuse"] == 401
+    assert statuses["logout"] == 200
+    assert statuses["after_logout"] == 401
+    assert statuses["restored"] == 2
+    assert statuses["revoked_after_restart"] is True
+    print("✅ Ротация refresh токенов работает")
+
+
+def test_concurrent_refresh(run_db):
+    """Два параллельных обновления одним токеном: оба получают текущий токен, семейство живо"""
+    print("🧪 Тест параллельного обновления токенов...")
+
+    import httpx
+    from api_server import app
+    from src.shared.auth.jwt_auth import issue_tokens
+    from src.shared.auth.refresh_tokens import revoked_families
+
+    async def scenario():
+        revoked_families.clear()
+        async with async_session_factory() as session:
+            user = User(telegram_id=3004, username="parallel", first_name="Мастер")
+            session.add(user)
+            await session.flush()
+            tokens = await issue_tokens(session, user.to_dict())
+            await session.commit()
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def refresh(token):
+                return await client.post("/api/auth/refresh", json={"refresh_token": token})
+
+            # Несколько запросов клиента получили 401 одновременно
+            responses = await asyncio.gather(*(refresh(tokens["refresh_token"]) for _ in range(2)))
+            next_refresh = await refresh(responses[1].json()["refresh_token"])
+        return responses, next_refresh
+
+    responses, next_refresh = run_db(scenario)
+
+    assert [response.status_code for response in responses] == [200, 200]
+    jtis = {jwt_auth.decode_token(response.json()["refresh_token"])["jti"] for response in responses}
+    assert len(jtis) == 1
+    assert not revoked_families.is_revoked(jwt_auth.decode_token(responses[0].json()["access_token"])["fam"])
+    assert next_refresh.status_code == 200
+    print("✅ Параллельное обновление не отзывает сессию")
@@ -0,0 +1,203 @@
+"""
+Тесты логирования: очередь вывода, контекст запроса в JSON, сжатие ротированных файлов,
+выборка записей горячих путей
+"""
+
+import logging
+import queue
+
+from src.shared.logger.pipeline import DroppingQueueHandler, start_queue_logging, stop_queue_logging
+
+
+def _record(level: int, msg: str, *args) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 0, msg, args, None)
+
+
+def test_queue_overflow_drops_and_reports():
+    """INFO сверх размера очереди отбрасывается и учитывается, потом - сообщение о потере"""
+    print("🧪 Тест переполнения очереди логов...")
+    log_queue = queue.Queue(maxsize=2)
+    handler = DroppingQueueHandler(log_queue)
+
+    for i in range(5):
+        handler.handle(_record(logging.INFO, "запись %s", i))
+    assert handler.dropped["INFO"] == 3
+    assert log_queue.get_nowait().msg == "запись 0"
+
+    # Место освободилось: следующая запись и отчет о трех потерянных
+    log_queue.get_nowait()
+    handler.handle(_record(logging.INFO, "после перегрузки"))
+    assert log_queue.get_nowait().msg == "после перегрузки"
+    report = log_queue.get_nowait()
+    assert report.levelno == logging.WARNING
+    assert "отброшено 3 записей" in report.getMessage()
+    print("✅ Переполнение очереди учитывается")
+
+
+def test_stop_flushes_queue():
+    """Остановка дописывает все записи из очереди и возвращает синхронные handlers"""
+    print("🧪 Тест дозаписи очереди при остановке...")
+
+    class Collect(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.messages = []
+
+        def emit(self, record):
+            self.messages.append(record.getMessage())
+
+    root_logger = logging.getLogger()
+    saved_handlers, saved_level = list(root_logger.handlers), root_logger.level
+    collect = Collect()
+    root_logger.handlers[:] = [collect]
+    root_logger.setLevel(logging.INFO)
+    try:
+        start_queue_logging(root_logger, 1000)
+        assert root_logger.handlers != [collect]
+        for i in range(500):
+            logging.getLogger("test").info("запись %s", i)
+        stop_queue_logging()
+
+        assert root_logger.handlers == [collect]
+        assert collect.messages == [f"запись {i}" for i in range(500)]
+    finally:
+        stop_queue_logging()
+        root_logger.handlers[:] = saved_handlers
+        root_logger.setLevel(saved_level)
+    print("✅ Очередь дописывается при остановке")
+
+
+def test_json_log_carries_request_context(run_db):
+    """Запись из обработчика запроса несет request_id, маршрут и пользователя"""
+    print("🧪 Тест контекста запроса в JSON логах...")
+
+    import json
+    import httpx
+    from api_server import app
+    from src.shared.auth.jwt_auth import create_token_response
+    from src.shared.database.connection import async_session_factory
+    from src.shared.database.models import User
+    from src.shared.logger.formatters import JsonFormatter
+
+    class Collect(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.lines = []
+
+        def emit(self, record):
+            self.lines.append(json.loads(self.format(record)))
+
+    collect = Collect()
+    collect.setFormatter(JsonFormatter())
+    clients_logger = logging.getLogger("src.features.api.clients")
+    clients_logger.addHandler(collect)
+
+    async def scenario():
+        async with async_session_factory() as session:
+            user = User(telegram_id=4004, username="logged", first_name="Мастер")
+            session.add(user)
+            await session.commit()
+            token = create_token_response(user.to_dict())["access_token"]
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(
+                "/api/clients/", headers={"Authorization": f"Bearer {token}", "X-Request-ID": "req-42"}
+            )
+        return user.id, response
+
+    try:
+        user_id, response = run_db(scenario)
+    finally:
+        clients_logger.removeHandler(collect)
+
+    assert response.status_code == 200
+    assert response.headers["x-request-id"] == "req-42"
+    entry = collect.lines[0]
+    assert entry["request_id"] == "req-42"
+    assert entry["route"] == "GET /api/clients/"
+    assert entry["user_id"] == user_id
+    assert entry["duration_ms"] >= 0
+    print("✅ Контекст запроса попадает в JSON логи")
+
+
+def test_rotated_files_are_compressed(tmp_path):
+    """Ротированные файлы сжимаются gzip и сдвигаются по номерам"""
+    print("🧪 Тест сжатия ротированных логов...")
+
+    import gzip
+    from src.shared.logger.rotation import CompressingRotatingFileHandler
+
+    log_file = tmp_path / "api.log"
+    handler = CompressingRotatingFileHandler(log_file, maxBytes=200, backupCount=2, encoding="utf-8")
+    for i in range(12):
+        handler.emit(_record(logging.INFO, "строка %s " + "x" * 40, i))
+    handler.close()
+
+    names = sorted(path.name for path in tmp_path.iterdir())
+    assert names == ["api.log", "api.log.1.gz", "api.log.2.gz"]
+    with gzip.open(tmp_path / "api.log.1.gz", "rt", encoding="utf-8") as packed:
+        assert "строка" in packed.read()
+    print("✅ Ротированные логи сжимаются")
+
+
+def test_rotation_keeps_files_when_compression_fails(tmp_path, monkeypatch):
+    """Если gzip не сработал, несжатые файлы остаются и не перезаписываются следующей ротацией"""
+    print("🧪 Тест ротации логов при ошибке сжатия...")
+
+    from src.shared.logger import rotation
+
+    def broken_gzip(*args, **kwargs):
+        raise OSError("диск заполнен")
+
+    monkeypatch.setattr(rotation.gzip, "open", broken_gzip)
+
+    log_file = tmp_path / "api.log"
+    handler = rotation.CompressingRotatingFileHandler(log_file, maxBytes=200, backupCount=2, encoding="utf-8")
+    for i in range(12):
+        handler.emit(_record(logging.INFO, "строка %s " + "x" * 40, i))
+    handler.close()
+
+    kept = [path for path in tmp_path.iterdir() if path.name.startswith("api.log.1.")]
+    assert len(kept) >= 2
+    assert not [path for path in tmp_path.iterdir() if path.name.endswith((".gz", ".tmp"))]
+    lines = "".join(path.read_text(encoding="utf-8") for path in tmp_path.iterdir())
+    assert all(f"строка {i} " in lines for i in range(12))
+    print("✅ При ошибке сжатия логи не теряются")
+
+
+def test_sampling_filter_rates(monkeypatch):
+    """Доля INFO по самому длинному префиксу, WARNING всегда, одно решение на запись"""
+    print("🧪 Тест выборочного логирования...")
+
+    import random
+    import pytest
+    from src.shared.logger.sampling import SamplingFilter, parse_sample_rates
+
+    rates = parse_sample_rates("src.features.api=0.5, src.features.api.clients=0.1,src.other=7")
+    assert rates == {"src.features.api": 0.5, "src.features.api.clients": 0.1, "src.other": 1.0}
+    with pytest.raises(ValueError):
+        parse_sample_rates("src.features.api")
+
+    sampling = SamplingFilter(rates)
+    assert sampling.rate_for("src.features.api.clients") == 0.1
+    assert sampling.rate_for("src.features.api.services") == 0.5
+    assert sampling.rate_for("src.features.apix") == 1.0
+
+    def record(name: str, level: int = logging.INFO) -> logging.LogRecord:
+        return logging.LogRecord(name, level, __file__, 0, "msg", (), None)
+
+    # Доля пропущенных записей близка к заданной
+    random.seed(15)
+    passed = sum(sampling.filter(record("src.features.api.clients")) for _ in range(10000))
+    assert 800 < passed < 1200
+
+    monkeypatch.setattr(random, "random", lambda: 0.99)
+    assert sampling.filter(record("src.features.api.clients", logging.WARNING))
+    assert sampling.filter(record("src.shared.auth"))
+
+    # Второй обработчик получает то же решение, что и первый
+    dropped = record("src.features.api.clients")
+    assert not sampling.filter(dropped)
+    monkeypatch.setattr(random, "random", lambda: 0.0)
+    assert not SamplingFilter(rates).filter(dropped)
+    print("✅ Выборка логов соблюдает доли")
@@ -0,0 +1,138 @@
+"""
+Тесты сериализаторов моделей: тот же JSON, что и у to_dict()
+"""
+
+import json
+from datetime import date, datetime, time
+
+import orjson
+
+from src.shared.database.connection import async_session_factory
+from src.shared.database.models import Appointment, AppointmentStatus, Client, Service, User, WorkingDay, WorkingHours
+from src.shared.database.serializers import (
+    appointment_serializer, client_serializer, service_serializer, user_serializer,
+    working_day_serializer, working_hours_serializer,
+)
+
+
+def test_serializers_match_to_dict(run_db):
+    """Скомпилированные сериализаторы дают те же данные, что to_dict() + json"""
+    print("🧪 Тест сериализаторов моделей...")
+
+    async def scenario():
+        async with async_session_factory() as session:
+            user = User(telegram_id=5005, username="serial", first_name="Мастер", booking_slug="serial")
+            session.add(user)
+            await session.flush()
+            service = Service(user_id=user.id, name="Стрижка", price=1500.5, duration_minutes=45)
+            client = Client(user_id=user.id, first_name="Анна", phone=None)
+            session.add_all([service, client])
+            await session.flush()
+            appointment = Appointment(
+                user_id=user.id, service_id=service.id, client_id=client.id,
+                appointment_date=datetime(2030, 1, 1, 10, 0, 0, 250000), duration_minutes=45,
+                status=AppointmentStatus.CONFIRMED, price=1500.5,
+            )
+            hours = WorkingHours(user_id=user.id, day_of_week=0, start_time=time(9, 0), end_time=time(18, 30))
+            day = WorkingDay(user_id=user.id, date=date(2030, 1, 2), is_working_day=False)
+            session.add_all([appointment, hours, day])
+            await session.commit()
+            await session.refresh(appointment, ["service", "client"])
+
+            pairs = [
+                (user_serializer, user), (service_serializer, service), (client_serializer, client),
+                (appointment_serializer, appointment), (working_hours_serializer, hours),
+                (working_day_serializer, day),
+            ]
+            results = [(orjson.loads(serializer.dumps(obj)), json.loads(json.dumps(obj.to_dict()))) for serializer, obj in pairs]
+
+            # Медленный путь (атрибуты не в __dict__) дает то же самое
+            results.append((
+                orjson.loads(orjson.dumps(appointment_serializer._native_slow(appointment))),
+                json.loads(json.dumps(appointment.to_dict())),
+            ))
+            return results
+
+    for fast, expected in run_db(scenario):
+        assert fast == expected
+        assert list(fast) == list(expected)
+    print("✅ Сериализаторы совпадают с to_dict()")
+
+
+def test_sparse_fieldsets(run_db):
+    """?fields= и ?include= сокращают ответ и список колонок в SQL"""
+    print("🧪 Тест sparse fieldsets на списках...")
+
+    import httpx
+    from sqlalchemy import event
+    from api_server import app
+    from src.shared.auth.jwt_auth import create_token_response
+    from src.shared.database.connection import read_engine
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async def scenario():
+        async with async_session_factory() as session:
+            user = User(telegram_id=6006, username="sparse", first_name="Мастер")
+            session.add(user)
+            await session.flush()
+            service = Service(user_id=user.id, name="Маникюр", price=2000, duration_minutes=90, color="#ff0000")
+            client = Client(user_id=user.id, first_name="Ольга", notes="Секретная заметка")
+            session.add_all([service, client])
+            await session.flush()
+            session.add(Appointment(
+                user_id=user.id, service_id=service.id, client_id=client.id,
+                appointment_date=datetime(2030, 2, 1, 12, 0), duration_minutes=90, notes="Заметка",
+            ))
+            await session.commit()
+            token = create_token_response(user.to_dict())["access_token"]
+
+        responses = {}
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Bearer {token}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as client_http:
+            event.listen(read_engine.sync_engine, "before_cursor_execute", capture)
+            try:
+                responses["calendar"] = await client_http.get(
+                    "/api/appointments/", params={"fields": "id,appointment_date,ends_at,service.name,service.color"}
+                )
+            finally:
+                event.remove(read_engine.sync_engine, "before_cursor_execute", capture)
+            responses["no_include"] = await client_http.get("/api/appointments/", params={"include": ""})
+            responses["full"] = await client_http.get("/api/appointments/")
+            responses["clients"] = await client_http.get("/api/clients/", params={"fields": "id,first_name"})
+            responses["services"] = await client_http.get("/api/services/", params={"fields": "name,color"})
+            responses["normalized"] = await client_http.get(
+                "/api/appointments/", params={"format": "normalized", "fields": "id,appointment_date,service.name"}
+            )
+            responses["bad"] = await client_http.get("/api/appointments/", params={"fields": "id,password"})
+        return responses
+
+    responses = run_db(scenario)
+
+    calendar = responses["calendar"].json()["appointments"][0]
+    assert calendar == {
+        "id": calendar["id"], "appointment_date": "2030-02-01T12:00:00", "ends_at": "2030-02-01T13:30:00",
+        "service": {"name": "Маникюр", "color": "#ff0000"},
+    }
+    page_query = next(sql for sql in statements if "FROM appointments" in sql and "count" not in sql.lower())
+    assert "notes" not in page_query
+    assert "clients" not in page_query
+
+    assert "service" not in responses["no_include"].json()["appointments"][0]
+    full = responses["full"].json()["appointments"][0]
+    assert full["client"]["notes"] == "Секретная заметка" and full["notes"] == "Заметка"
+    assert responses["clients"].json()["clients"][0] == {"id": full["client"]["id"], "first_name": "Ольга"}
+    assert responses["services"].json()["services"][0] == {"name": "Маникюр", "color": "#ff0000"}
+    normalized = responses["normalized"].json()
+    service_id = normalized["appointments"][0]["service_id"]
+    assert normalized["appointments"][0] == {
+        "id": calendar["id"], "service_id": service_id, "appointment_date": "2030-02-01T12:00:00"
+    }
+    assert normalized["services"] == {str(service_id): {"name": "Маникюр"}}
+    assert normalized["clients"] == {}
+    assert responses["bad"].status_code == 400
+    print("✅ Sparse fieldsets работают")
@@ -0,0 +1,69 @@
+"""
+Тесты дельта-синхронизации: номера изменений, tombstones и курсор /api/sync
+"""
+
+import httpx
+
+
+def test_sync_returns_changes_after_cursor(run_db):
+    """После курсора приходят только измененные и удаленные объекты"""
+    print("🧪 Тест дельта-синхронизации...")
+
+    from api_server import app
+    from src.shared.auth.jwt_auth import create_token_response
+    from src.shared.database.connection import async_session_factory
+    from src.shared.database.models import User
+
+    async def scenario():
+        async with async_session_factory() as session:
+            user = User(telegram_id=7007, username="sync", first_name="Мастер")
+            session.add(user)
+            await session.commit()
+            token = create_token_response(user.to_dict())["access_token"]
+
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Bearer {token}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as client:
+            service = (await client.post("/api/services/", json={"name": "Стрижка", "price": 1500, "duration_minutes": 60})).json()
+            extra = (await client.post("/api/services/", json={"name": "Укладка", "price": 900, "duration_minutes": 30})).json()
+            customer = (await client.post("/api/clients/", json={"first_name": "Анна", "phone": "+79990000001"})).json()
+            appointment = (await client.post("/api/appointments/", json={
+                "service_id": service["id"], "client_id": customer["id"], "appointment_date": "2030-01-01T10:00:00",
+            })).json()
+
+            full = (await client.get("/api/sync")).json()
+            pages = [(await client.get("/api/sync", params={"limit": 3})).json()]
+            pages.append((await client.get("/api/sync", params={"since": pages[0]["cursor"], "limit": 3})).json())
+
+            await client.put(f"/api/appointments/{appointment['id']}", json={"notes": "Перенести на утро"})
+            await client.delete(f"/api/services/{extra['id']}")
+            delta = (await client.get("/api/sync", params={"since": full["cursor"]})).json()
+            idle = (await client.get("/api/sync", params={"since": delta["cursor"]})).json()
+            stale = await client.get("/api/sync", params={"since": delta["cursor"] + 100})
+        return service, extra, customer, appointment, full, pages, delta, idle, stale
+
+    service, extra, customer, appointment, full, pages, delta, idle, stale = run_db(scenario)
+
+    # Полная выгрузка: все объекты, записи без встроенных связей
+    assert [item["id"] for item in full["services"]] == [service["id"], extra["id"]]
+    assert [item["id"] for item in full["clients"]] == [customer["id"]]
+    assert [item["id"] for item in full["appointments"]] == [appointment["id"]]
+    assert "service" not in full["appointments"][0]
+    assert full["has_more"] is False
+
+    # Постранично: 3 + 1 изменение, курсор второй страницы - как у полной
+    assert pages[0]["has_more"] is True
+    assert sum(len(pages[0][key]) for key in ("appointments", "clients", "services")) == 3
+    assert pages[1]["appointments"] == full["appointments"] and pages[1]["has_more"] is False
+    assert pages[1]["cursor"] == full["cursor"]
+
+    # Дельта: только измененная запись и удаленная услуга
+    assert [item["notes"] for item in delta["appointments"]] == ["Перенести на утро"]
+    assert delta["clients"] == [] and delta["services"] == []
+    assert delta["deleted"] == {"appointments": [], "clients": [], "services": [extra["id"]]}
+    assert delta["cursor"] > full["cursor"]
+
+    assert idle["cursor"] == delta["cursor"]
+    assert idle["appointments"] == [] and idle["deleted"]["services"] == []
+    assert stale.status_code == 410
+    print("✅ Синхронизация отдает только изменения после курсора")
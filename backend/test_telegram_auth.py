@@ -0,0 +1,78 @@
+"""
+Тесты проверки initData Telegram WebApp
+"""
+
+import hashlib
+import hmac
+import json
+import time
+from urllib.parse import parse_qsl, urlencode
+
+import pytest
+from fastapi import HTTPException
+
+from src.shared.auth.telegram_auth import parse_init_data, validate_telegram_init_data, webapp_secret_key, _validated_init_data
+
+
+def _sign(bot_token: str, auth_date: int, user: dict) -> str:
+    """Собирает initData так же, как Telegram: поля + hash от data_check_string"""
+    fields = {
+        "query_id": "AAHdF6IQAAAAAN0XohDhrOrc",
+        "user": json.dumps(user, ensure_ascii=False, separators=(",", ":")),
+        "auth_date": str(auth_date),
+    }
+    data_check_string = "\n".join(f"{key}={fields[key]}" for key in sorted(fields))
+    fields["hash"] = hmac.new(webapp_secret_key(bot_token), data_check_string.encode(), hashlib.sha256).hexdigest()
+    return urlencode(fields)
+
+
+def test_parse_init_data():
+    """Разбор совпадает с parse_qsl, включая нестандартное экранирование; строка без = отклоняется"""
+    for init_data in [
+        _sign("token", 1700000000, {"id": 1, "first_name": "Анна 😀", "last_name": "a\\b+c%d"}),
+        "user=%7B%22a%22%3A1%7D&bad=%zz%4&plus=a+b&slash=\\x41&raw=ж&empty=",
+    ]:
+        assert parse_init_data(init_data) == dict(parse_qsl(init_data, keep_blank_values=True))
+
+    with pytest.raises(HTTPException):
+        parse_init_data("user=%7B%7D&flag")
+
+
+def test_validate_init_data_escapes():
+    """Обратная косая черта и кириллица в user проходят проверку подписи без искажений"""
+    print("🧪 Тест initData с экранированием...")
+    _validated_init_data.clear()
+    user = {"id": 8, "first_name": "Ёжик \\ \\x41 \\u0416", "last_name": "Щукина%20+", "username": "yozh"}
+    init_data = _sign("main-token", int(time.time()), user)
+
+    assert "%5C" in init_data
+    assert validate_telegram_init_data(init_data, "main-token") == user
+    print("✅ Обратная косая черта и кириллица разбираются корректно")
+
+
+def test_validate_init_data():
+    """Подпись второго бота, кэш проверенных строк, подделка и устаревшие данные"""
+    print("🧪 Тест проверки initData...")
+    _validated_init_data.clear()
+
+    # Символы, которые ломали двойное декодирование: + и & внутри JSON
+    user = {"id": 7, "first_name": "Анна+Мария & Co", "username": "anna"}
+    init_data = _sign("client-token", int(time.time()), user)
+
+    assert validate_telegram_init_data(init_data, ["main-token", "client-token"]) == user
+    assert _validated_init_data.get(init_data) is not None
+
+    # Запись кэша не действует для списка токенов без подписавшего бота
+    with pytest.raises(HTTPException) as error:
+        validate_telegram_init_data(init_data, ["main-token"])
+    assert error.value.detail == "Init data невалидны"
+
+    forged = init_data.replace("anna", "admin")
+    with pytest.raises(HTTPException):
+        validate_telegram_init_data(forged, ["main-token", "client-token"])
+
+    stale = _sign("main-token", int(time.time()) - 2 * 86400, user)
+    with pytest.raises(HTTPException) as error:
+        validate_telegram_init_data(stale, "main-token")
+    assert error.value.detail.startswith("Init data устарели")
+    print("✅ initData проверяются корректно")
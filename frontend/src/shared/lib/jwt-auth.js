@@ -14,6 +14,7 @@ class JWTAutManager {
     this.isAuthenticated = false;
     this.user = null;
     this.initPromise = null;
+    this.refreshPromise = null;
   }
 
   /**
@@ -278,8 +279,23 @@ class JWTAutManager {
 
   /**
    * Обновление токенов (вызывается автоматически при истечении access токена)
+   *
+   * Параллельные запросы с 401 ждут одно общее обновление: refresh токен
+   * обменивается один раз, повторное предъявление сервер считает кражей.
    */
-  async refreshTokens() {
+  refreshTokens() {
+    if (!this.refreshPromise) {
+      this.refreshPromise = this.requestTokenRefresh().finally(() => {
+        this.refreshPromise = null;
+      });
+    }
+    return this.refreshPromise;
+  }
+
+  /**
+   * Запрос обновления токенов к API
+   */
+  async requestTokenRefresh() {
     try {
       console.log('🔄 Обновление токенов через API...');
 